@@ -0,0 +1,197 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from attendance_store import INVALID, OPEN, format_date, parse_time
+
+# Incrementally maintained attendance aggregates:
+#   daily     (RegNo, Date)       -> Department, seconds worked, sessions
+#   headcount (Department, Date)  -> users present
+#   monthly   (RegNo, "YYYY-MM")  -> [days present, seconds worked]
+# The daily table is a DataFrame; only the days scans can still touch live in
+# a dict, so scans update everything in O(1) and ad-hoc ranges are answered
+# with vectorized pandas. The aggregates are pickled with a watermark of the
+# attendance they cover and rebuilt (vectorized) only when that no longer
+# matches; days already archived out of the attendance keep their saved rows.
+
+SECONDS_PER_DAY = 24 * 3600
+DAILY_COLUMNS = ['RegNo', 'Date', 'Department', 'Seconds', 'Sessions']
+
+
+def session_seconds(in_time, out_time):
+    # Sessions that end "before" they start crossed midnight
+    start, end = parse_time(in_time), parse_time(out_time)
+    if INVALID in (start, end):
+        return 0.0
+    return float((end - start) % SECONDS_PER_DAY)
+
+
+def watermark(attendance):
+    return len(attendance), int((attendance.out_seconds() != OPEN).sum())
+
+
+class AttendanceAggregates:
+    def __init__(self):
+        self.base = pd.DataFrame(columns=DAILY_COLUMNS)
+        self.live = {}
+        self.headcount = {}
+        self.monthly = {}
+        self.mark = (0, 0)
+        self.frame = None
+
+    def open_latest_day(self):
+        # Scans only ever land on the current day, so only the newest day of
+        # history moves from the frame into the dict
+        self.live = {}
+        if len(self.base):
+            mask = (self.base['Date'] == self.base['Date'].max()).to_numpy()
+            day = self.base[mask]
+            self.live = {(r, d): [dept, s, n] for r, d, dept, s, n in
+                         zip(day['RegNo'], day['Date'], day['Department'], day['Seconds'], day['Sessions'])}
+            self.base = self.base[~mask].reset_index(drop=True)
+        self.frame = None
+
+    # ----- Incremental updates -----
+    def on_in(self, regno, department, date):
+        key = (regno, date)
+        entry = self.live.get(key)
+        if entry is None:
+            self.live[key] = [department, 0.0, 1]
+            hkey = (department, date)
+            self.headcount[hkey] = self.headcount.get(hkey, 0) + 1
+            month = self.monthly.setdefault((regno, date[:7]), [0, 0.0])
+            month[0] += 1
+        else:
+            entry[2] += 1
+        self.mark = (self.mark[0] + 1, self.mark[1])
+        self.frame = None
+
+    def on_out(self, regno, date, in_time, out_time):
+        seconds = session_seconds(in_time, out_time)
+        entry = self.live.get((regno, date))
+        if entry is not None:
+            entry[1] += seconds
+        else:
+            # A session from an earlier day, e.g. closed after midnight
+            # following a restart: its row is in the frame
+            rows = np.flatnonzero(((self.base['RegNo'] == regno) & (self.base['Date'] == date)).to_numpy())
+            if len(rows):
+                self.base.iloc[rows[0], self.base.columns.get_loc('Seconds')] += seconds
+        month = self.monthly.get((regno, date[:7]))
+        if month is not None:
+            month[1] += seconds
+        self.mark = (self.mark[0], self.mark[1] + 1)
+        self.frame = None
+
+    # ----- Full rebuild -----
+    def rebuild(self, attendance, users_df, kept=None):
+        # Grouped on the store's integer columns; strings only per (user, day).
+        # kept: daily rows of days no longer in attendance (archived months)
+        tin = attendance.in_seconds().astype(np.int64)
+        tout = attendance.out_seconds().astype(np.int64)
+        closed = (tout != OPEN) & (tin != INVALID)
+        rows = pd.DataFrame({
+            "rid": attendance.ids(),
+            "day": attendance.days(),
+            "Seconds": np.where(closed, (tout - tin) % SECONDS_PER_DAY, 0).astype(float),
+        })
+        daily = rows.groupby(['rid', 'day'], sort=False).agg(Seconds=('Seconds', 'sum'),
+                                                           Sessions=('Seconds', 'size')).reset_index()
+        daily['RegNo'] = np.array(attendance.regnos, dtype=object)[daily['rid'].to_numpy()]
+        unique_days, day_codes = np.unique(daily['day'].to_numpy(), return_inverse=True)
+        daily['Date'] = np.array([format_date(d) for d in unique_days], dtype=object)[day_codes]
+        departments = users_df.drop_duplicates('RegNo').set_index('RegNo')['Department']
+        daily['Department'] = daily['RegNo'].map(departments).fillna("")
+        daily = daily[DAILY_COLUMNS]
+        if kept is not None and len(kept):
+            daily = pd.concat([kept, daily], ignore_index=True)
+        heads = daily.groupby(['Department', 'Date']).size()
+        self.headcount = dict(zip(heads.index, heads.to_numpy().tolist()))
+        months = daily.assign(Month=daily['Date'].str[:7]).groupby(['RegNo', 'Month']).agg(
+            Days=('Date', 'size'), Seconds=('Seconds', 'sum'))
+        self.monthly = {key: [int(d), float(s)] for key, d, s in
+                        zip(months.index, months['Days'], months['Seconds'])}
+        self.mark = watermark(attendance)
+        self.base = daily
+        self.open_latest_day()
+
+    # ----- Persistence -----
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump({"mark": self.mark, "daily": self.daily_frame(), "headcount": self.headcount,
+                         "monthly": self.monthly}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_or_rebuild(cls, path, attendance, users_df, archive_start=None):
+        # archive_start: first day attendance holds when older months are
+        # archived; their saved rows are kept through a rebuild
+        aggregates = cls()
+        kept = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as fh:
+                    state = pickle.load(fh)
+                if tuple(state["mark"]) == watermark(attendance):
+                    aggregates.mark = tuple(state["mark"])
+                    aggregates.base = state["daily"]
+                    aggregates.headcount = state["headcount"]
+                    aggregates.monthly = state["monthly"]
+                    aggregates.open_latest_day()
+                    return aggregates
+                if archive_start is not None:
+                    # e.g. months sealed at this start: attendance no longer
+                    # has their rows, so only the window is rebuilt
+                    daily = state["daily"]
+                    kept = daily[(daily['Date'] < archive_start).to_numpy()]
+            except (OSError, pickle.UnpicklingError, KeyError, EOFError):
+                pass
+        aggregates.rebuild(attendance, users_df, kept)
+        if path:
+            aggregates.save(path)
+        return aggregates
+
+    # ----- Queries -----
+    def daily_frame(self):
+        if self.frame is None:
+            live = pd.DataFrame([(r, d, dept, s, n) for (r, d), (dept, s, n) in self.live.items()],
+                                columns=DAILY_COLUMNS)
+            self.frame = pd.concat([self.base, live], ignore_index=True) if len(live) else self.base
+        return self.frame
+
+    def in_range(self, date_from=None, date_to=None):
+        daily = self.daily_frame()
+        mask = np.ones(len(daily), dtype=bool)
+        if date_from:
+            mask &= (daily['Date'] >= date_from).to_numpy()
+        if date_to:
+            mask &= (daily['Date'] <= date_to).to_numpy()
+        return daily[mask]
+
+    def per_user(self, date_from=None, date_to=None):
+        daily = self.in_range(date_from, date_to)
+        summary = daily.groupby('RegNo').agg(Department=('Department', 'last'), Days=('Date', 'size'),
+                                             Sessions=('Sessions', 'sum'), Seconds=('Seconds', 'sum'))
+        summary['Hours'] = summary['Seconds'] / 3600
+        return summary.drop(columns='Seconds').sort_values('Hours', ascending=False).reset_index()
+
+    def per_department(self, date_from=None, date_to=None):
+        daily = self.in_range(date_from, date_to)
+        summary = daily.groupby(['Date', 'Department']).agg(Present=('RegNo', 'size'), Seconds=('Seconds', 'sum'))
+        summary['Hours'] = summary['Seconds'] / 3600
+        return summary.drop(columns='Seconds').sort_index(ascending=[False, True]).reset_index()
+
+    def per_month(self, date_from=None, date_to=None):
+        if not date_from and not date_to:
+            # Straight from the maintained rollup
+            months = pd.DataFrame([(r, m, d, s / 3600) for (r, m), (d, s) in self.monthly.items()],
+                                  columns=['RegNo', 'Month', 'Days', 'Hours'])
+            return months.sort_values(['Month', 'RegNo'], ascending=[False, True]).reset_index(drop=True)
+        daily = self.in_range(date_from, date_to).assign(Month=lambda d: d['Date'].str[:7])
+        months = daily.groupby(['Month', 'RegNo']).agg(Days=('Date', 'size'), Seconds=('Seconds', 'sum'))
+        months['Hours'] = months['Seconds'] / 3600
+        return months.drop(columns='Seconds').sort_index(ascending=[False, True]).reset_index()[
+            ['RegNo', 'Month', 'Days', 'Hours']]
@@ -0,0 +1,396 @@
+import http.client
+import json
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from attendance_core import AttendanceBook, ScanResult, limit_message
+from attendance_server import TIME_FORMAT
+from journal import journal_segments
+from metrics import SYNC_FAILURES, SYNC_OVERRULED, SYNC_PULL, SYNC_UPLOAD, SYNC_UPLOADED
+from storage import USER_COLUMNS, CsvStorage
+
+# Client mode for a kiosk that shares attendance through attendance_server.py.
+# The kiosk keeps a local replica of users and attendance (plain CsvStorage
+# files in a cache directory) so lookups, records and analytics stay local.
+# A scan is answered from the replica straight away and queued as an event
+# with a unique ID in an on-disk outbox; a background thread uploads the
+# outbox in batches over pooled keep-alive connections and pulls back the
+# rows every gate has recorded. The server pairs in/out across gates and
+# ignores event IDs it has already applied, so a batch can be re-sent after a
+# timeout or restart. With the server unreachable, scans keep being answered
+# and queued.
+
+UPLOAD_BATCH = 200
+SYNC_INTERVAL = 1.0
+RESYNC_DAYS = 2
+REQUEST_TIMEOUT = 10
+
+
+class ServerUnavailable(OSError):
+    pass
+
+
+class ConnectionPool:
+    # Keep-alive HTTP connections to one server, reused across requests and threads
+    def __init__(self, url, size=2, timeout=REQUEST_TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def request(self, method, path, payload=None):
+        # Returns (status, headers, body); JSON payloads/bodies are encoded/decoded
+        body = None if payload is None else json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                # A pooled connection the server already closed fails on first
+                # use; retry once on a fresh one
+                if attempt:
+                    raise ServerUnavailable(f"Attendance server unreachable: {e}") from e
+                continue
+            try:
+                self.idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+            if response.getheader("Content-Type", "").startswith("application/json"):
+                data = json.loads(data)
+            return response.status, response, data
+
+    def json(self, method, path, payload=None):
+        status, _, data = self.request(method, path, payload)
+        if status != 200:
+            raise ServerUnavailable(f"Attendance server returned {status}: {data}")
+        return data
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class Outbox:
+    # Scan events not yet acknowledged by the server, one JSON line each
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.events = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        self.events.append(json.loads(line))
+                    except ValueError:
+                        pass  # torn tail after a crash
+        self.fh = open(path, "a", encoding="utf-8")
+
+    def __len__(self):
+        return len(self.events)
+
+    def append(self, event):
+        with self.lock:
+            self.fh.write(json.dumps(event) + "\n")
+            self.fh.flush()
+            self.events.append(event)
+
+    def peek(self, n):
+        with self.lock:
+            return self.events[:n]
+
+    def ack(self, n):
+        # Drop the first n events and rewrite the (small) file with the rest
+        with self.lock:
+            self.events = self.events[n:]
+            self.fh.close()
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.writelines(json.dumps(event) + "\n" for event in self.events)
+            os.replace(tmp, self.path)
+            self.fh = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        with self.lock:
+            self.fh.close()
+
+
+class ClientBook(AttendanceBook):
+    def __init__(self, server_url, cache_dir, terminal="kiosk", policy=None, batch_size=UPLOAD_BATCH,
+                 interval=SYNC_INTERVAL):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.pool = ConnectionPool(server_url)
+        self.terminal = terminal
+        self.batch_size = batch_size
+        self.interval = interval
+        self.state_file = os.path.join(cache_dir, "sync_state.json")
+        self.state = {"epoch": None, "seq": 0, "users_version": -1}
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as fh:
+                self.state.update(json.load(fh))
+        self.online = False
+        self.last_error = None
+
+        files = {name: os.path.join(cache_dir, name) for name in
+                 ("users.csv", "attendance.csv", "attendance.journal", "attendance_aggregates.pkl")}
+        try:
+            self.bootstrap(files)
+            self.online = True
+        except ServerUnavailable as e:
+            self.last_error = e  # start from the cached replica
+        super().__init__(CsvStorage(files["users.csv"], files["attendance.csv"], files["attendance.journal"]),
+                         aggregates_file=files["attendance_aggregates.pkl"], policy=policy)
+
+        self.outbox = Outbox(os.path.join(cache_dir, "outbox.jsonl"))
+        # Scans per RegNo queued but not yet seen in the replica, so the next
+        # local answer counts them
+        self.pending = {}
+        for event in self.outbox.events:
+            self.pending[event["regno"]] = self.pending.get(event["regno"], 0) + 1
+        self.acked = []
+        self.day_keys = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # ----- Replica -----
+    def bootstrap(self, files):
+        # A fresh cache, or one from before a server restart, is replaced by a
+        # full download; otherwise the change feed catches it up after start
+        cursor = f"epoch={self.state['epoch']}&since={self.state['seq']}"
+        status, _, _ = self.pool.request("GET", f"/changes?{cursor}&limit=0")
+        if status != 200:
+            self.download(files)
+        users = self.pool.json("GET", f"/users?version={self.state['users_version']}")
+        if users["users"] is not None:
+            pd.DataFrame(users["users"], columns=USER_COLUMNS).to_csv(files["users.csv"], index=False)
+            self.state["users_version"] = users["version"]
+        self.save_state()
+
+    def download(self, files):
+        status, response, data = self.pool.request("GET", "/snapshot")
+        if status != 200:
+            raise ServerUnavailable(f"Attendance server returned {status} for /snapshot")
+        tmp = files["attendance.csv"] + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, files["attendance.csv"])
+        for path in journal_segments(files["attendance.journal"]) + [files["attendance_aggregates.pkl"]]:
+            if os.path.exists(path):
+                os.remove(path)
+        # Users versions count from zero again after a server restart
+        self.state.update(epoch=response.getheader("X-Epoch"), seq=int(response.getheader("X-Seq")), users_version=-1)
+
+    def save_state(self):
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self.state, fh)
+        os.replace(tmp, self.state_file)
+
+    def keys_on(self, day):
+        # (RegNo, InTime) -> position for one day, built on first use
+        keys = self.day_keys.get(day)
+        if keys is None:
+            if len(self.day_keys) >= 8:
+                self.day_keys = {}
+            positions = self.attendance.positions_on(day).tolist()
+            keys = self.day_keys[day] = {(self.attendance.regno(p), self.attendance.in_time(p)): p for p in positions}
+        return keys
+
+    def apply_rows(self, rows):
+        # Upserts server rows by (RegNo, Date, InTime) into the replica
+        changes = []
+        with self.lock:
+            for regno, day, in_time, out_time in rows:
+                keys = self.keys_on(day)
+                pos = keys.get((regno, in_time))
+                department = (self.index.get_user(regno) or {}).get('Department', "")
+                if pos is None:
+                    pos = keys[(regno, in_time)] = self.attendance.append(regno, day, in_time)
+                    self.search_index.add_row(pos, regno)
+                    self.storage.record_in(regno, day, in_time)
+                    self.aggregates.on_in(regno, department, day)
+                    changes.append(("in", pos))
+                if out_time and self.attendance.is_open(pos):
+                    self.attendance.set_out(pos, out_time)
+                    self.storage.record_out(regno, day, in_time, out_time)
+                    self.aggregates.on_out(regno, day, in_time, out_time)
+                    changes.append(("out", pos))
+            if changes:
+                self.sessions.rebuild()
+                self.changes.extend(changes)
+            if self.storage.needs_compaction():
+                self.storage.compact(self.attendance.copy())
+        return changes
+
+    def close_stale(self, now=None):
+        # The server closes stale sessions; the replica gets them from the feed
+        pass
+
+    def replace_users(self, records):
+        # The server's table supersedes any local edits still waiting to be saved
+        with self.lock:
+            users = pd.DataFrame(records, columns=USER_COLUMNS)
+            self.users_frame = users
+            self.index.rebuild_users(users)
+            self.search_index.rebuild_users(users)
+            self.user_changes = {}
+            self.users_first_change = self.users_save_at = None
+            self.storage.save_users(users)
+            # Tells the UI to reload its users table
+            self.changes.append(("users", None))
+
+    # ----- Scans -----
+    def mark(self, regno, now=None):
+        if len(regno.split('-')) < 2:
+            return ScanResult(False, "rejected", regno, None, "Invalid QR format")
+
+        with self.lock:
+            user = self.index.get_user(regno)
+            if user is None:
+                return ScanResult(False, "rejected", regno, None, "User not registered")
+
+            now = now or datetime.now()
+            current_time = now.strftime("%H:%M:%S")
+
+            # Same rules as AttendanceBook.mark, applied to the replica plus
+            # the scans still queued: each queued scan flips open/closed
+            idx = self.sessions.open_session(regno)
+            was_open = idx is not None and self.policy.closes(self.attendance.date(idx), now)
+            queued = self.pending.get(regno, 0)
+            is_open = (was_open + queued) % 2 == 1
+            if not is_open:
+                day = self.policy.session_day(now)
+                if day is None:
+                    return ScanResult(False, "rejected", regno, None, "Outside shift hours")
+                queued_ins = queued // 2 if was_open else (queued + 1) // 2
+                if self.sessions.count(regno, day) + queued_ins >= self.policy.max_sessions_per_day:
+                    return ScanResult(False, "rejected", regno, None, limit_message(self.policy.max_sessions_per_day))
+
+            # action: this kiosk's answer, compared with the server's on upload
+            action = "out" if is_open else "in"
+            self.outbox.append({"id": uuid.uuid4().hex, "terminal": self.terminal, "regno": regno,
+                                "time": now.strftime(TIME_FORMAT), "action": action})
+            self.pending[regno] = queued + 1
+            if action == "in":
+                return ScanResult(True, "in", regno, None, f"Welcome {user['FirstName']} - Time: {current_time}")
+            return ScanResult(True, "out", regno, None,
+                              f"Bye {user['FirstName']}, have a good day! - Time: {current_time}")
+
+    # ----- Sync -----
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sync_now()
+
+    def sync_now(self):
+        try:
+            self.upload()
+            self.pull()
+            self.online = True
+        except ServerUnavailable as e:
+            self.online = False
+            self.last_error = e
+            SYNC_FAILURES.inc()
+
+    def upload(self):
+        while True:
+            batch = self.outbox.peek(self.batch_size)
+            if not batch:
+                return
+            with SYNC_UPLOAD.time():
+                response = self.pool.json("POST", "/events", {"events": batch})
+            answered = {event["id"]: event["action"] for event in batch}
+            for result in response["results"]:
+                if result["action"] not in (answered[result["id"]], "duplicate"):
+                    SYNC_OVERRULED.inc()
+            SYNC_UPLOADED.inc(len(batch))
+            self.outbox.ack(len(batch))
+            self.acked.extend(event["regno"] for event in batch)
+
+    def pull(self):
+        with SYNC_PULL.time():
+            users = self.pool.json("GET", f"/users?version={self.state['users_version']}")
+            if users["users"] is not None:
+                self.replace_users(users["users"])
+                self.state["users_version"] = users["version"]
+
+            while True:
+                status, _, data = self.pool.request(
+                    "GET", f"/changes?epoch={self.state['epoch']}&since={self.state['seq']}")
+                if status == 409:
+                    # Server restarted: its change log is new, so re-read the
+                    # recent days instead (and the users on the next round)
+                    since = (datetime.now() - timedelta(days=RESYNC_DAYS - 1)).strftime("%Y-%m-%d")
+                    data = self.pool.json("GET", f"/rows?date_from={since}")
+                    self.state["users_version"] = -1
+                elif status != 200:
+                    raise ServerUnavailable(f"Attendance server returned {status}: {data}")
+                self.apply_rows(data["rows"])
+                caught_up = status == 409 or data["seq"] == self.state["seq"] or not data["rows"]
+                self.state.update(epoch=data["epoch"], seq=data["seq"])
+                if caught_up:
+                    break
+            self.save_state()
+
+        # Events acknowledged by the server are in the replica now
+        with self.lock:
+            for regno in self.acked:
+                left = self.pending.get(regno, 0) - 1
+                if left > 0:
+                    self.pending[regno] = left
+                else:
+                    self.pending.pop(regno, None)
+            self.acked = []
+
+    def status(self):
+        queued = len(self.outbox)
+        if self.online:
+            return f"Server: online, {queued} scans queued" if queued else "Server: online"
+        return f"Server: offline ({self.last_error}), {queued} scans queued"
+
+    # ----- Users (changed on the server, then locally) -----
+    def add_user(self, record):
+        self.users_op({"op": "add", "users": [record]})
+        super().add_user(record)
+
+    def add_users(self, users_df):
+        self.users_op({"op": "add", "users": users_df[USER_COLUMNS].fillna("").astype(str).to_dict("records")})
+        super().add_users(users_df)
+
+    def update_user(self, old_regno, record):
+        self.users_op({"op": "update", "old_regno": old_regno, "record": record})
+        super().update_user(old_regno, record)
+
+    def delete_user(self, regno):
+        self.users_op({"op": "delete", "regno": regno})
+        super().delete_user(regno)
+
+    def users_op(self, request):
+        version = self.pool.json("POST", "/users", request)["version"]
+        # Only our own change since the last pull: the local edit brings the
+        # replica up to date without re-downloading the users
+        if version == self.state["users_version"] + 1:
+            self.state["users_version"] = version
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        if self.online:
+            self.sync_now()
+        self.pool.close()
+        self.outbox.close()
+        self.save_state()
+        super().close()
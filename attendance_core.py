@@ -0,0 +1,220 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+
+from aggregates import AttendanceAggregates
+from attendance_index import AttendanceIndex
+from attendance_store import AttendanceStore
+from metrics import LOAD, PERSIST
+from search_index import SearchIndex
+from sessions import SessionEngine, SessionPolicy
+from storage import USER_COLUMNS
+
+# Attendance state shared by the UI and the scanning engine: the users frame,
+# the compact attendance store, their lookup indexes, the session engine and
+# the storage backend. Every mutation goes through AttendanceBook under one
+# lock, so scan workers for several gates and the Tk thread can all write to it.
+#
+# User edits only touch the records involved: the index's RegNo -> record dict
+# is the users table, and the DataFrame view (self.users) is rebuilt from it
+# the next time someone reads it. Edits are saved in one batch once
+# USERS_SAVE_DELAY seconds pass without another (USERS_SAVE_MAX_DELAY at most
+# after the first), from sync() or on close.
+USERS_SAVE_DELAY = 2.0
+USERS_SAVE_MAX_DELAY = 10.0
+
+# action is "in", "out" or "rejected"; pos is the attendance row touched
+ScanResult = namedtuple("ScanResult", "ok action regno pos message")
+
+
+def limit_message(max_sessions):
+    if max_sessions == 1:
+        return "Attendance already marked twice today."
+    return f"All {max_sessions} sessions for today already used."
+
+
+class AttendanceBook:
+    def __init__(self, storage, aggregates_file=None, policy=None):
+        self.storage = storage
+        self.aggregates_file = aggregates_file
+        self.policy = policy or SessionPolicy()
+        self.lock = threading.RLock()
+        # (action, pos) of rows changed outside mark(), e.g. auto-closed
+        # sessions; ("users", None) when the users table was replaced wholesale
+        self.changes = []
+        # RegNo -> record (None if deleted) not yet saved, and when to save them
+        self.user_changes = {}
+        self.users_first_change = None
+        self.users_save_at = None
+        with LOAD.time():
+            users = storage.load_users()
+            self.attendance = AttendanceStore.from_frame(storage.load_attendance())
+            self.index = AttendanceIndex(users)
+            self.users_frame = users
+            self.sessions = SessionEngine(self.attendance, self.policy)
+            self.search_index = SearchIndex(users, self.attendance)
+            self.aggregates = AttendanceAggregates.load_or_rebuild(aggregates_file, self.attendance, users,
+                                                                   storage.archive_start())
+
+    # ----- Scans -----
+    def mark(self, regno, now=None):
+        if len(regno.split('-')) < 2:
+            return ScanResult(False, "rejected", regno, None, "Invalid QR format")
+
+        with self.lock:
+            user = self.index.get_user(regno)
+            if user is None:
+                return ScanResult(False, "rejected", regno, None, "User not registered")
+
+            first_name = user['FirstName']
+
+            now = now or datetime.now()
+            current_time = now.strftime("%H:%M:%S")
+            self.close_stale(now)
+            idx = self.sessions.open_session(regno)
+            if idx is not None and not self.policy.closes(self.attendance.date(idx), now):
+                # Left open on an earlier day: this scan checks in again
+                idx = None
+
+            if idx is not None:
+                # Closes the open session even if it started on an earlier Date
+                self.close_session(regno, idx, current_time)
+                result = ScanResult(True, "out", regno, idx, f"Bye {first_name}, have a good day! - Time: {current_time}")
+            else:
+                day = self.policy.session_day(now)
+                if day is None:
+                    return ScanResult(False, "rejected", regno, None, "Outside shift hours")
+                if self.sessions.count(regno, day) >= self.policy.max_sessions_per_day:
+                    return ScanResult(False, "rejected", regno, None, limit_message(self.policy.max_sessions_per_day))
+                with PERSIST.time():
+                    recorded = self.storage.record_in(regno, day, current_time)
+                if not recorded:
+                    # Same RegNo, Date and InTime as a stored row: adding it to
+                    # memory would put positions out of step with the backend
+                    return ScanResult(False, "rejected", regno, None, "Already checked in at this time")
+                idx = self.attendance.append(regno, day, current_time)
+                self.sessions.started(regno, idx, day, now)
+                self.search_index.add_row(idx, regno)
+                self.aggregates.on_in(regno, user['Department'], day)
+                result = ScanResult(True, "in", regno, idx, f"Welcome {first_name} - Time: {current_time}")
+
+            if self.storage.needs_compaction():
+                self.storage.compact(self.attendance.copy())
+            return result
+
+    def close_session(self, regno, idx, out_time):
+        day = self.attendance.date(idx)
+        in_time = self.attendance.in_time(idx)
+        # Persisted first, as for check-ins: if the write fails the session
+        # stays open in memory too and a retried scan closes it
+        with PERSIST.time():
+            self.storage.record_out(regno, day, in_time, out_time)
+        self.attendance.set_out(idx, out_time)
+        self.sessions.closed(regno, idx)
+        self.aggregates.on_out(regno, day, in_time, out_time)
+
+    def close_stale(self, now=None):
+        # Auto-closes sessions open past their deadline; a heap peek when none are
+        with self.lock:
+            for regno, idx, out_time in self.sessions.expired(now or datetime.now()):
+                self.close_session(regno, idx, out_time)
+                self.changes.append(("out", idx))
+
+    def take_changes(self):
+        with self.lock:
+            changes, self.changes = self.changes, []
+        return changes
+
+    # ----- Users -----
+    @property
+    def users(self):
+        with self.lock:
+            if self.users_frame is None:
+                self.users_frame = pd.DataFrame(list(self.index.users.values()), columns=USER_COLUMNS)
+            return self.users_frame
+
+    def add_user(self, record):
+        with self.lock:
+            self.index.add_user(record)
+            self.search_index.add_user(record)
+            self.user_changed(record['RegNo'], record)
+
+    def add_users(self, users_df):
+        # Bulk import: incremental index updates and a single write
+        with self.lock:
+            for record in users_df.to_dict('records'):
+                self.index.add_user(record)
+                self.search_index.add_user(record, keep_sorted=False)
+                self.user_changed(record['RegNo'], record)
+            self.search_index.finish_bulk()
+
+    def update_user(self, old_regno, record):
+        with self.lock:
+            record = {**self.index.get_user(old_regno), **record}
+            self.index.update_user(old_regno, record)
+            self.search_index.update_user(old_regno, record)
+            if record['RegNo'] != old_regno:
+                self.user_changed(old_regno, None)
+            self.user_changed(record['RegNo'], record)
+
+    def delete_user(self, regno):
+        with self.lock:
+            if self.index.remove_user(regno) is None:
+                return
+            self.search_index.remove_user(regno)
+            self.user_changed(regno, None)
+
+    def user_changed(self, regno, record):
+        self.user_changes[regno] = record
+        self.users_frame = None
+        now = time.monotonic()
+        if self.users_first_change is None:
+            self.users_first_change = now
+        self.users_save_at = min(now + USERS_SAVE_DELAY, self.users_first_change + USERS_SAVE_MAX_DELAY)
+
+    def save_users(self):
+        with self.lock:
+            if not self.user_changes:
+                return
+            with PERSIST.time():
+                self.storage.save_user_changes(self.user_changes, self.users)
+            self.user_changes = {}
+            self.users_first_change = self.users_save_at = None
+
+    # ----- History -----
+    def reaches_archive(self, date_from):
+        # True if rows from date_from on are partly outside self.attendance
+        start = self.storage.archive_start()
+        return start is not None and date_from is not None and date_from < start
+
+    def history(self, date_from=None, date_to=None):
+        # Every row in the range, archived partitions included, as a separate
+        # AttendanceStore (positions are its own, not self.attendance's)
+        frames = list(self.storage.read_archive(date_from, date_to))
+        with self.lock:
+            attendance = self.attendance
+            frames.append(attendance.to_frame(attendance.sorted_positions(
+                attendance.in_date_range(range(len(attendance)), date_from, date_to))))
+        return AttendanceStore.from_frame(pd.concat(frames, ignore_index=True))
+
+    # ----- Storage -----
+    def sync(self):
+        with self.lock:
+            self.storage.sync()
+            self.close_stale()
+            if self.user_changes and time.monotonic() >= self.users_save_at:
+                try:
+                    self.save_users()
+                except OSError:
+                    # Kept pending and retried; close() raises if it still fails
+                    self.users_save_at = time.monotonic() + USERS_SAVE_DELAY
+
+    def close(self):
+        with self.lock:
+            self.save_users()
+            self.storage.close()
+            if self.aggregates_file:
+                self.aggregates.save(self.aggregates_file)
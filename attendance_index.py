@@ -0,0 +1,34 @@
+# In-memory lookup table for users so a scan never has to filter a frame:
+# RegNo -> user record, in table order. AttendanceBook treats it as the users
+# table itself and builds its DataFrame view from it. Open sessions are
+# tracked by sessions.SessionEngine.
+
+
+class AttendanceIndex:
+    def __init__(self, users_df):
+        self.users = {}
+        self.rebuild_users(users_df)
+
+    # ----- Users -----
+    def rebuild_users(self, users_df):
+        self.users = {record['RegNo']: record for record in users_df.to_dict('records')}
+
+    def get_user(self, regno):
+        return self.users.get(regno)
+
+    def has_user(self, regno):
+        return regno in self.users
+
+    def add_user(self, record):
+        self.users[record['RegNo']] = record
+
+    def update_user(self, old_regno, record):
+        if record['RegNo'] == old_regno:
+            self.users[old_regno] = record
+        else:
+            # A new RegNo moves the user to the end of the table
+            del self.users[old_regno]
+            self.add_user(record)
+
+    def remove_user(self, regno):
+        return self.users.pop(regno, None)
@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from attendance_core import AttendanceBook
+from metrics import METRICS, SYNC_DUPLICATES, SYNC_EVENTS
+from partitions import add_partition_arguments, partition_options
+from sessions import add_policy_arguments, policy_from_args
+from storage import USER_COLUMNS, open_storage
+
+# Local attendance server for several kiosks. It owns the AttendanceBook; the
+# kiosks (attendance_client.ClientBook) upload scan events and pull back what
+# every gate recorded. In/out pairing happens here, in scan-time order, so a
+# user can check in at one gate and out at another.
+#
+#   python attendance_server.py --port 8765 --users users.csv --attendance attendance.csv
+#
+# HTTP/1.1 with keep-alive, JSON bodies:
+#   POST /events     {"events": [{"id", "terminal", "regno", "time"}]} -> per-event results.
+#                    Event IDs already seen are acknowledged without marking again.
+#                    503 if storage failed; the kiosk retries the batch and the
+#                    events that failed are applied then.
+#   GET  /changes?epoch=E&since=S   rows touched since change S, as [RegNo, Date, InTime, OutTime].
+#                    409 if the server restarted since epoch E.
+#   GET  /rows?date_from=D          every row from day D on, plus the current change cursor
+#   GET  /snapshot                  the whole attendance history as CSV (X-Epoch / X-Seq headers)
+#   GET  /users?version=V           the users table if it changed since version V
+#   POST /users      {"op": "add" | "update" | "delete", ...}
+#   GET  /metrics                   Prometheus text
+
+CHANGES_LIMIT = 5000
+EVENT_ID_DAYS = 7
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class AttendanceServer:
+    def __init__(self, book, events_file):
+        self.book = book
+        # Change log: positions touched since startup; a client's cursor is an
+        # index into it, valid for this epoch only
+        self.epoch = uuid.uuid4().hex
+        self.log = []
+        self.users_version = 0
+        self.seen = load_event_ids(events_file)
+        self.events_fh = open(events_file, "a", encoding="utf-8")
+        self.server = None
+        self.connections = set()
+
+    # ----- Operations (run on executor threads; the book lock serializes them) -----
+    def apply_events(self, events):
+        results = []
+        with self.book.lock:
+            for event in sorted(events, key=lambda e: e["time"]):
+                if event["id"] in self.seen:
+                    SYNC_DUPLICATES.inc()
+                    results.append({"id": event["id"], "action": "duplicate", "message": ""})
+                    continue
+                now = datetime.strptime(event["time"], TIME_FORMAT)
+                # The ID is on disk before the scan is applied: after a crash
+                # in between, the resent event is acknowledged rather than
+                # applied a second time (which would flip the check-in)
+                self.events_fh.write(f"{event['id']},{event['time'][:10]}\n")
+                self.events_fh.flush()
+                os.fsync(self.events_fh.fileno())
+                self.seen.add(event["id"])
+                try:
+                    result = self.book.mark(event["regno"], now=now)
+                except OSError:
+                    # Storage failed and the scan was not applied: the retry
+                    # after the 503 must be marked, not acknowledged
+                    self.forget_event(event)
+                    raise
+                self.drain_changes()
+                if result.action != "rejected":
+                    self.log.append(result.pos)
+                SYNC_EVENTS.inc()
+                results.append({"id": event["id"], "action": result.action, "message": result.message})
+        return {"results": results, "seq": len(self.log)}
+
+    def drain_changes(self):
+        # Rows the book changed by itself, i.e. sessions auto-closed by
+        # close_stale, go to the change log too so kiosks get them
+        self.log.extend(pos for _, pos in self.book.take_changes() if pos is not None)
+
+    def sync(self):
+        with self.book.lock:
+            self.book.sync()
+            self.drain_changes()
+
+    def forget_event(self, event):
+        self.seen.discard(event["id"])
+        try:
+            # Best effort, the disk may be what failed; a restart before the
+            # retry would otherwise drop the scan as a duplicate
+            self.events_fh.write(f"-{event['id']},{event['time'][:10]}\n")
+            self.events_fh.flush()
+        except OSError:
+            pass
+
+    def changes(self, since, limit=CHANGES_LIMIT):
+        with self.book.lock:
+            positions = self.log[since:since + limit]
+            rows = [list(self.book.attendance.row(pos)) for pos in dict.fromkeys(positions)]
+            return {"epoch": self.epoch, "seq": since + len(positions), "rows": rows}
+
+    def rows_from(self, date_from):
+        with self.book.lock:
+            attendance = self.book.attendance
+            positions = attendance.in_date_range(range(len(attendance)), date_from)
+            return {"epoch": self.epoch, "seq": len(self.log),
+                    "rows": [list(attendance.row(pos)) for pos in positions.tolist()]}
+
+    def snapshot(self):
+        with self.book.lock:
+            attendance = self.book.attendance.copy()
+            seq = len(self.log)
+        return attendance.to_frame().to_csv(index=False).encode(), seq
+
+    def users(self, version):
+        with self.book.lock:
+            if version == self.users_version:
+                return {"version": version, "users": None}
+            return {"version": self.users_version,
+                    "users": self.book.users[USER_COLUMNS].fillna("").astype(str).to_dict("records")}
+
+    def update_users(self, request):
+        with self.book.lock:
+            op = request["op"]
+            if op == "add":
+                new_users = pd.DataFrame(request["users"], columns=USER_COLUMNS)
+                new_users = new_users[~new_users["RegNo"].isin(self.book.index.users)]
+                if len(new_users) == 1:
+                    self.book.add_user(new_users.iloc[0].to_dict())
+                elif len(new_users):
+                    self.book.add_users(new_users)
+            elif op == "update":
+                if not self.book.index.has_user(request["old_regno"]):
+                    raise KeyError(request["old_regno"])
+                self.book.update_user(request["old_regno"], request["record"])
+            elif op == "delete":
+                self.book.delete_user(request["regno"])
+            else:
+                raise ValueError(f"Unknown users op: {op}")
+            self.users_version += 1
+            return {"version": self.users_version}
+
+    # ----- HTTP -----
+    async def route(self, method, target, body):
+        loop = asyncio.get_running_loop()
+        url = urlsplit(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        try:
+            if method == "POST" and path == "/events":
+                return 200, await loop.run_in_executor(None, self.apply_events, json.loads(body)["events"]), {}
+            if method == "GET" and path == "/changes":
+                if query.get("epoch") != self.epoch:
+                    return 409, {"epoch": self.epoch, "seq": len(self.log)}, {}
+                return 200, await loop.run_in_executor(None, self.changes, int(query.get("since", 0)),
+                                                       int(query.get("limit", CHANGES_LIMIT))), {}
+            if method == "GET" and path == "/rows":
+                return 200, await loop.run_in_executor(None, self.rows_from, query.get("date_from")), {}
+            if method == "GET" and path == "/snapshot":
+                data, seq = await loop.run_in_executor(None, self.snapshot)
+                return 200, data, {"Content-Type": "text/csv", "X-Epoch": self.epoch, "X-Seq": str(seq)}
+            if method == "GET" and path == "/users":
+                return 200, await loop.run_in_executor(None, self.users, int(query.get("version", -1))), {}
+            if method == "POST" and path == "/users":
+                return 200, await loop.run_in_executor(None, self.update_users, json.loads(body)), {}
+            if method == "GET" and path == "/metrics":
+                return 200, METRICS.prometheus_text().encode(), {"Content-Type": "text/plain; version=0.0.4"}
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": str(e)}, {}
+        except OSError as e:
+            # Storage failed (disk full, ...): the client keeps the request and retries
+            return 503, {"error": str(e)}, {}
+        return 404, {"error": f"No route for {method} {path}"}, {}
+
+    async def handle(self, reader, writer):
+        # One task per connection; requests on it are served in order until
+        # the client closes it (keep-alive)
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode("latin-1").split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload, extra = await self.route(method, target, body)
+                if not isinstance(payload, bytes):
+                    payload = json.dumps(payload).encode()
+                    extra = {"Content-Type": "application/json", **extra}
+                head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Length: {len(payload)}"]
+                head += [f"{name}: {value}" for name, value in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def sync_loop(self, interval=1.0):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.sync)
+
+    async def serve(self, host, port, ready=None):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        syncer = asyncio.create_task(self.sync_loop())
+        if ready is not None:
+            ready(self.server.sockets[0].getsockname()[1])
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            syncer.cancel()
+            # Idle keep-alive connections would otherwise outlive the server
+            for writer in list(self.connections):
+                writer.close()
+
+    def close(self):
+        self.events_fh.close()
+        self.book.close()
+
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 503: "Service Unavailable"}
+
+
+def load_event_ids(path):
+    # Event IDs of the last EVENT_ID_DAYS days; older uploads can no longer
+    # be retried by any client
+    cutoff = (datetime.now() - timedelta(days=EVENT_ID_DAYS)).strftime("%Y-%m-%d")
+    seen = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                event_id, _, day = line.strip().partition(",")
+                if event_id.startswith("-"):
+                    # Written, then not applied (forget_event)
+                    seen.discard(event_id[1:])
+                elif day >= cutoff:
+                    seen.add(event_id)
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve attendance to several scanning kiosks")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to accept kiosks on the network")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", default="users.csv")
+    parser.add_argument("--attendance", default="attendance.csv")
+    parser.add_argument("--journal", default="attendance.journal")
+    parser.add_argument("--db", default="attendance.db")
+    parser.add_argument("--backend", choices=("csv", "sqlite", "partitioned"), default="csv")
+    parser.add_argument("--compact-every", type=int, default=2000)
+    parser.add_argument("--aggregates", default="attendance_aggregates.pkl")
+    parser.add_argument("--events", default="server_events.log", help="IDs of applied scan events")
+    add_partition_arguments(parser)
+    add_policy_arguments(parser)
+    args = parser.parse_args()
+
+    storage = open_storage(args.backend, args.users, args.attendance, args.journal, args.db,
+                           compact_every=args.compact_every, **partition_options(args))
+    book = AttendanceBook(storage, aggregates_file=args.aggregates, policy=policy_from_args(args))
+    server = AttendanceServer(book, args.events)
+    METRICS.enable()
+    try:
+        asyncio.run(server.serve(args.host, args.port,
+                                 ready=lambda port: print(f"Serving attendance on http://{args.host}:{port}")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Compact in-memory attendance history. RegNos are interned to int32 ids,
+# dates kept as int32 day ordinals and times as int32 seconds since midnight
+# (OPEN = no OutTime yet), in typed arrays that grow a chunk at a time: a scan
+# appends in amortized O(1) and a row costs 16 bytes instead of four Python
+# strings. A DataFrame with the usual string columns is built only on demand
+# (compaction, export, history). Values that do not parse as a date/time are
+# kept as INVALID and come back as "".
+
+CHUNK_ROWS = 65536
+OPEN = -1
+INVALID = -1
+
+_time_strings = None
+
+
+def time_strings():
+    # "HH:MM:SS" for every second of the day; the trailing "" is what
+    # OPEN / INVALID (-1) index to
+    global _time_strings
+    if _time_strings is None:
+        _time_strings = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)] + [""],
+                                 dtype=object)
+    return _time_strings
+
+
+def parse_time(value):
+    try:
+        h, m, s = str(value).split(":")
+        seconds = int(h) * 3600 + int(m) * 60 + int(s)
+    except ValueError:
+        return INVALID
+    return seconds if 0 <= seconds < 86400 else INVALID
+
+
+def format_time(seconds):
+    return time_strings()[seconds]
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(str(value)).toordinal()
+    except ValueError:
+        return INVALID
+
+
+def format_date(ordinal):
+    return date.fromordinal(int(ordinal)).isoformat() if ordinal > 0 else ""
+
+
+def codes_for(values, parse):
+    # Parse each distinct value once and broadcast through factorize codes
+    codes, uniques = pd.factorize(values.fillna("").astype(str))
+    lookup = np.array([parse(u) for u in uniques] + [INVALID], dtype=np.int32)
+    return lookup[codes]
+
+
+class AttendanceStore:
+    def __init__(self, capacity=CHUNK_ROWS):
+        self.regnos = []
+        self.regno_ids = {}
+        self.n = 0
+        self.reg = np.empty(capacity, dtype=np.int32)
+        self.day = np.empty(capacity, dtype=np.int32)
+        self.tin = np.empty(capacity, dtype=np.int32)
+        self.tout = np.empty(capacity, dtype=np.int32)
+        self.day_ordinals = {}
+
+    def __len__(self):
+        return self.n
+
+    @classmethod
+    def from_frame(cls, df):
+        n = len(df)
+        store = cls(capacity=max(CHUNK_ROWS, -(-n // CHUNK_ROWS) * CHUNK_ROWS))
+        codes, uniques = pd.factorize(df['RegNo'].fillna("").astype(str))
+        store.regnos = [str(u) for u in uniques]
+        store.regno_ids = {regno: i for i, regno in enumerate(store.regnos)}
+        store.reg[:n] = codes
+        store.day[:n] = codes_for(df['Date'], parse_date)
+        store.tin[:n] = codes_for(df['InTime'], parse_time)
+        store.tout[:n] = codes_for(df['OutTime'], parse_time)
+        store.n = n
+        return store
+
+    def to_frame(self, positions=None):
+        select = slice(0, self.n) if positions is None else np.asarray(positions, dtype=np.int64)
+        days = self.day[:self.n][select]
+        unique_days, day_codes = np.unique(days, return_inverse=True)
+        date_strings = np.array([format_date(d) for d in unique_days], dtype=object)
+        return pd.DataFrame({
+            "RegNo": np.array(self.regnos, dtype=object)[self.reg[:self.n][select]],
+            "Date": date_strings[day_codes],
+            "InTime": time_strings()[self.tin[:self.n][select]],
+            "OutTime": pd.array(time_strings()[self.tout[:self.n][select]], dtype="string"),
+        })
+
+    def copy(self):
+        # Point-in-time copy (e.g. for background compaction)
+        other = AttendanceStore(capacity=max(1, self.n))
+        other.regnos = list(self.regnos)
+        other.regno_ids = dict(self.regno_ids)
+        for name in ("reg", "day", "tin", "tout"):
+            getattr(other, name)[:self.n] = getattr(self, name)[:self.n]
+        other.n = self.n
+        return other
+
+    def nbytes(self):
+        return sum(getattr(self, name)[:self.n].nbytes for name in ("reg", "day", "tin", "tout"))
+
+    # ----- Appends -----
+    def reserve(self, extra):
+        needed = self.n + extra
+        capacity = len(self.reg)
+        if needed <= capacity:
+            return
+        # Grow by half the current size, at least a chunk, rounded to chunks
+        capacity = max(needed, capacity + max(CHUNK_ROWS, capacity // 2))
+        capacity = -(-capacity // CHUNK_ROWS) * CHUNK_ROWS
+        for name in ("reg", "day", "tin", "tout"):
+            grown = np.empty(capacity, dtype=np.int32)
+            grown[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, grown)
+
+    def intern(self, regno):
+        rid = self.regno_ids.get(regno)
+        if rid is None:
+            rid = len(self.regnos)
+            self.regnos.append(regno)
+            self.regno_ids[regno] = rid
+        return rid
+
+    def ordinal(self, day):
+        ordinal = self.day_ordinals.get(day)
+        if ordinal is None:
+            ordinal = self.day_ordinals[day] = parse_date(day)
+        return ordinal
+
+    def append(self, regno, day, in_time, out_time=""):
+        self.reserve(1)
+        pos = self.n
+        self.reg[pos] = self.intern(regno)
+        self.day[pos] = self.ordinal(day)
+        self.tin[pos] = parse_time(in_time)
+        self.tout[pos] = parse_time(out_time) if out_time else OPEN
+        self.n += 1
+        return pos
+
+    def set_out(self, pos, out_time):
+        self.tout[pos] = parse_time(out_time)
+
+    # ----- Rows -----
+    def regno(self, pos):
+        return self.regnos[self.reg[pos]]
+
+    def date(self, pos):
+        return format_date(self.day[pos])
+
+    def in_time(self, pos):
+        return format_time(self.tin[pos])
+
+    def out_time(self, pos):
+        return format_time(self.tout[pos])
+
+    def is_open(self, pos):
+        return self.tout[pos] == OPEN
+
+    def row(self, pos):
+        return self.regno(pos), self.date(pos), self.in_time(pos), self.out_time(pos)
+
+    # ----- Columns (views, no copies) -----
+    def ids(self):
+        return self.reg[:self.n]
+
+    def days(self):
+        return self.day[:self.n]
+
+    def in_seconds(self):
+        return self.tin[:self.n]
+
+    def out_seconds(self):
+        return self.tout[:self.n]
+
+    # ----- Vectorized lookups -----
+    def positions_of(self, regnos):
+        ids = [self.regno_ids[r] for r in regnos if r in self.regno_ids]
+        return np.flatnonzero(np.isin(self.ids(), ids))
+
+    def positions_on(self, day):
+        return np.flatnonzero(self.days() == self.ordinal(day))
+
+    def in_date_range(self, positions, date_from=None, date_to=None):
+        positions = np.asarray(positions, dtype=np.int64)
+        days = self.day[positions]
+        mask = np.ones(len(positions), dtype=bool)
+        if date_from:
+            mask &= days >= self.ordinal(date_from)
+        if date_to:
+            mask &= days <= self.ordinal(date_to)
+        return positions[mask]
+
+    def sort_key(self, pos):
+        # One row's place in sorted_positions() order
+        return int(self.day[pos]), int(self.tin[pos])
+
+    def sorted_positions(self, positions=None):
+        # (Date, InTime) order, stable for ties
+        positions = np.arange(self.n) if positions is None else np.asarray(positions, dtype=np.int64)
+        return positions[np.lexsort((self.tin[positions], self.day[positions]))]
@@ -0,0 +1,66 @@
+# Compares the per-scan cost of the old DataFrame-mask lookups in
+# mark_attendance with AttendanceIndex + SessionEngine, for growing
+# attendance history.
+#
+#   python benchmarks/bench_index.py [--rows 10000 100000 1000000]
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from attendance_index import AttendanceIndex
+from attendance_store import AttendanceStore
+from sessions import SessionEngine, SessionPolicy
+from synthetic import synthetic_frames
+
+
+def mask_lookup(users, attendance, regno, today):
+    if regno not in users['RegNo'].values:
+        return None
+    users[users['RegNo'] == regno].iloc[0]
+    user_today = attendance[(attendance['RegNo'] == regno) & (attendance['Date'] == today)]
+    return user_today[user_today['OutTime'] == ""].index
+
+
+def index_lookup(index, sessions, regno):
+    if index.get_user(regno) is None:
+        return None
+    return sessions.open_session(regno)
+
+
+def bench(fn, regnos):
+    start = time.perf_counter()
+    for regno in regnos:
+        fn(regno)
+    return (time.perf_counter() - start) / len(regnos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--scans", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'mask us/scan':>14} {'index us/scan':>14} {'index build ms':>15}")
+    for n_rows in args.rows:
+        users, attendance, today = synthetic_frames(n_rows)
+        regnos = random.Random(0).choices(list(users['RegNo']), k=args.scans)
+
+        store = AttendanceStore.from_frame(attendance)
+        start = time.perf_counter()
+        index = AttendanceIndex(users)
+        sessions = SessionEngine(store, SessionPolicy(), now=datetime.fromisoformat(today))
+        build = time.perf_counter() - start
+
+        mask = bench(lambda r: mask_lookup(users, attendance, r, today), regnos[:max(1, args.scans // 10)])
+        indexed = bench(lambda r: index_lookup(index, sessions, r), regnos)
+        print(f"{n_rows:>10} {mask * 1e6:>14.1f} {indexed * 1e6:>14.2f} {build * 1e3:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
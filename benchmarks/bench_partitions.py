@@ -0,0 +1,71 @@
+# Startup time and resident attendance for the single-CSV backend versus the
+# month-partitioned one, as history grows, plus the cost of a date-range
+# search reaching a month in the compressed archive.
+#
+#   python benchmarks/bench_partitions.py [--months 6 12 24] [--users 1000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from attendance_core import AttendanceBook
+from partitions import month_start
+from storage import open_storage
+from synthetic import synthetic_frames
+
+
+def write_history(data_dir, months, n_users):
+    # One row per user per day for the last `months` months, ending today
+    users, attendance, last = synthetic_frames(n_users * 30 * months, n_users)
+    shift = date.today() - date.fromisoformat(last)
+    dates = {d: (date.fromisoformat(d) + shift).isoformat() for d in attendance['Date'].unique()}
+    attendance['Date'] = attendance['Date'].map(dates)
+    users.to_csv(os.path.join(data_dir, "users.csv"), index=False)
+    attendance.to_csv(os.path.join(data_dir, "attendance.csv"), index=False)
+    return len(attendance)
+
+
+def load(data_dir, backend):
+    storage = open_storage(backend, os.path.join(data_dir, "users.csv"), os.path.join(data_dir, "attendance.csv"),
+                           os.path.join(data_dir, f"{backend}.journal"), os.path.join(data_dir, "attendance.db"),
+                           partition_dir=os.path.join(data_dir, "partitions"))
+    start = time.perf_counter()
+    book = AttendanceBook(storage, aggregates_file=os.path.join(data_dir, f"{backend}_aggregates.pkl"))
+    return book, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, nargs="+", default=[6, 12, 24])
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'months':>6} {'rows':>9} {'csv load ms':>12} {'csv MB':>7} {'part load ms':>13} {'part MB':>8} "
+          f"{'archive month ms':>17}")
+    for months in args.months:
+        with tempfile.TemporaryDirectory() as tmp:
+            n_rows = write_history(tmp, months, args.users)
+            results = []
+            for backend in ("csv", "partitioned"):
+                load(tmp, backend)[0].close()  # first start writes snapshots / partitions
+                book, elapsed = load(tmp, backend)
+                results.append((elapsed, book.attendance.nbytes() / 1e6))
+                if backend == "partitioned":
+                    month = month_start(date.today(), 4)
+                    end = (date.fromisoformat(f"{month_start(date.today(), 3)}-01") - timedelta(days=1)).isoformat()
+                    start = time.perf_counter()
+                    book.history(f"{month}-01", end)
+                    archive = time.perf_counter() - start
+                book.close()
+            (csv_s, csv_mb), (part_s, part_mb) = results
+            print(f"{months:>6} {n_rows:>9} {csv_s * 1e3:>12.0f} {csv_mb:>7.1f} {part_s * 1e3:>13.0f} "
+                  f"{part_mb:>8.1f} {archive * 1e3:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Attendance report over a partitioned history: the per-row pandas groupby the
+# report would otherwise need, against reports.py run inline and on a
+# process pool (one task per month).
+#
+#   python benchmarks/bench_reports.py [--months 6 12 24] [--users 1000] [--workers 4]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+import pandas as pd
+
+from attendance_store import parse_time
+from bench_partitions import load, write_history
+from reports import ReportParams, build_report, report_tasks
+
+
+def pandas_report(book, work_start, work_end, grace_min):
+    # Whole history as one frame, one groupby per (user, day) then per user.
+    # The thresholds are worked out here rather than taken from ReportParams,
+    # so the cross-check also covers how the report parses them
+    grace = grace_min * 60
+    late_after = pd.Timedelta(work_start + ":00").total_seconds() + grace
+    early_before = pd.Timedelta(work_end + ":00").total_seconds() - grace
+    att = pd.concat(list(book.storage.read_archive()) + [book.attendance.to_frame()], ignore_index=True)
+    tin = att['InTime'].map(parse_time)
+    tout = att['OutTime'].map(lambda value: parse_time(value) if value else -1)
+    att = att.assign(tin=tin, closed=tout >= 0, seconds=np.where(tout >= 0, (tout - tin) % 86400, 0),
+                     end=np.where(tout < 0, 10 ** 9, np.where(tout >= tin, tout, tout + 86400)))
+    days = att.groupby(['RegNo', 'Date']).agg(first=('tin', 'min'), end=('end', 'max'), n=('tin', 'size'),
+                                              seconds=('seconds', 'sum'))
+    days['late'] = days['first'] > late_after
+    days['early'] = days['end'] < early_before
+    return days.groupby(level=0).agg(Days=('n', 'size'), Late=('late', 'sum'), Early=('early', 'sum'),
+                                     Sessions=('n', 'sum'), Seconds=('seconds', 'sum'))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, nargs="+", default=[6, 12, 24])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    work_start, work_end, grace_min = "09:00", "17:00", 5
+    params = ReportParams(work_start=work_start, work_end=work_end, grace_min=grace_min)
+    print(f"{'months':>6} {'rows':>9} {'pandas ms':>10} {'inline ms':>10} {f'{args.workers} workers ms':>14}")
+    for months in args.months:
+        with tempfile.TemporaryDirectory() as tmp:
+            n_rows = write_history(tmp, months, args.users)
+            load(tmp, "partitioned")[0].close()  # first start writes the partitions
+            book, _ = load(tmp, "partitioned")
+            expected, pandas_s = timed(lambda: pandas_report(book, work_start, work_end, grace_min))
+            inline, inline_s = timed(lambda: build_report(report_tasks(book), params, book.users, workers=1))
+            pooled, pool_s = timed(lambda: build_report(report_tasks(book), params, book.users,
+                                                        workers=args.workers, pool_min_rows=0))
+            book.close()
+            assert inline.equals(pooled)
+            totals = inline.set_index('RegNo')
+            assert (totals['Late'] == expected['Late']).all()
+            assert (totals['Early'] == expected['Early']).all()
+            print(f"{months:>6} {n_rows:>9} {pandas_s * 1e3:>10.0f} {inline_s * 1e3:>10.0f} {pool_s * 1e3:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# End-to-end scan benchmark: replays synthetic QR frames through the headless
+# engine against synthetic users.csv/attendance.csv of growing size.
+#
+#   python benchmarks/bench_scan.py [--rows 10000 100000 1000000] [--backend csv]
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import headless
+from synthetic import write_dataset, write_qr_frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--backend", choices=("csv", "sqlite"), default="csv")
+    parser.add_argument("--strategy", default="downscale")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'load ms':>9} {'frames/s':>9} {'scans/s':>8} {'decode p50/p95/p99 ms':>24} "
+          f"{'persist p50/p95/p99 ms':>24}")
+    with tempfile.TemporaryDirectory() as tmp:
+        frames_dir = os.path.join(tmp, "frames")
+        for n_rows in args.rows:
+            data_dir = os.path.join(tmp, str(n_rows))
+            users = write_dataset(data_dir, n_rows)
+            if not os.path.isdir(frames_dir):
+                write_qr_frames(frames_dir, list(users["RegNo"]), args.frames)
+            run_args = headless.build_parser().parse_args([
+                "--source", frames_dir,
+                "--users", os.path.join(data_dir, "users.csv"),
+                "--attendance", os.path.join(data_dir, "attendance.csv"),
+                "--journal", os.path.join(data_dir, "attendance.journal"),
+                "--db", os.path.join(data_dir, "attendance.db"),
+                "--backend", args.backend,
+                "--strategy", args.strategy,
+                "--workers", str(args.workers),
+                "--cooldown", "0.5",
+                "--min-gap", "0",
+            ])
+            r = headless.run(run_args)
+            d, p = r["decode_ms"], r["persist_ms"]
+            print(f"{n_rows:>10} {r['load_s'] * 1000:>9.0f} {r['frames_per_s']:>9.1f} {r['scans_per_s']:>8.1f} "
+                  f"{d[50]:>8.2f}/{d[95]:.2f}/{d[99]:.2f} {p[50]:>12.3f}/{p[95]:.3f}/{p[99]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Startup benchmark: how long until the window can be shown (importing main,
+# in a fresh interpreter) and how long the background loader then takes to
+# have users and attendance ready, parsing the CSV versus reading the binary
+# snapshot, for growing attendance history.
+#
+#   python benchmarks/bench_startup.py [--rows 10000 100000 1000000]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from attendance_core import AttendanceBook
+from snapshot import snapshot_dir_for
+from storage import CsvStorage
+from synthetic import write_dataset
+
+
+def import_time(statement):
+    # Best of a few fresh interpreters, so the OS file cache is warm like on a kiosk
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    return min(float(subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)) for _ in range(3))
+
+
+def load_book(data_dir):
+    start = time.perf_counter()
+    storage = CsvStorage(os.path.join(data_dir, "users.csv"), os.path.join(data_dir, "attendance.csv"),
+                         os.path.join(data_dir, "attendance.journal"))
+    book = AttendanceBook(storage, aggregates_file=os.path.join(data_dir, "attendance_aggregates.pkl"))
+    elapsed = time.perf_counter() - start
+    book.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"import main (window can show): {import_time('import main') * 1000:.0f} ms")
+    print(f"eager imports it replaced:     "
+          f"{import_time('import cv2, pandas, PIL.ImageTk') * 1000:.0f} ms (cv2 + pandas + Pillow)")
+    print()
+    print(f"{'rows':>10} {'cold load ms':>13} {'snapshot load ms':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            data_dir = os.path.join(tmp, str(n_rows))
+            write_dataset(data_dir, n_rows)
+            # First start parses the CSV and writes the snapshot and aggregates
+            cold = load_book(data_dir)
+            warm = load_book(data_dir)
+            assert os.path.isdir(snapshot_dir_for(os.path.join(data_dir, "attendance.csv")))
+            print(f"{n_rows:>10} {cold * 1000:>13.0f} {warm * 1000:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
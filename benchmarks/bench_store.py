@@ -0,0 +1,52 @@
+# Memory and append cost of the compact AttendanceStore against the string
+# DataFrame it replaces (with the old per-scan pd.concat), for growing
+# attendance history.
+#
+#   python benchmarks/bench_store.py [--rows 10000 100000 1000000]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+
+from attendance_store import AttendanceStore
+from synthetic import synthetic_frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--appends", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'frame MB':>9} {'store MB':>9} {'ratio':>6} {'concat us/scan':>15} {'append us/scan':>15}")
+    for n_rows in args.rows:
+        _, attendance, today = synthetic_frames(n_rows)
+        # As read back from attendance.csv: plain string columns
+        attendance = attendance.astype(object).astype({"OutTime": "string"})
+        store = AttendanceStore.from_frame(attendance)
+        frame_mb = attendance.memory_usage(deep=True).sum() / 1e6
+        store_mb = store.nbytes() / 1e6
+
+        new_entry = {"RegNo": attendance.at[0, 'RegNo'], "Date": today, "InTime": "09:00:00", "OutTime": ""}
+        n_concat = max(1, args.appends // 10)
+        start = time.perf_counter()
+        for _ in range(n_concat):
+            attendance = pd.concat([attendance, pd.DataFrame([new_entry])], ignore_index=True)
+        concat = (time.perf_counter() - start) / n_concat
+
+        start = time.perf_counter()
+        for _ in range(args.appends):
+            store.append(new_entry["RegNo"], today, "09:00:00")
+        append = (time.perf_counter() - start) / args.appends
+
+        print(f"{n_rows:>10} {frame_mb:>9.1f} {store_mb:>9.1f} {frame_mb / store_mb:>6.1f} "
+              f"{concat * 1e6:>15.0f} {append * 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Kiosk -> server upload throughput on localhost: scan events per second for
+# one request per event versus batched uploads, with a fresh connection per
+# request versus the client's keep-alive pool.
+#
+#   python benchmarks/bench_sync.py [--events 2000] [--batch 1 20 200]
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+
+from attendance_client import ConnectionPool
+from attendance_core import AttendanceBook
+from attendance_server import TIME_FORMAT, AttendanceServer
+from storage import CsvStorage
+from synthetic import write_dataset
+
+
+def start_server(data_dir):
+    book = AttendanceBook(CsvStorage(os.path.join(data_dir, "users.csv"), os.path.join(data_dir, "attendance.csv"),
+                                     os.path.join(data_dir, "attendance.journal")))
+    server = AttendanceServer(book, os.path.join(data_dir, "server_events.log"))
+    ready = threading.Event()
+    port = []
+    threading.Thread(target=asyncio.run, daemon=True,
+                     args=(server.serve("127.0.0.1", 0, ready=lambda p: (port.append(p), ready.set())),)).start()
+    ready.wait()
+    return server, f"http://127.0.0.1:{port[0]}"
+
+
+def make_events(regnos, n, day):
+    # Two scans (in, out) per user on a day of their own so every event is applied
+    start = datetime.now().replace(microsecond=0, hour=0, minute=0, second=0) + timedelta(days=day)
+    return [{"id": uuid.uuid4().hex, "terminal": "bench", "regno": regnos[(i // 2) % len(regnos)],
+             "time": (start + timedelta(seconds=i)).strftime(TIME_FORMAT)} for i in range(n)]
+
+
+def upload(url, events, batch, pooled):
+    pool = ConnectionPool(url)
+    start = time.perf_counter()
+    for i in range(0, len(events), batch):
+        if not pooled:
+            pool.close()
+        pool.json("POST", "/events", {"events": events[i:i + batch]})
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return len(events) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 20, 200])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(tmp, 10_000)
+        regnos = pd.read_csv(os.path.join(tmp, "users.csv"))["RegNo"].tolist()
+        server, url = start_server(tmp)
+        print(f"{'batch':>6} {'new conn ev/s':>14} {'pooled ev/s':>12}")
+        for i, batch in enumerate(args.batch):
+            fresh = upload(url, make_events(regnos, args.events, 2 * i + 1), batch, pooled=False)
+            pooled = upload(url, make_events(regnos, args.events, 2 * i + 2), batch, pooled=True)
+            print(f"{batch:>6} {fresh:>14.0f} {pooled:>12.0f}")
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Cost of a burst of admin edits (add, modify, delete) for growing user
+# tables: the old path rewrote users.csv and rebuilt the frame per edit, the
+# AttendanceBook now updates the records involved and saves once per batch.
+#
+#   python benchmarks/bench_users.py [--users 1000 10000 50000] [--edits 50]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+
+from attendance_core import AttendanceBook
+from storage import CsvStorage
+from synthetic import write_dataset
+
+
+def new_user(i):
+    return {"RegNo": f"2099-New{i}_User_Bench", "FirstName": f"New{i}", "LastName": "User", "Mobile": "9000000000",
+            "BloodGroup": "O+", "Department": "Bench", "Position": "Staff"}
+
+
+def old_edits(users, path, edits):
+    # What add_user / modify_user / delete_user used to do per edit
+    for i in range(edits):
+        users = pd.concat([users, pd.DataFrame([new_user(i)])], ignore_index=True)
+        users.to_csv(path, index=False)
+        users.at[len(users) - 1, "Position"] = "Lead"
+        users.to_csv(path, index=False)
+        users = users[users["RegNo"] != new_user(i)["RegNo"]].reset_index(drop=True)
+        users.to_csv(path, index=False)
+
+
+def book_edits(book, edits):
+    for i in range(edits):
+        record = new_user(i)
+        book.add_user(record)
+        book.update_user(record["RegNo"], {"Position": "Lead"})
+        book.delete_user(record["RegNo"])
+    book.save_users()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--edits", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'old ms/edit':>12} {'book ms/edit':>13}")
+    for n_users in args.users:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_dataset(tmp, 1_000, n_users=n_users)
+            users_file = os.path.join(tmp, "users.csv")
+
+            start = time.perf_counter()
+            old_edits(pd.read_csv(users_file), users_file, args.edits)
+            old = (time.perf_counter() - start) / (3 * args.edits)
+
+            book = AttendanceBook(CsvStorage(users_file, os.path.join(tmp, "attendance.csv"),
+                                             os.path.join(tmp, "attendance.journal")))
+            start = time.perf_counter()
+            book_edits(book, args.edits)
+            new = (time.perf_counter() - start) / (3 * args.edits)
+            book.close()
+            print(f"{n_users:>8} {old * 1e3:>12.2f} {new * 1e3:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
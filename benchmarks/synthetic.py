@@ -0,0 +1,82 @@
+# Synthetic users/attendance data and QR frames for the benchmarks.
+#
+#   python benchmarks/synthetic.py --rows 100000 --frames 300 --out /tmp/bench
+
+import argparse
+import os
+from datetime import date, timedelta
+
+import cv2
+import numpy as np
+import pandas as pd
+
+
+def synthetic_frames(n_rows, n_users=5000):
+    # users and attendance DataFrames shaped like users.csv/attendance.csv,
+    # plus the date of the last (partially filled) day
+    regnos = np.array([f"2024-First{i}_Last{i}_Dept{i % 20}" for i in range(n_users)], dtype=object)
+    users = pd.DataFrame({
+        "RegNo": regnos,
+        "FirstName": [f"First{i}" for i in range(n_users)],
+        "LastName": [f"Last{i}" for i in range(n_users)],
+        "Mobile": [f"9{i:09d}" for i in range(n_users)],
+        "BloodGroup": ["O+"] * n_users,
+        "Department": [f"Dept{i % 20}" for i in range(n_users)],
+        "Position": ["Staff"] * n_users,
+    })
+    n_days = max(1, n_rows // n_users)
+    start = date(2020, 1, 1)
+    days = np.array([(start + timedelta(days=d)).isoformat() for d in range(n_days + 1)], dtype=object)
+    rng = np.random.default_rng(0)
+    attendance = pd.DataFrame({
+        "RegNo": regnos[np.arange(n_rows) % n_users],
+        "Date": days[np.minimum(np.arange(n_rows) // n_users, n_days)],
+        "InTime": "09:00:00",
+        "OutTime": pd.array(np.where(rng.random(n_rows) < 0.5, "17:00:00", ""), dtype="string"),
+    })
+    return users, attendance, days[-1]
+
+
+def write_dataset(out_dir, n_rows, n_users=5000):
+    os.makedirs(out_dir, exist_ok=True)
+    users, attendance, _ = synthetic_frames(n_rows, n_users)
+    users.to_csv(os.path.join(out_dir, "users.csv"), index=False)
+    attendance.to_csv(os.path.join(out_dir, "attendance.csv"), index=False)
+    return users
+
+
+def write_qr_frames(out_dir, regnos, n_frames=300, repeat=3, size=(640, 480), seed=0):
+    # Each code is held for `repeat` frames (like a badge held up to the
+    # camera) followed by an empty frame
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    encoder = cv2.QRCodeEncoder.create()
+    width, height = size
+    codes = {}
+    i = 0
+    for n in range(n_frames):
+        frame = np.full((height, width, 3), 235, dtype=np.uint8)
+        if n % (repeat + 1) != repeat:
+            regno = regnos[i % len(regnos)]
+            if regno not in codes:
+                qr = cv2.resize(encoder.encode(regno), None, fx=5, fy=5, interpolation=cv2.INTER_NEAREST)
+                codes[regno] = cv2.copyMakeBorder(qr, 20, 20, 20, 20, cv2.BORDER_CONSTANT, value=255)
+            qr = codes[regno]
+            y = int(rng.integers(0, height - qr.shape[0]))
+            x = int(rng.integers(0, width - qr.shape[1]))
+            frame[y:y + qr.shape[0], x:x + qr.shape[1]] = qr[..., None]
+        else:
+            i += 1
+        cv2.imwrite(os.path.join(out_dir, f"{n:06d}.png"), frame)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--out", default="bench_data")
+    args = parser.parse_args()
+    users = write_dataset(args.out, args.rows, args.users)
+    write_qr_frames(os.path.join(args.out, "frames"), list(users["RegNo"]), args.frames)
+    print(f"Wrote {args.rows} attendance rows, {args.users} users and {args.frames} frames to {args.out}")
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import SCANS_SUPPRESSED, SCANS_TOO_SOON
+
+# Duplicate-scan suppression shared by every gate, in front of the write path.
+# Per RegNo it remembers when the code was last decoded and when the user's
+# last accepted check-in happened, in an LRU ordered by last sighting whose
+# entries expire once neither window can apply any more (and that is capped
+# at `capacity` users):
+#   - a code decoded again within cooldown_s of its last sighting is a repeat
+#     of the same presentation (a badge held up, or two badges alternating)
+#     and dropped; each sighting extends the window
+#   - a scan that would turn a check-in into a check-out less than
+#     min_gap_s after it is refused before reaching the book
+# Both are counted; only the first refused check-out of a presentation is
+# reported back so the user sees why nothing happened.
+
+SUPPRESSED = "repeat"
+TOO_SOON = "too_soon"
+
+
+class ScanDeduper:
+    def __init__(self, cooldown_s=2.0, min_gap_s=60.0, capacity=4096, clock=time.monotonic):
+        self.cooldown_s = cooldown_s
+        self.min_gap_s = min_gap_s
+        self.ttl = max(cooldown_s, min_gap_s)
+        self.capacity = capacity
+        self.clock = clock
+        self.lock = threading.Lock()
+        # RegNo -> [last sighting, accepted check-in time or None]
+        self.entries = OrderedDict()
+        self.counts = {SUPPRESSED: 0, TOO_SOON: 0}
+
+    def check(self, regno):
+        # None if the scan should be marked, else why it is suppressed
+        with self.lock:
+            now = self.clock()
+            self.expire(now)
+            entry = self.entries.get(regno)
+            if entry is None:
+                self.entries[regno] = [now, None]
+                if len(self.entries) > self.capacity:
+                    self.entries.popitem(last=False)
+                return None
+            last_seen, checked_in = entry
+            entry[0] = now
+            self.entries.move_to_end(regno)
+            if now - last_seen < self.cooldown_s:
+                reason = SUPPRESSED
+            elif checked_in is not None and now - checked_in < self.min_gap_s:
+                reason = TOO_SOON
+            else:
+                return None
+            self.counts[reason] += 1
+        (SCANS_SUPPRESSED if reason == SUPPRESSED else SCANS_TOO_SOON).inc()
+        return reason
+
+    def marked(self, regno, action):
+        # Outcome of a scan check() let through
+        with self.lock:
+            entry = self.entries.get(regno)
+            if entry is not None:
+                entry[1] = entry[0] if action == "in" else None
+
+    def wait_left(self, regno):
+        # Seconds until regno may check out
+        with self.lock:
+            entry = self.entries.get(regno)
+            if entry is None or entry[1] is None:
+                return 0.0
+            return max(0.0, self.min_gap_s - (self.clock() - entry[1]))
+
+    def expire(self, now):
+        while self.entries:
+            regno, (last_seen, _) = next(iter(self.entries.items()))
+            if now - last_seen < self.ttl:
+                break
+            del self.entries[regno]
@@ -0,0 +1,118 @@
+import gzip
+import threading
+
+from storage import EXPORT_COLUMNS
+
+# Streaming attendance export. Chunks come straight from the storage backend
+# and are written as they arrive, so memory stays flat however many rows are
+# exported. Columnar formats need pyarrow; without it only CSV and gzip CSV
+# are offered.
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = {
+    "csv": ("CSV files", "*.csv"),
+    "csv.gz": ("Compressed CSV files", "*.csv.gz"),
+    "parquet": ("Parquet files", "*.parquet"),
+    "feather": ("Feather files", "*.feather"),
+}
+
+
+def available_formats():
+    if pa is None:
+        return ["csv", "csv.gz"]
+    return list(EXPORT_FORMATS)
+
+
+def format_for_path(path):
+    for fmt in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if path.lower().endswith("." + fmt):
+            return fmt
+    return "csv"
+
+
+class CsvSink:
+    def __init__(self, path, compressed=False):
+        self.fh = gzip.open(path, "wt", newline="") if compressed else open(path, "w", newline="")
+        self.header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self.fh, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            self.fh.write(",".join(EXPORT_COLUMNS) + "\n")
+        self.fh.close()
+
+
+class ArrowSink:
+    # Parquet row groups / Feather (Arrow IPC) record batches, one per chunk
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.schema = pa.schema([(col, pa.string()) for col in EXPORT_COLUMNS])
+        if fmt == "parquet":
+            self.writer = pa.parquet.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+    def write(self, chunk):
+        table = pa.Table.from_pandas(chunk.astype("string"), schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+def open_sink(path, fmt):
+    if fmt in ("parquet", "feather"):
+        if pa is None:
+            raise RuntimeError(f"{fmt} export requires pyarrow (pip install pyarrow)")
+        return ArrowSink(path, fmt)
+    return CsvSink(path, compressed=(fmt == "csv.gz"))
+
+
+class ExportJob:
+    # Runs an export on a background thread; the UI polls rows/progress/done
+    def __init__(self, chunks, path, fmt=None):
+        self.chunks = chunks
+        self.path = path
+        self.fmt = fmt or format_for_path(path)
+        self.rows = 0
+        self.progress = 0.0
+        self.done = False
+        self.error = None
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        try:
+            sink = open_sink(self.path, self.fmt)
+            try:
+                for chunk, progress in self.chunks:
+                    if self.cancelled.is_set():
+                        break
+                    if len(chunk):
+                        sink.write(chunk[EXPORT_COLUMNS])
+                        self.rows += len(chunk)
+                    self.progress = progress
+            finally:
+                sink.close()
+                self.chunks.close()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
@@ -0,0 +1,152 @@
+import io
+import math
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from array import array
+
+from metrics import SOUND_ERRORS, SOUNDS_COALESCED, SOUNDS_PLAYED
+
+# Scan feedback sounds, played on a worker thread so a beep never holds up the
+# Tk loop or the scan pipeline. success.wav / error.wav are read once at
+# startup (a synthesized tone stands in when a file is missing or not a
+# readable WAV) and handed to the first available player: winsound on
+# Windows, simpleaudio if installed, else a command-line player started per
+# beep - aplay/paplay read the preloaded WAV from stdin, afplay only takes a
+# file (synthesized tones are written to a temp file for it). Requests go
+# through a small bounded queue; a burst that arrives while a sound is playing
+# collapses into one beep (an error beep if any scan in it failed), and
+# anything past the queue is dropped rather than waited on.
+
+SOUND_FILES = {True: "success.wav", False: "error.wav"}
+# Synthesized fallback tones: (Hz, seconds), the old winsound.Beep values
+TONES = {True: (1000, 0.15), False: (400, 0.4)}
+SAMPLE_RATE = 22050
+QUEUE_SIZE = 4
+COMMAND_PLAYERS = (("aplay", "-q", "-"), ("paplay",), ("afplay",))
+# Command-line players that need a file argument rather than stdin
+FILE_PLAYERS = ("afplay",)
+
+
+class Sound:
+    def __init__(self, data, path=None):
+        # data: complete WAV file bytes
+        self.data = data
+        self.path = path
+        with wave.open(io.BytesIO(data)) as w:
+            self.channels = w.getnchannels()
+            self.sample_width = w.getsampwidth()
+            self.rate = w.getframerate()
+            self.frames = w.readframes(w.getnframes())
+
+
+def synth_tone(freq, seconds, rate=SAMPLE_RATE):
+    # 16-bit mono sine with 5 ms fades so it doesn't click
+    n = int(rate * seconds)
+    fade = max(1, int(rate * 0.005))
+    samples = array("h", (int(12000 * min(1.0, i / fade, (n - i) / fade) * math.sin(2 * math.pi * freq * i / rate))
+                          for i in range(n)))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    return Sound(buf.getvalue())
+
+
+def load_sound(path):
+    try:
+        with open(path, "rb") as fh:
+            return Sound(fh.read(), path)
+    except (OSError, EOFError, wave.Error):
+        return None
+
+
+# ----- Players: each takes a Sound and blocks until it has played -----
+def pick_player():
+    if platform.system() == "Windows":
+        import winsound
+        return "winsound", lambda sound: winsound.PlaySound(sound.data, winsound.SND_MEMORY)
+    try:
+        import simpleaudio
+    except ImportError:
+        pass
+    else:
+        return "simpleaudio", lambda sound: simpleaudio.play_buffer(
+            sound.frames, sound.channels, sound.sample_width, sound.rate).wait_done()
+    for command in COMMAND_PLAYERS:
+        if not shutil.which(command[0]):
+            continue
+        if command[0] in FILE_PLAYERS:
+            return command[0], lambda sound: subprocess.run([*command, sound.path], check=True,
+                                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return command[0], lambda sound: subprocess.run(command, input=sound.data, check=True,
+                                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return None, None
+
+
+class Feedback:
+    def __init__(self, sound_dir=".", queue_size=QUEUE_SIZE):
+        self.player_name, self.player = pick_player()
+        self.sounds = {}
+        self.temp_files = []
+        for ok, filename in SOUND_FILES.items():
+            sound = load_sound(os.path.join(sound_dir, filename)) or synth_tone(*TONES[ok])
+            if sound.path is None and self.player_name in FILE_PLAYERS:
+                # afplay needs a file for the synthesized tone
+                fd, sound.path = tempfile.mkstemp(suffix=".wav")
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(sound.data)
+                self.temp_files.append(sound.path)
+            self.sounds[ok] = sound
+        self.last_error = None
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def play(self, ok=True):
+        # Never blocks: a full queue means a burst is already waiting to play
+        if self.player is None:
+            return
+        try:
+            self.queue.put_nowait(ok)
+        except queue.Full:
+            SOUNDS_COALESCED.inc()
+
+    def run(self):
+        while True:
+            ok = self.queue.get()
+            if ok is None:
+                return
+            try:
+                while True:
+                    more = self.queue.get_nowait()
+                    if more is None:
+                        return
+                    ok = ok and more
+                    SOUNDS_COALESCED.inc()
+            except queue.Empty:
+                pass
+            try:
+                self.player(self.sounds[ok])
+                SOUNDS_PLAYED.inc()
+            except Exception as e:
+                self.last_error = e
+                SOUND_ERRORS.inc()
+
+    def close(self):
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        for path in self.temp_files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
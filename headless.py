@@ -0,0 +1,117 @@
+import argparse
+import time
+
+from attendance_core import AttendanceBook
+from metrics import METRICS
+from qr_detect import DETECT_STRATEGIES, percentiles
+from scan_engine import ScanEngine
+from partitions import add_partition_arguments, partition_options
+from sessions import add_policy_arguments, policy_from_args
+from storage import open_storage
+
+# Headless scanning service: runs the scan -> decode -> mark path without Tk
+# over cameras, video files or image directories, and reports throughput and
+# latency when the input is exhausted (or on Ctrl+C for live cameras).
+#
+#   python headless.py --source gate1.mp4 --source frames/ --users users.csv
+
+
+def run(args):
+    if args.metrics_file or args.metrics_port:
+        METRICS.enable()
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+    storage = open_storage(args.backend, args.users, args.attendance, args.journal, args.db,
+                           compact_every=args.compact_every, **partition_options(args))
+    start = time.perf_counter()
+    book = AttendanceBook(storage, policy=policy_from_args(args))
+    load_s = time.perf_counter() - start
+
+    engine = ScanEngine(book, args.source, workers_per_gate=args.workers, strategy=args.strategy,
+                        scale=args.scale, cooldown_s=args.cooldown, min_gap_s=args.min_gap, realtime=args.realtime,
+                        preview=False, lossless=not args.realtime)
+    for error in engine.errors:
+        print(error)
+    if not engine.gates:
+        book.close()
+        return None
+
+    actions = {"in": 0, "out": 0, "rejected": 0}
+    start = time.perf_counter()
+    engine.start()
+    try:
+        while not engine.all_done():
+            time.sleep(0.05)
+            for gate, result in engine.poll_events():
+                actions[result.action] += 1
+                if args.verbose:
+                    print(f"{gate.name}: {result.message}")
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - start
+    engine.stop()
+    for gate, result in engine.poll_events():
+        actions[result.action] += 1
+    book.close()
+    if args.metrics_file:
+        METRICS.write(args.metrics_file)
+
+    decode_samples = [s for gate in engine.gates for s in gate.stats.frame_samples]
+    report = {
+        "load_s": load_s,
+        "elapsed_s": elapsed,
+        "frames": sum(gate.pipeline.frame_seq for gate in engine.gates),
+        "decoded": sum(gate.pipeline.frames_decoded for gate in engine.gates),
+        "dropped": sum(gate.pipeline.frames_dropped for gate in engine.gates),
+        "scans": sum(actions.values()),
+        "actions": actions,
+        "decode_ms": {q: v * 1000 for q, v in percentiles(decode_samples).items()},
+        "persist_ms": {q: v * 1000 for q, v in percentiles(engine.writer.persist_samples).items()},
+    }
+    report["frames_per_s"] = report["frames"] / elapsed if elapsed else 0.0
+    report["scans_per_s"] = report["scans"] / elapsed if elapsed else 0.0
+    return report
+
+
+def print_report(report):
+    a = report["actions"]
+    print(f"startup load:   {report['load_s'] * 1000:.0f} ms")
+    print(f"elapsed:        {report['elapsed_s']:.2f} s")
+    print(f"frames:         {report['frames']} ({report['frames_per_s']:.1f}/s), "
+          f"{report['decoded']} decoded, {report['dropped']} dropped")
+    print(f"scans:          {report['scans']} ({report['scans_per_s']:.1f}/s) - "
+          f"{a['in']} in, {a['out']} out, {a['rejected']} rejected")
+    for name in ("decode_ms", "persist_ms"):
+        p = report[name]
+        print(f"{name[:-3] + ' latency:':<16}p50 {p[50]:.2f} ms  p95 {p[95]:.2f} ms  p99 {p[99]:.2f} ms")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run QR attendance scanning without the GUI")
+    parser.add_argument("--source", action="append", required=True,
+                        help="camera index, video file or image directory (repeat for several gates)")
+    parser.add_argument("--users", default="users.csv")
+    parser.add_argument("--attendance", default="attendance.csv")
+    parser.add_argument("--journal", default="attendance.journal")
+    parser.add_argument("--db", default="attendance.db")
+    parser.add_argument("--backend", choices=("csv", "sqlite", "partitioned"), default="csv")
+    parser.add_argument("--compact-every", type=int, default=2000)
+    parser.add_argument("--strategy", choices=DETECT_STRATEGIES, default="downscale")
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=2, help="decode threads per gate")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="seconds before the same code counts again")
+    parser.add_argument("--min-gap", type=float, default=60.0, help="seconds after a check-in before a check-out")
+    parser.add_argument("--realtime", action="store_true",
+                        help="pace files at their frame rate and drop frames like a live camera")
+    add_partition_arguments(parser)
+    add_policy_arguments(parser)
+    parser.add_argument("--metrics-file", help="write stage metrics here on exit (*.prom for Prometheus text, else JSON)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+if __name__ == "__main__":
+    report = run(build_parser().parse_args())
+    if report:
+        print_report(report)
@@ -0,0 +1,104 @@
+import csv
+import os
+import time
+
+import pandas as pd
+
+# Append-only journal of attendance events. Each scan writes one small record
+# instead of rewriting attendance.csv; the journal is folded back into the CSV
+# by compaction and replayed on startup after a crash.
+
+JOURNAL_OPS = ("IN", "OUT")
+
+
+class AttendanceJournal:
+    def __init__(self, path, sync_every=32, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.pending = 0
+        self.count = 0
+        self.last_sync = time.monotonic()
+        self.fh = open(self.path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.fh)
+
+    def append(self, op, regno, date, in_time, out_time=""):
+        self.writer.writerow([op, regno, date, in_time, out_time])
+        # Flushing hands the record to the OS so a process crash cannot lose it;
+        # fsync (power loss) is batched by count and by time.
+        self.fh.flush()
+        self.pending += 1
+        self.count += 1
+        if self.pending >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        if self.pending:
+            os.fsync(self.fh.fileno())
+            self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def rotate(self):
+        # Move the current segment aside for compaction and start a fresh one
+        self.sync()
+        self.fh.close()
+        segment = compacting_path(self.path)
+        os.replace(self.path, segment)
+        self.fh = open(self.path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.fh)
+        self.count = 0
+        return segment
+
+    def close(self):
+        self.sync()
+        self.fh.close()
+
+
+def compacting_path(path):
+    return path + ".compacting"
+
+
+def journal_segments(path):
+    # Older (being compacted) segment first so events replay in order
+    return [p for p in (compacting_path(path), path) if os.path.exists(p)]
+
+
+def read_journal(path):
+    events = []
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.reader(fh):
+            # A torn record at the tail (crash mid-write) is dropped
+            if len(row) != 5 or row[0] not in JOURNAL_OPS:
+                continue
+            events.append(tuple(row))
+    return events
+
+
+def apply_journal(att_df, events):
+    # Replay is idempotent: rows are keyed by (RegNo, Date, InTime), so events
+    # already folded into the CSV by an interrupted compaction are skipped.
+    if not events:
+        return att_df, 0
+    positions = {key: i for i, key in enumerate(zip(att_df['RegNo'], att_df['Date'], att_df['InTime']))}
+    new_rows = []
+    updates = {}
+    for op, regno, date, in_time, out_time in events:
+        key = (regno, date, in_time)
+        pos = positions.get(key)
+        if pos is None:
+            positions[key] = len(att_df) + len(new_rows)
+            new_rows.append({"RegNo": regno, "Date": date, "InTime": in_time, "OutTime": out_time if op == "OUT" else ""})
+        elif op == "OUT":
+            if pos < len(att_df):
+                updates[pos] = out_time
+            else:
+                new_rows[pos - len(att_df)]["OutTime"] = out_time
+    if updates:
+        col = att_df.columns.get_loc('OutTime')
+        for pos, out_time in updates.items():
+            att_df.iat[pos, col] = out_time
+    if new_rows:
+        added = pd.DataFrame(new_rows, columns=att_df.columns)
+        added['OutTime'] = added['OutTime'].astype('string')
+        att_df = pd.concat([att_df, added], ignore_index=True)
+    return att_df, len(events)
@@ -1,54 +1,128 @@
-import cv2 
 import tkinter as tk 
 from tkinter import ttk, messagebox, filedialog 
-import pandas as pd 
 from datetime import datetime 
-import os
-from PIL import Image, ImageTk
+import bisect
+import math
 import platform
+import threading
 
-# For beep sounds
-if platform.system() == "Windows":
-    import winsound
-else:
-    from playsound import playsound  # pip install playsound
+from feedback import Feedback
+from metrics import METRICS, UI_REFRESH
+from records_view import RecordsPager
+from users_view import UsersTable
+
+# pandas, OpenCV and Pillow are imported where they are first needed (the
+# background loader, start_scan, the records tab) so the window comes up fast.
 
 # Filenames for data persistence 
 USER_FILE = "users.csv" 
 ATTENDANCE_FILE = "attendance.csv" 
+JOURNAL_FILE = "attendance.journal"
+DB_FILE = "attendance.db"
+AGGREGATES_FILE = "attendance_aggregates.pkl"
+
+# Storage backend: "csv" (users.csv/attendance.csv + journal), "sqlite" (DB_FILE)
+# or "partitioned" (one file per month in PARTITION_DIR, see partitions.py).
+# Switching to "sqlite" or "partitioned" migrates attendance.csv on first start.
+STORAGE_BACKEND = "csv"
+
+# Partitioned backend: months loaded at startup (older ones are compressed and
+# read only for searches with a From date before them, histories and
+# exports), and after how many months partitions are moved to expired/
+# ("move") or deleted ("purge"); None keeps them forever.
+PARTITION_DIR = "attendance_partitions"
+ACTIVE_MONTHS = 2
+RETENTION_MONTHS = None
+RETENTION_ACTION = "move"
+
+# Check-in/out sessions (see sessions.py): how many in/out pairs a user may
+# record per day, optional shift windows as (name, start, end) - end before
+# start crosses midnight, e.g. ("Night", "22:00", "06:00") - and when open
+# sessions are auto-closed: shift end + SHIFT_LATE_GRACE_MIN, or
+# MAX_OPEN_HOURS after check-in without shifts. Without shifts a scan on a
+# later day checks in again unless OVERNIGHT_SESSIONS lets it close the
+# previous day's session.
+SESSIONS_PER_DAY = 1
+SHIFTS = []
+SHIFT_EARLY_GRACE_MIN = 60
+SHIFT_LATE_GRACE_MIN = 120
+MAX_OPEN_HOURS = 16
+OVERNIGHT_SESSIONS = False
+
+# Multi-kiosk mode: with SERVER_URL set (e.g. "http://192.168.1.10:8765", see
+# attendance_server.py) this kiosk keeps a replica in CLIENT_CACHE_DIR instead
+# of the files above, queues scans and syncs them with the server.
+SERVER_URL = None
+CLIENT_CACHE_DIR = "client_cache"
+TERMINAL_NAME = platform.node()
+
+# Journal events folded back into attendance.csv per compaction
+JOURNAL_COMPACT_EVERY = 2000
+
+# Capture sources, one gate each: camera indices, video files or image folders
+CAMERA_SOURCES = [0]
+
+# QR decoder threads per gate, how often the Tk loop polls the gates and the
+# total width of the preview grid
+DECODE_WORKERS = 2
+PREVIEW_POLL_MS = 15
+PREVIEW_WIDTH = 640
+
+# Duplicate scans (see dedup.py): a code decoded again within SCAN_COOLDOWN_S
+# of its last sighting is ignored, and a check-out is refused until
+# MIN_CHECKOUT_GAP_S after the check-in
+SCAN_COOLDOWN_S = 2.0
+MIN_CHECKOUT_GAP_S = 60
+
+# QR detection strategy: "full", "downscale" or "roi" (see qr_detect.py)
+DETECT_STRATEGY = "downscale"
+DETECT_SCALE = 0.5
+
+# Attendance records shown per page in the records tab
+RECORDS_PAGE_SIZE = 100
+
+# Attendance report (see reports.py): a day counts as late when the first
+# check-in is after REPORT_WORK_START + REPORT_GRACE_MIN, and as an early
+# departure when the last check-out is before REPORT_WORK_END - grace.
+# REPORT_WORKERS processes build it (None for one per CPU), for histories
+# large enough to pay for starting them (reports.POOL_MIN_ROWS).
+REPORT_WORK_START = "09:00"
+REPORT_WORK_END = "17:00"
+REPORT_GRACE_MIN = 5
+REPORT_WORKERS = None
+
+# Users shown per page in the Manage Users table
+USERS_PAGE_SIZE = 200
+
+# Delay after the last keystroke before search-as-you-type runs
+SEARCH_DEBOUNCE_MS = 200
+
+# Analytics tab views -> AttendanceAggregates query, and how many rows it lists
+ANALYTICS_VIEWS = {
+    "Hours per user": "per_user",
+    "Department headcount": "per_department",
+    "Monthly per user": "per_month",
+}
+ANALYTICS_MAX_ROWS = 1000
+
+# Scan feedback: success.wav / error.wav are played if present (else a
+# synthesized beep), and the bar under the scan status flashes for FLASH_MS
+FLASH_MS = 300
+FLASH_COLORS = {True: "#2e7d32", False: "#c62828"}
+
+# Scan path metrics (see metrics.py): collected when enabled or while the
+# diagnostics panel is open, written every METRICS_WRITE_MS to METRICS_FILE
+# (*.prom for Prometheus text, else JSON) and served on
+# http://127.0.0.1:METRICS_PORT/metrics if a port is set
+METRICS_ENABLED = False
+METRICS_FILE = "metrics.prom"
+METRICS_WRITE_MS = 10000
+METRICS_PORT = None
 
 # Admin credentials
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin123"
 
-def load_users():
-    if os.path.exists(USER_FILE):
-        return pd.read_csv(USER_FILE) 
-    else: 
-        df = pd.DataFrame(columns=["RegNo", "FirstName", "LastName", "Mobile", "BloodGroup", "Department", "Position"]) 
-        df.to_csv(USER_FILE, index=False) 
-        return df
-
-def save_users(users_df):
-    users_df.to_csv(USER_FILE, index=False)
-
-def load_attendance():
-    if os.path.exists(ATTENDANCE_FILE):
-        df = pd.read_csv(ATTENDANCE_FILE) 
-        if 'OutTime' in df.columns: 
-            df['OutTime'] = df['OutTime'].astype('string') 
-        else:
-            df['OutTime'] = pd.Series(dtype='string')
-        return df 
-    else: 
-        df = pd.DataFrame(columns=["RegNo", "Date", "InTime", "OutTime"]) 
-        df['OutTime'] = df['OutTime'].astype('string') 
-        df.to_csv(ATTENDANCE_FILE, index=False) 
-        return df 
-
-def save_attendance(att_df): 
-    att_df.to_csv(ATTENDANCE_FILE, index=False) 
-
 class AttendanceApp: 
     def __init__(self, root): 
         self.root = root
@@ -69,47 +143,204 @@ class AttendanceApp:
         style.configure("Treeview.Heading", font=("Arial", 11, "bold"))
         style.map("Treeview", background=[('selected', '#2196F3')])
 
-        self.users = load_users()
-        self.attendance = load_attendance()
+        METRICS.enable(METRICS_ENABLED)
+        if METRICS_ENABLED and METRICS_PORT:
+            METRICS.serve(METRICS_PORT)
+        self.diagnostics = None
+        self.feedback = Feedback()
+        self.flash_job = None
+
+        # Users and attendance history load on a background thread; the scan
+        # button is enabled once they are in
+        self.book = None
+        self.book_error = None
+        self.book_loader = threading.Thread(target=self.load_book, daemon=True)
+        self.book_loader.start()
+
+        self.search_job = None
+        self.user_search_job = None
         self.is_admin_logged_in = False
         self.tab_manage = None
+        self.records_pager = None
+        self.users_table = None
 
         self.create_widgets()
 
-        self.cap = None
+        self.engine = None
+        self.previews = {}
+        self.stats_shown_at = 0
         self.scanning = False
-        self.last_scanned_code = None 
-        self.qr_cooldown_ms = 2000
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(50, self.wait_for_book)
+        self.root.after(METRICS_WRITE_MS, self.write_metrics)
+
+    def load_book(self):
+        try:
+            from sessions import SessionPolicy
+            policy = SessionPolicy(SESSIONS_PER_DAY, SHIFTS, SHIFT_EARLY_GRACE_MIN, SHIFT_LATE_GRACE_MIN,
+                                   MAX_OPEN_HOURS, OVERNIGHT_SESSIONS)
+            if SERVER_URL:
+                from attendance_client import ClientBook
+                self.book = ClientBook(SERVER_URL, CLIENT_CACHE_DIR, terminal=TERMINAL_NAME, policy=policy)
+                return
+            from attendance_core import AttendanceBook
+            from storage import open_storage
+            self.book = AttendanceBook(open_storage(STORAGE_BACKEND, USER_FILE, ATTENDANCE_FILE, JOURNAL_FILE, DB_FILE,
+                                                    compact_every=JOURNAL_COMPACT_EVERY, partition_dir=PARTITION_DIR,
+                                                    active_months=ACTIVE_MONTHS, retention_months=RETENTION_MONTHS,
+                                                    retention_action=RETENTION_ACTION),
+                                       aggregates_file=AGGREGATES_FILE, policy=policy)
+        except Exception as e:
+            self.book_error = e
+
+    def wait_for_book(self):
+        if self.book_loader.is_alive():
+            self.root.after(50, self.wait_for_book)
+            return
+        if self.book_error is not None:
+            self.scan_status.config(text="Failed to load attendance data", foreground="red")
+            messagebox.showerror("Error", f"Failed to load attendance data:\n{self.book_error}")
+            return
+        self.scan_btn.config(state=tk.NORMAL)
+        self.scan_status.config(text="")
+        self.on_tab_changed()
+        self.root.after(1000, self.sync_storage)
+
+    def book_ready(self):
+        if self.book is None or self.book_loader.is_alive():
+            messagebox.showinfo("Loading", "Attendance data is still loading, please try again in a moment")
+            return False
+        return True
+
+    def sync_storage(self):
+        self.book.sync()
+        # Auto-closed sessions, and in client mode rows other gates recorded
+        for action, pos in self.book.take_changes():
+            if action == "users":
+                if self.users_table is not None:
+                    self.load_users_table()
+            elif self.records_pager is not None:
+                self.show_row_change(action, pos)
+        if SERVER_URL:
+            self.sync_label.config(text=self.book.status())
+        self.root.after(1000, self.sync_storage)
+
+    def write_metrics(self):
+        if METRICS.enabled and METRICS_FILE:
+            try:
+                METRICS.write(METRICS_FILE)
+            except OSError:
+                pass
+        self.root.after(METRICS_WRITE_MS, self.write_metrics)
+
+    def on_close(self):
+        self.stop_scan()
+        METRICS.shutdown()
+        self.feedback.close()
+        if self.book is not None:
+            self.book.close()
+        self.root.destroy()
 
     def create_widgets(self):
         self.tabControl = ttk.Notebook(self.root)
         self.tab_scan = ttk.Frame(self.tabControl) 
         self.tab_attendance = ttk.Frame(self.tabControl) 
+        self.tab_analytics = ttk.Frame(self.tabControl)
         self.tab_admin = ttk.Frame(self.tabControl) 
 
         self.tabControl.add(self.tab_scan, text="Scan QR & Mark Attendance") 
         self.tabControl.add(self.tab_attendance, text="View Attendance Records") 
+        self.tabControl.add(self.tab_analytics, text="Analytics")
         self.tabControl.add(self.tab_admin, text="Admin Panel") 
         self.tabControl.pack(expand=1, fill="both", padx=10, pady=10)
 
         self.create_scan_tab()
-        self.create_attendance_tab()
+        self.create_analytics_tab()
         self.create_admin_tab()
 
+        # The records tab is built the first time it is opened
+        self.records_loading = ttk.Label(self.tab_attendance, text="Loading attendance records...")
+        self.records_loading.pack(pady=30)
+        self.tabControl.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def on_tab_changed(self, event=None):
+        if self.records_pager is not None or self.book is None or self.book_loader.is_alive():
+            return
+        if self.tabControl.select() == str(self.tab_attendance):
+            self.records_loading.destroy()
+            self.create_attendance_tab()
+
     # ----- Scan Tab -----
     def create_scan_tab(self): 
         frm = self.tab_scan 
 
         ttk.Label(frm, text="Scan QR to Mark Attendance", font=("Arial", 16, "bold")).pack(pady=15)
 
-        self.scan_btn = ttk.Button(frm, text="Start Scan", command=self.toggle_scan, style="Green.TButton")
+        self.scan_btn = ttk.Button(frm, text="Start Scan", command=self.toggle_scan, style="Green.TButton",
+                                   state=tk.DISABLED)
         self.scan_btn.pack(pady=10)
 
-        self.scan_status = ttk.Label(frm, text="", font=("Arial", 12), foreground="green")
-        self.scan_status.pack(pady=15)
+        self.scan_status = ttk.Label(frm, text="Loading attendance data...", font=("Arial", 12), foreground="green")
+        self.scan_status.pack(pady=(15, 5))
 
-        self.camera_label = ttk.Label(frm)
-        self.camera_label.pack(pady=10)
+        self.flash_bar = tk.Frame(frm, height=8, width=400)
+        self.flash_bar.pack(pady=(0, 10))
+        self.flash_bg = self.flash_bar.cget("background")
+
+        # One preview cell per gate, laid out as a grid when scanning starts
+        self.preview_grid = ttk.Frame(frm)
+        self.preview_grid.pack(pady=10)
+
+        self.detect_stats_label = ttk.Label(frm, text="", font=("Arial", 9), foreground="gray")
+        self.detect_stats_label.pack(pady=5)
+
+        self.sync_label = ttk.Label(frm, text="", font=("Arial", 9), foreground="gray")
+        self.sync_label.pack()
+
+        ttk.Button(frm, text="Diagnostics", command=self.open_diagnostics, style="TButton").pack(pady=5)
+
+    # ----- Diagnostics panel -----
+    def open_diagnostics(self):
+        # Metrics are collected while the panel is open even if not enabled
+        if self.diagnostics is not None:
+            self.diagnostics.lift()
+            return
+        METRICS.enable(True)
+        win = self.diagnostics = tk.Toplevel(self.root)
+        win.title("Diagnostics")
+        cols = ("Metric", "Count", "p50 ms", "p95 ms", "p99 ms")
+        self.metrics_tree = ttk.Treeview(win, columns=cols, show="headings", height=20)
+        for c in cols:
+            self.metrics_tree.heading(c, text=c)
+            self.metrics_tree.column(c, width=200 if c == "Metric" else 90, anchor=tk.CENTER)
+        self.metrics_tree.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        self.audio_label = ttk.Label(win, text="", font=("Arial", 9), foreground="gray")
+        self.audio_label.pack()
+        ttk.Button(win, text="Reset", command=METRICS.reset, style="TButton").pack(pady=5)
+        win.protocol("WM_DELETE_WINDOW", self.close_diagnostics)
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        if self.diagnostics is None:
+            return
+        snap = METRICS.snapshot()
+        self.metrics_tree.delete(*self.metrics_tree.get_children())
+        for name, t in snap['timers'].items():
+            self.metrics_tree.insert("", tk.END, values=(name, t['count'], f"{t['p50'] * 1000:.2f}",
+                                                         f"{t['p95'] * 1000:.2f}", f"{t['p99'] * 1000:.2f}"))
+        for name, value in snap['counters'].items():
+            self.metrics_tree.insert("", tk.END, values=(name, value, "", "", ""))
+        audio = f"Audio: {self.feedback.player_name or 'no player found, visual feedback only'}"
+        if self.feedback.last_error is not None:
+            audio += f" (last error: {self.feedback.last_error})"
+        self.audio_label.config(text=audio)
+        self.root.after(1000, self.refresh_diagnostics)
+
+    def close_diagnostics(self):
+        METRICS.enable(METRICS_ENABLED)
+        self.diagnostics.destroy()
+        self.diagnostics = None
 
     def toggle_scan(self):
         if self.scanning:
@@ -118,114 +349,111 @@ class AttendanceApp:
             self.start_scan() 
 
     def start_scan(self):
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
+        from scan_engine import ScanEngine
+
+        cols = math.ceil(math.sqrt(len(CAMERA_SOURCES)))
+        self.engine = ScanEngine(self.book, CAMERA_SOURCES, workers_per_gate=DECODE_WORKERS,
+                                 strategy=DETECT_STRATEGY, scale=DETECT_SCALE,
+                                 cooldown_s=SCAN_COOLDOWN_S, min_gap_s=MIN_CHECKOUT_GAP_S,
+                                 preview_width=PREVIEW_WIDTH // cols)
+        if not self.engine.gates:
             messagebox.showerror("Error", "Cannot open camera")
+            self.engine = None
             return
+        if self.engine.errors:
+            messagebox.showwarning("Camera", "\n".join(self.engine.errors))
+
+        for i, gate in enumerate(self.engine.gates):
+            cell = ttk.Frame(self.preview_grid)
+            cell.grid(row=i // cols, column=i % cols, padx=5, pady=5)
+            image_label = ttk.Label(cell)
+            image_label.pack()
+            stats_label = ttk.Label(cell, text=gate.name, font=("Arial", 9))
+            stats_label.pack()
+            self.previews[gate] = (cell, image_label, stats_label, [0])
+
         self.scanning = True
         self.scan_btn.config(text="Stop Scan", style="Red.TButton")
         self.scan_status.config(text="Starting camera...")
-        self.last_scanned_code = None
+        self.stats_shown_at = 0
+        self.engine.start()
         self.update_frame()
 
     def stop_scan(self):
         self.scanning = False
         self.scan_btn.config(text="Start Scan", style="Green.TButton")
         self.scan_status.config(text="Scan stopped.")
-        if self.cap:
-            self.cap.release() 
-        self.camera_label.config(image="") 
+        if self.engine:
+            self.engine.stop()
+            self.engine = None
+        for cell, _, _, _ in self.previews.values():
+            cell.destroy()
+        self.previews = {}
 
     def update_frame(self):
+        # Runs on the Tk loop: renders each gate's newest frame and shows the
+        # outcomes the gate workers have already written.
         if not self.scanning:
             return
-        ret, frame = self.cap.read()
-        if not ret:
-            self.scan_status.config(text="Failed to read from camera")
+        if self.engine.all_failed():
             self.stop_scan()
+            self.scan_status.config(text="Failed to read from camera")
             return
 
-        detector = cv2.QRCodeDetector()
-        data, bbox, _ = detector.detectAndDecode(frame)
-
-        if data and data != self.last_scanned_code:
-            self.last_scanned_code = data
-            if self.mark_attendance(data.strip()):
-                self.play_beep(True)
-            else:
-                self.play_beep(False)
- 
-            self.root.after(self.qr_cooldown_ms, self.reset_last_code) 
-
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) 
-        im_pil = Image.fromarray(frame_rgb) 
-        imgtk = ImageTk.PhotoImage(image=im_pil)
-        self.camera_label.imgtk = imgtk
-        self.camera_label.configure(image=imgtk)
-
-        self.root.after(30, self.update_frame)
-
-    def reset_last_code(self):
-        self.last_scanned_code = None
-
-    def mark_attendance(self, regno):
-        if len(regno.split('-')) < 2:
-            self.scan_status.config(text="Invalid QR format")
-            return False
-
-        if regno not in self.users['RegNo'].values:
-            self.scan_status.config(text="User not registered")
-            return False
-
-        user = self.users[self.users['RegNo'] == regno].iloc[0]
-        first_name = user['FirstName']
- 
-        now = datetime.now() 
-        today = now.strftime("%Y-%m-%d") 
-        current_time = now.strftime("%H:%M:%S") 
-
-        user_today = self.attendance[(self.attendance['RegNo'] == regno) & (self.attendance['Date'] == today)]
-
-        if user_today.empty:
-            new_entry = {
-                "RegNo": regno,
-                "Date": today,
-                "InTime": current_time,
-                "OutTime": ""
-            }
-            self.attendance = pd.concat([self.attendance, pd.DataFrame([new_entry])], ignore_index=True)
-            self.scan_status.config(text=f"Welcome {first_name} - Time: {current_time}")
-        else:
-            idxs = user_today[user_today['OutTime'] == ""].index 
-            if len(idxs) > 0: 
-                idx = idxs[0] 
-                self.attendance.at[idx, 'OutTime'] = current_time 
-                self.scan_status.config(text=f"Bye {first_name}, have a good day! - Time: {current_time}")
-            else:
-                self.scan_status.config(text="Attendance already marked twice today.")
-                return False
-
-        save_attendance(self.attendance)
-        self.load_attendance_records()
-        return True
-
-    def play_beep(self, success=True):
-        if platform.system() == "Windows":
-            if success:
-                winsound.Beep(1000, 150)
-            else:
-                winsound.Beep(400, 400) 
-        else: 
-            try: 
-                if success: 
-                    playsound('success.wav')
-                else:
-                    playsound('error.wav')
-            except Exception:
-                pass
+        with UI_REFRESH.time():
+            for gate, result in self.engine.poll_events():
+                self.show_scan_result(gate, result)
+
+            from PIL import Image, ImageTk
+
+            frames = 0
+            for gate, (_, image_label, _, shown) in self.previews.items():
+                seq, frame_rgb = gate.pipeline.latest()
+                frames += seq
+                if frame_rgb is not None and seq != shown[0]:
+                    shown[0] = seq
+                    imgtk = ImageTk.PhotoImage(image=Image.fromarray(frame_rgb))
+                    image_label.imgtk = imgtk
+                    image_label.configure(image=imgtk)
+
+            if frames - self.stats_shown_at >= 30:
+                self.stats_shown_at = frames
+                for gate, (_, _, stats_label, _) in self.previews.items():
+                    stats_label.config(text=gate.summary())
+                self.detect_stats_label.config(text="  |  ".join(gate.stats.summary() for gate in self.engine.gates))
+
+        self.root.after(PREVIEW_POLL_MS, self.update_frame)
+
+    def show_scan_result(self, gate, result):
+        prefix = f"{gate.name}: " if len(self.previews) > 1 else ""
+        self.scan_status.config(text=prefix + result.message)
+        # In client mode scans reach the records once synced (pos is None)
+        if self.records_pager is not None and result.pos is not None:
+            self.show_row_change(result.action, result.pos)
+        self.feedback.play(result.ok)
+        self.flash(result.ok)
+
+    def show_row_change(self, action, pos):
+        if action == "in":
+            self.records_pager.append(pos)
+        elif action == "out":
+            self.records_pager.refresh_row(pos)
+
+    def flash(self, ok):
+        if self.flash_job is not None:
+            self.root.after_cancel(self.flash_job)
+        self.flash_bar.config(background=FLASH_COLORS[ok])
+        self.scan_status.config(foreground="green" if ok else "red")
+        self.flash_job = self.root.after(FLASH_MS, self.end_flash)
+
+    def end_flash(self):
+        self.flash_job = None
+        self.flash_bar.config(background=self.flash_bg)
 
     # ----- Attendance Records Tab ----- 
     def create_attendance_tab(self): 
+        from search_index import SEARCH_FIELDS
+
         frm = self.tab_attendance
 
         ttk.Label(frm, text="Attendance Records", font=("Arial", 16, "bold")).pack(pady=15)
@@ -234,102 +462,358 @@ class AttendanceApp:
         searchfrm.pack(pady=10) 
 
         ttk.Label(searchfrm, text="Search by:").pack(side=tk.LEFT, padx=5)
-        self.search_type = ttk.Combobox(searchfrm, values=["RegNo", "FirstName", "LastName", "Mobile"], state="readonly", width=15, font=("Arial", 10))
+        self.search_type = ttk.Combobox(searchfrm, values=list(SEARCH_FIELDS), state="readonly", width=15, font=("Arial", 10))
         self.search_type.current(0)
         self.search_type.pack(side=tk.LEFT, padx=5)
         self.search_entry = ttk.Entry(searchfrm, width=30)
         self.search_entry.pack(side=tk.LEFT, padx=5)
+        # Search as you type, debounced so fast typing runs one query
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_type.bind("<<ComboboxSelected>>", self.schedule_search)
         self.search_btn = ttk.Button(searchfrm, text="Search", command=self.search_attendance, style="Blue.TButton") 
         self.search_btn.pack(side=tk.LEFT, padx=5) 
         self.reset_btn = ttk.Button(searchfrm, text="Reset", command=self.load_attendance_records, style="TButton") 
         self.reset_btn.pack(side=tk.LEFT, padx=5)
 
+        datefrm = ttk.Frame(frm)
+        datefrm.pack()
+        ttk.Label(datefrm, text="From (YYYY-MM-DD):", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        self.date_from_entry = ttk.Entry(datefrm, width=12)
+        self.date_from_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(datefrm, text="To:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        self.date_to_entry = ttk.Entry(datefrm, width=12)
+        self.date_to_entry.pack(side=tk.LEFT, padx=5)
+
         cols = ("RegNo", "FirstName", "LastName", "Date", "InTime", "OutTime") 
-        self.att_tree = ttk.Treeview(frm, columns=cols, show="headings", height=15, selectmode="browse") 
+        treefrm = ttk.Frame(frm)
+        treefrm.pack(pady=10, fill=tk.X, padx=20)
+        self.att_tree = ttk.Treeview(treefrm, columns=cols, show="headings", height=15, selectmode="browse") 
         for c in cols:
             self.att_tree.heading(c, text=c)
             self.att_tree.column(c, width=120, anchor=tk.CENTER)
-        self.att_tree.pack(pady=10, fill=tk.X, padx=20)
+        att_scroll = ttk.Scrollbar(treefrm, orient=tk.VERTICAL, command=self.att_tree.yview)
+        self.att_tree.configure(yscrollcommand=att_scroll.set)
+        att_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.att_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
         # Alternating row colors
         self.att_tree.tag_configure("oddrow", background="#f0f0f0")
         self.att_tree.tag_configure("evenrow", background="#ffffff")
 
-        self.print_btn = ttk.Button(frm, text="Print Attendance", command=self.print_attendance, style="TButton") 
-        self.print_btn.pack(pady=10) 
-
-        self.load_attendance_records()
+        # Double-click a record to see that user's full history
+        self.att_tree.bind("<Double-1>", self.show_user_history)
+
+        pagefrm = ttk.Frame(frm)
+        pagefrm.pack()
+        ttk.Button(pagefrm, text="< Prev", command=lambda: self.records_pager.prev_page()).pack(side=tk.LEFT, padx=5)
+        self.page_label = ttk.Label(pagefrm, text="", font=("Arial", 10))
+        self.page_label.pack(side=tk.LEFT, padx=10)
+        ttk.Button(pagefrm, text="Next >", command=lambda: self.records_pager.next_page()).pack(side=tk.LEFT, padx=5)
+
+        exportfrm = ttk.Frame(frm)
+        exportfrm.pack(pady=10)
+        self.print_btn = ttk.Button(exportfrm, text="Print Attendance", command=self.print_attendance, style="TButton") 
+        self.print_btn.pack(side=tk.LEFT, padx=5) 
+        self.export_progress = ttk.Progressbar(exportfrm, length=200, maximum=1.0)
+        self.export_progress.pack(side=tk.LEFT, padx=5)
+        self.export_label = ttk.Label(exportfrm, text="", font=("Arial", 10))
+        self.export_label.pack(side=tk.LEFT, padx=5)
+        self.export_job = None
+
+        reportfrm = ttk.Frame(frm)
+        reportfrm.pack(pady=(0, 10))
+        self.report_btn = ttk.Button(reportfrm, text="Attendance Report", command=self.attendance_report,
+                                     style="TButton")
+        self.report_btn.pack(side=tk.LEFT, padx=5)
+        self.report_progress = ttk.Progressbar(reportfrm, length=200, maximum=1.0)
+        self.report_progress.pack(side=tk.LEFT, padx=5)
+        self.report_label = ttk.Label(reportfrm, text="", font=("Arial", 10))
+        self.report_label.pack(side=tk.LEFT, padx=5)
+        self.report_job = None
+
+        self.records_pager = RecordsPager(self.att_tree, self.attendance_row_values,
+                                          lambda pos: self.book.attendance.sort_key(pos),
+                                          page_size=RECORDS_PAGE_SIZE,
+                                          on_change=lambda text: self.page_label.config(text=text))
+        # Sorted once; scans then push onto the top of the view, or into place
+        # when they carry an earlier Date
+        self.records_pager.load(self.book.attendance.sorted_positions().tolist())
+
+    def attendance_row_values(self, pos, store=None):
+        regno, date, in_time, out_time = (self.book.attendance if store is None else store).row(pos)
+        user = self.book.index.get_user(regno) or {}
+        return (regno, user.get('FirstName', ""), user.get('LastName', ""), date, in_time, out_time)
 
     def load_attendance_records(self): 
-        self.att_tree.delete(*self.att_tree.get_children()) 
         self.search_entry.delete(0, tk.END) 
-
-        merged = self.attendance.merge(self.users[['RegNo', 'FirstName', 'LastName']], on='RegNo', how='left')
-        merged = merged.sort_values(by=['Date', 'InTime'], ascending=[False, False])
-        
-        for i, (_, row) in enumerate(merged.iterrows()):
-            tag = "evenrow" if i % 2 == 0 else "oddrow"
-            self.att_tree.insert("", tk.END, values=(
-                row['RegNo'], row['FirstName'], row['LastName'], row['Date'], row['InTime'], row['OutTime']), tags=tag)
+        self.date_from_entry.delete(0, tk.END)
+        self.date_to_entry.delete(0, tk.END)
+        self.records_pager.show_all()
+
+    def schedule_search(self, event=None):
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.search_as_you_type)
+
+    def search_as_you_type(self):
+        self.search_job = None
+        date_range = self.search_date_range()
+        if date_range is None:
+            return
+        search_value = self.search_entry.get().strip()
+        if search_value == "" and date_range == (None, None):
+            self.records_pager.show_all()
+            return
+        self.run_search(search_value, *date_range)
+
+    def search_date_range(self):
+        # (from, to) as ISO date strings or None; None overall if either is malformed
+        bounds = []
+        for entry in (self.date_from_entry, self.date_to_entry):
+            value = entry.get().strip()
+            if value:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    return None
+            bounds.append(value or None)
+        return tuple(bounds)
+
+    def run_search(self, search_value, date_from, date_to):
+        if self.book.reaches_archive(date_from):
+            # Older months are read from the archive for this range only
+            store = self.book.history(date_from, date_to)
+            if search_value:
+                regnos = self.book.search_index.match_users(self.search_type.get(), search_value)
+                positions = store.sorted_positions(store.positions_of(regnos)).tolist()
+            else:
+                positions = store.sorted_positions().tolist()
+            self.records_pager.show(positions, lambda pos: self.attendance_row_values(pos, store))
+            return len(positions)
+        if search_value:
+            positions = self.book.search_index.search(self.search_type.get(), search_value, self.book.attendance,
+                                                 date_from, date_to)
+        else:
+            # The full view is already in date order, so a range is two bisections
+            rows = self.records_pager.all_rows
+            date_of = self.book.attendance.date
+            lo = bisect.bisect_left(rows, date_from, key=date_of) if date_from else 0
+            hi = bisect.bisect_right(rows, date_to, key=date_of) if date_to else len(rows)
+            positions = rows[lo:hi]
+        self.records_pager.show(positions)
+        return len(positions)
 
     def search_attendance(self): 
         search_type = self.search_type.get()
         search_value = self.search_entry.get().strip() 
 
-        if search_value == "": 
+        date_range = self.search_date_range()
+        if date_range is None:
+            messagebox.showwarning("Invalid date", "Dates must be in YYYY-MM-DD format")
+            return
+
+        if search_value == "" and date_range == (None, None): 
             messagebox.showwarning("Input needed", "Please enter a search value") 
             return 
 
-        merged = self.attendance.merge(self.users[['RegNo', 'FirstName', 'LastName']], on='RegNo', how='left')
-        
-        if search_type == "RegNo":
-            filtered = merged[merged['RegNo'] == search_value]
-        elif search_type == "FirstName":
-            filtered = merged[merged['FirstName'].str.lower() == search_value.lower()]
-        elif search_type == "LastName":
-            filtered = merged[merged['LastName'].str.lower() == search_value.lower()]
-        elif search_type == "Mobile":
-            filtered = merged[merged['RegNo'].isin(self.users[self.users['Mobile'] == search_value]['RegNo'])]
-
-        self.att_tree.delete(*self.att_tree.get_children())
-
-        if filtered.empty:
+        if self.run_search(search_value, *date_range) == 0:
             messagebox.showinfo("No records", f"No attendance records found for {search_type}: {search_value}")
             return
 
-        filtered = filtered.sort_values(by=['Date', 'InTime'], ascending=[False, False])
-        
-        for i, (_, row) in enumerate(filtered.iterrows()):
-            tag = "evenrow" if i % 2 == 0 else "oddrow"
-            self.att_tree.insert("", tk.END, values=(
-                row['RegNo'], row['FirstName'], row['LastName'], row['Date'], row['InTime'], row['OutTime']), tags=tag)
+    def show_user_history(self, event):
+        selected = self.att_tree.selection()
+        if not selected:
+            return
+        regno = self.att_tree.item(selected[0], 'values')[0]
+        history = self.book.storage.user_history(regno, self.book.attendance)
+
+        win = tk.Toplevel(self.root)
+        win.title(f"Attendance history - {regno}")
+        ttk.Label(win, text=f"{regno}: {len(history)} records", font=("Arial", 12, "bold")).pack(pady=10)
+        cols = ("Date", "InTime", "OutTime")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=15)
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=120, anchor=tk.CENTER)
+        tree.pack(padx=10, pady=10)
+        for row in history.itertuples(index=False):
+            tree.insert("", tk.END, values=(row.Date, row.InTime, row.OutTime))
+
+    def export_filters(self):
+        # Exports follow the current search: date range plus the matched users,
+        # or the matched departments for a Department search
+        date_from, date_to = self.search_date_range() or (None, None)
+        filters = {'date_from': date_from, 'date_to': date_to}
+        value = self.search_entry.get().strip()
+        if value:
+            field = self.search_type.get()
+            regnos = self.book.search_index.match_users(field, value)
+            if field == "Department":
+                filters['departments'] = {self.book.index.get_user(r)['Department'] for r in regnos if self.book.index.has_user(r)}
+            else:
+                filters['regnos'] = regnos
+        return filters
 
     def print_attendance(self):
-        items = self.att_tree.get_children()
-        if not items:
+        from export import EXPORT_FORMATS, ExportJob, available_formats
+
+        if self.export_job is not None:
+            self.export_job.cancel()
+            return
+
+        if not self.records_pager.rows:
             messagebox.showwarning("No records", "No attendance records to print")
             return
 
-        records = []
-        for item in items:
-            values = self.att_tree.item(item, 'values')
-            records.append({
-                'RegNo': values[0],
-                'FirstName': values[1],
-                'LastName': values[2],
-                'Date': values[3],
-                'InTime': values[4],
-                'OutTime': values[5]
-            })
-        
         fname = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv")],
+            filetypes=[EXPORT_FORMATS[fmt] for fmt in available_formats()],
             title="Save Attendance Records"
         )
-        if fname: 
-            pd.DataFrame(records).to_csv(fname, index=False) 
-            messagebox.showinfo("Saved", f"Attendance records saved to:\n{fname}") 
+        if not fname: 
+            return
+
+        chunks = self.book.storage.iter_attendance(self.export_filters(), self.book.users, self.book.attendance,
+                                              self.records_pager.all_rows)
+        self.export_job = ExportJob(chunks, fname)
+        self.export_job.start()
+        self.print_btn.config(text="Cancel Export")
+        self.poll_export()
+
+    def poll_export(self):
+        job = self.export_job
+        self.export_progress['value'] = job.progress
+        self.export_label.config(text=f"{job.rows} rows")
+        if not job.done:
+            self.root.after(200, self.poll_export)
+            return
+
+        self.export_job = None
+        self.print_btn.config(text="Print Attendance")
+        if job.error:
+            messagebox.showerror("Export failed", str(job.error))
+        elif job.cancelled.is_set():
+            self.export_label.config(text="Export cancelled")
+        else:
+            messagebox.showinfo("Saved", f"{job.rows} attendance records saved to:\n{job.path}") 
+
+    def attendance_report(self):
+        # Per-user summary of the searched range and users, built on a process
+        # pool from a background thread; a second click cancels
+        if self.report_job is not None:
+            self.report_job.cancel()
+            return
+
+        date_range = self.search_date_range()
+        if date_range is None:
+            messagebox.showwarning("Invalid date", "Dates must be in YYYY-MM-DD format")
+            return
+        fname = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")],
+                                             title="Save Attendance Report")
+        if not fname:
+            return
+
+        from reports import ReportJob, ReportParams
+
+        filters = self.export_filters()
+        regnos = filters.get('regnos')
+        if 'departments' in filters:
+            users = self.book.users
+            regnos = users.loc[users['Department'].isin(filters['departments']), 'RegNo']
+        params = ReportParams(*date_range, REPORT_WORK_START, REPORT_WORK_END, REPORT_GRACE_MIN, regnos)
+        self.report_job = ReportJob(self.book, fname, params, *date_range, workers=REPORT_WORKERS)
+        self.report_job.start()
+        self.report_btn.config(text="Cancel Report")
+        self.poll_report()
+
+    def poll_report(self):
+        job = self.report_job
+        self.report_progress['value'] = job.done / job.total if job.total else 0
+        self.report_label.config(text=f"{job.done}/{job.total} months")
+        if not job.finished:
+            self.root.after(200, self.poll_report)
+            return
+
+        self.report_job = None
+        self.report_btn.config(text="Attendance Report")
+        if job.error:
+            messagebox.showerror("Report failed", str(job.error))
+        elif job.report is None:
+            self.report_label.config(text="Report cancelled")
+        else:
+            messagebox.showinfo("Saved", f"Attendance report for {len(job.report)} users saved to:\n{job.path}")
+
+    # ----- Analytics Tab -----
+    def create_analytics_tab(self):
+        frm = self.tab_analytics
+
+        ttk.Label(frm, text="Attendance Analytics", font=("Arial", 16, "bold")).pack(pady=15)
+
+        queryfrm = ttk.Frame(frm)
+        queryfrm.pack(pady=10)
+        ttk.Label(queryfrm, text="View:").pack(side=tk.LEFT, padx=5)
+        self.analytics_view = ttk.Combobox(queryfrm, values=list(ANALYTICS_VIEWS), state="readonly", width=20,
+                                           font=("Arial", 10))
+        self.analytics_view.current(0)
+        self.analytics_view.pack(side=tk.LEFT, padx=5)
+        ttk.Label(queryfrm, text="From (YYYY-MM-DD):", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        self.analytics_from_entry = ttk.Entry(queryfrm, width=12)
+        self.analytics_from_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(queryfrm, text="To:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        self.analytics_to_entry = ttk.Entry(queryfrm, width=12)
+        self.analytics_to_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Button(queryfrm, text="Show", command=self.show_analytics, style="Blue.TButton").pack(side=tk.LEFT, padx=5)
+        self.analytics_view.bind("<<ComboboxSelected>>", lambda e: self.show_analytics())
+
+        self.analytics_summary = ttk.Label(frm, text="", font=("Arial", 10))
+        self.analytics_summary.pack(pady=5)
+
+        treefrm = ttk.Frame(frm)
+        treefrm.pack(pady=10, fill=tk.X, padx=20)
+        self.analytics_tree = ttk.Treeview(treefrm, show="headings", height=15, selectmode="browse")
+        analytics_scroll = ttk.Scrollbar(treefrm, orient=tk.VERTICAL, command=self.analytics_tree.yview)
+        self.analytics_tree.configure(yscrollcommand=analytics_scroll.set)
+        analytics_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.analytics_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.analytics_tree.tag_configure("oddrow", background="#f0f0f0")
+        self.analytics_tree.tag_configure("evenrow", background="#ffffff")
+
+    def show_analytics(self):
+        if not self.book_ready():
+            return
+        bounds = []
+        for entry in (self.analytics_from_entry, self.analytics_to_entry):
+            value = entry.get().strip()
+            if value:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format")
+                    return
+            bounds.append(value or None)
+
+        with self.book.lock:
+            table = getattr(self.book.aggregates, ANALYTICS_VIEWS[self.analytics_view.get()])(*bounds)
+            if 'RegNo' in table:
+                users = self.book.users.drop_duplicates('RegNo').set_index('RegNo')
+                names = users['FirstName'] + " " + users['LastName']
+                table.insert(1, 'Name', table['RegNo'].map(names).fillna(""))
+        table['Hours'] = table['Hours'].round(2)
+
+        cols = list(table.columns)
+        self.analytics_tree.delete(*self.analytics_tree.get_children())
+        self.analytics_tree.configure(columns=cols)
+        for c in cols:
+            self.analytics_tree.heading(c, text=c)
+            self.analytics_tree.column(c, width=110, anchor=tk.CENTER)
+        shown = table.head(ANALYTICS_MAX_ROWS)
+        for i, row in enumerate(shown.itertuples(index=False)):
+            self.analytics_tree.insert("", tk.END, values=row, tags=("evenrow" if i % 2 == 0 else "oddrow",))
+
+        summary = f"{len(table)} rows, {table['Hours'].sum():.1f} hours"
+        if len(table) > len(shown):
+            summary += f" (showing first {len(shown)})"
+        self.analytics_summary.config(text=summary)
 
     # ----- Admin Panel Tab -----
     def create_admin_tab(self):
@@ -354,6 +838,8 @@ class AttendanceApp:
         self.admin_status.pack(pady=15)
 
     def admin_login(self):
+        if not self.book_ready():
+            return
         username = self.admin_username.get().strip()
         password = self.admin_password.get().strip()
 
@@ -371,6 +857,9 @@ class AttendanceApp:
 
     # ----- Manage Users Tab -----
     def create_manage_tab(self): 
+        from search_index import SEARCH_FIELDS
+        from storage import USER_COLUMNS
+
         frm = self.tab_manage 
 
         ttk.Label(frm, text="Manage Users", font=("Arial", 16, "bold")).pack(pady=15) 
@@ -399,8 +888,28 @@ class AttendanceApp:
         delete_btn = ttk.Button(btnfrm, text="Delete User", command=self.delete_user, style="Red.TButton")
         delete_btn.pack(side=tk.LEFT, padx=5)
 
-        self.user_tree = ttk.Treeview(frm, columns=["RegNo", "FirstName", "LastName", "Mobile", "BloodGroup", "Department", "Position"],
-                                      show="headings", height=10, selectmode="browse")
+        import_btn = ttk.Button(btnfrm, text="Import Users", command=self.import_users, style="TButton")
+        import_btn.pack(side=tk.LEFT, padx=5)
+
+        self.badge_btn = ttk.Button(btnfrm, text="Generate Badges", command=self.generate_badges, style="TButton")
+        self.badge_btn.pack(side=tk.LEFT, padx=5)
+        self.badge_label = ttk.Label(btnfrm, text="", font=("Arial", 10))
+        self.badge_label.pack(side=tk.LEFT, padx=5)
+        self.badge_job = None
+
+        searchfrm = ttk.Frame(frm)
+        searchfrm.pack(padx=20, fill=tk.X)
+        ttk.Label(searchfrm, text="Filter by:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        self.user_search_type = ttk.Combobox(searchfrm, values=list(SEARCH_FIELDS), state="readonly", width=12,
+                                             font=("Arial", 10))
+        self.user_search_type.current(0)
+        self.user_search_type.pack(side=tk.LEFT, padx=5)
+        self.user_search_entry = ttk.Entry(searchfrm, width=30)
+        self.user_search_entry.pack(side=tk.LEFT, padx=5)
+        self.user_search_entry.bind("<KeyRelease>", self.schedule_user_search)
+        self.user_search_type.bind("<<ComboboxSelected>>", self.schedule_user_search)
+
+        self.user_tree = ttk.Treeview(frm, columns=USER_COLUMNS, show="headings", height=10, selectmode="browse")
         for col in self.user_tree["columns"]: 
             self.user_tree.heading(col, text=col) 
             self.user_tree.column(col, width=120, anchor=tk.CENTER) 
@@ -413,15 +922,34 @@ class AttendanceApp:
         # Bind double-click to populate fields for modification
         self.user_tree.bind("<Double-1>", self.populate_user_fields)
 
+        pagefrm = ttk.Frame(frm)
+        pagefrm.pack()
+        ttk.Button(pagefrm, text="< Prev", command=lambda: self.users_table.prev_page()).pack(side=tk.LEFT, padx=5)
+        self.users_page_label = ttk.Label(pagefrm, text="", font=("Arial", 10))
+        self.users_page_label.pack(side=tk.LEFT, padx=10)
+        ttk.Button(pagefrm, text="Next >", command=lambda: self.users_table.next_page()).pack(side=tk.LEFT, padx=5)
+
+        # Clicking a heading sorts by that column; edits below update single rows
+        self.users_table = UsersTable(self.user_tree, page_size=USERS_PAGE_SIZE,
+                                      on_change=lambda text: self.users_page_label.config(text=text))
         self.load_users_table()
 
     def load_users_table(self): 
-        self.user_tree.delete(*self.user_tree.get_children()) 
-        for i, (_, row) in enumerate(self.users.iterrows()): 
-            tag = "evenrow" if i % 2 == 0 else "oddrow"
-            self.user_tree.insert("", tk.END, values=(
-                row["RegNo"], row["FirstName"], row["LastName"], row["Mobile"], row["BloodGroup"], row["Department"], 
-                row["Position"]), tags=tag)
+        self.users_table.load(self.book.index.users)
+        self.user_search()
+
+    def schedule_user_search(self, event=None):
+        if self.user_search_job is not None:
+            self.root.after_cancel(self.user_search_job)
+        self.user_search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.user_search)
+
+    def user_search(self):
+        self.user_search_job = None
+        query = self.user_search_entry.get().strip()
+        if query:
+            self.users_table.filter(self.book.search_index.match_users(self.user_search_type.get(), query))
+        elif self.users_table.matches is not None:
+            self.users_table.filter(None)
 
     def populate_user_fields(self, event):
         selected = self.user_tree.selection()
@@ -429,21 +957,16 @@ class AttendanceApp:
             messagebox.showwarning("Selection Error", "Please select a user to modify")
             return
 
-        item = self.user_tree.item(selected[0])
-        values = item['values']
-        
-        self.user_vars["First Name"].delete(0, tk.END)
-        self.user_vars["First Name"].insert(0, values[1])
-        self.user_vars["Last Name"].delete(0, tk.END)
-        self.user_vars["Last Name"].insert(0, values[2])
-        self.user_vars["Mobile Number"].delete(0, tk.END)
-        self.user_vars["Mobile Number"].insert(0, values[3])
-        self.user_vars["Blood Group"].delete(0, tk.END)
-        self.user_vars["Blood Group"].insert(0, values[4])
-        self.user_vars["Department"].delete(0, tk.END)
-        self.user_vars["Department"].insert(0, values[5])
-        self.user_vars["Position"].delete(0, tk.END)
-        self.user_vars["Position"].insert(0, values[6])
+        # The iid is the RegNo; values come from the record, not the widget's
+        # copy (which turns numeric-looking strings into numbers)
+        user = self.book.index.get_user(selected[0])
+        if user is None:
+            return
+        fields = {"First Name": "FirstName", "Last Name": "LastName", "Mobile Number": "Mobile",
+                  "Blood Group": "BloodGroup", "Department": "Department", "Position": "Position"}
+        for label, col in fields.items():
+            self.user_vars[label].delete(0, tk.END)
+            self.user_vars[label].insert(0, user[col])
 
     def add_user(self): 
         if not self.is_admin_logged_in:
@@ -464,7 +987,7 @@ class AttendanceApp:
         year = datetime.now().year
         regno = f"{year}-{fn}_{ln}_{dept}"
 
-        if regno in self.users['RegNo'].values: 
+        if self.book.index.has_user(regno): 
             messagebox.showerror("Duplicate Entry", "User with this registration number already exists") 
             return 
 
@@ -478,15 +1001,91 @@ class AttendanceApp:
             "Position": pos 
         } 
 
-        self.users = pd.concat([self.users, pd.DataFrame([new_user])], ignore_index=True) 
-        save_users(self.users) 
+        try:
+            self.book.add_user(new_user)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not add user:\n{e}")
+            return
 
         messagebox.showinfo("Success", f"User added with RegNo: {regno}") 
 
         for var in self.user_vars.values(): 
             var.delete(0, tk.END) 
 
-        self.load_users_table()
+        self.users_table.added(regno)
+
+    def import_users(self):
+        from onboarding import prepare_users, read_user_file
+
+        if not self.is_admin_logged_in:
+            messagebox.showerror("Access Denied", "Admin login required to manage users")
+            return
+
+        fname = filedialog.askopenfilename(
+            filetypes=[("User lists", "*.csv *.xlsx *.xls"), ("CSV files", "*.csv"), ("Excel files", "*.xlsx *.xls")],
+            title="Import Users"
+        )
+        if not fname:
+            return
+
+        try:
+            new_users, rejected = prepare_users(read_user_file(fname), self.book.index.users)
+        except (OSError, ValueError, RuntimeError) as e:
+            messagebox.showerror("Import failed", str(e))
+            return
+
+        if len(new_users):
+            try:
+                self.book.add_users(new_users)
+            except OSError as e:
+                messagebox.showerror("Import failed", str(e))
+                return
+            self.load_users_table()
+
+        summary = f"Imported {len(new_users)} users."
+        if len(rejected):
+            reasons = "\n".join(f"  {reason}: {count}" for reason, count in rejected['Reason'].value_counts().items())
+            summary += f"\n\nSkipped {len(rejected)} rows:\n{reasons}"
+        messagebox.showinfo("Import Users", summary)
+        if len(new_users) and messagebox.askyesno("QR Badges", "Generate QR badges for the imported users?"):
+            self.generate_badges(new_users)
+
+    def generate_badges(self, users=None):
+        # Renders badges on a process pool from a background thread; a second
+        # click cancels
+        if self.badge_job is not None:
+            self.badge_job.cancel()
+            return
+        if not self.is_admin_logged_in:
+            messagebox.showerror("Access Denied", "Admin login required to manage users")
+            return
+
+        out_dir = filedialog.askdirectory(title="Save QR Badges To")
+        if not out_dir:
+            return
+
+        from onboarding import BadgeJob
+
+        self.badge_job = BadgeJob(self.book.users.copy() if users is None else users, out_dir)
+        self.badge_job.start()
+        self.badge_btn.config(text="Cancel Badges")
+        self.poll_badges()
+
+    def poll_badges(self):
+        job = self.badge_job
+        self.badge_label.config(text=f"{job.done}/{job.total} badges")
+        if not job.finished:
+            self.root.after(200, self.poll_badges)
+            return
+
+        self.badge_job = None
+        self.badge_btn.config(text="Generate Badges")
+        if job.error:
+            messagebox.showerror("Badges failed", str(job.error))
+        elif job.cancelled.is_set():
+            self.badge_label.config(text=f"Cancelled after {job.done} badges")
+        else:
+            messagebox.showinfo("Saved", f"{job.done} QR badges saved to:\n{job.out_dir}")
 
     def modify_user(self):
         if not self.is_admin_logged_in:
@@ -498,8 +1097,7 @@ class AttendanceApp:
             messagebox.showwarning("Selection Error", "Please select a user to modify")
             return
 
-        item = self.user_tree.item(selected[0])
-        old_regno = item['values'][0]
+        old_regno = selected[0]
 
         fn = self.user_vars["First Name"].get().strip() 
         ln = self.user_vars["Last Name"].get().strip()
@@ -516,27 +1114,31 @@ class AttendanceApp:
         new_regno = f"{year}-{fn}_{ln}_{dept}"
 
         # Check for duplicate RegNo (excluding the current user)
-        if new_regno != old_regno and new_regno in self.users['RegNo'].values:
+        if new_regno != old_regno and self.book.index.has_user(new_regno):
             messagebox.showerror("Duplicate Entry", "User with this registration number already exists")
             return
 
         # Update user details
-        idx = self.users.index[self.users['RegNo'] == old_regno].tolist()[0]
-        self.users.at[idx, 'RegNo'] = new_regno
-        self.users.at[idx, 'FirstName'] = fn
-        self.users.at[idx, 'LastName'] = ln
-        self.users.at[idx, 'Mobile'] = mob
-        self.users.at[idx, 'BloodGroup'] = bg
-        self.users.at[idx, 'Department'] = dept
-        self.users.at[idx, 'Position'] = pos
-
-        save_users(self.users)
+        try:
+            self.book.update_user(old_regno, {
+                "RegNo": new_regno,
+                "FirstName": fn,
+                "LastName": ln,
+                "Mobile": mob,
+                "BloodGroup": bg,
+                "Department": dept,
+                "Position": pos
+            })
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not update user:\n{e}")
+            return
+
         messagebox.showinfo("Success", f"User with RegNo: {new_regno} updated successfully")
 
         for var in self.user_vars.values(): 
             var.delete(0, tk.END) 
 
-        self.load_users_table()
+        self.users_table.updated(old_regno, new_regno)
 
     def delete_user(self):
         if not self.is_admin_logged_in:
@@ -548,14 +1150,16 @@ class AttendanceApp:
             messagebox.showwarning("Selection Error", "Please select a user to delete")
             return
 
-        item = self.user_tree.item(selected[0])
-        regno = item['values'][0]
+        regno = selected[0]
 
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete user with RegNo: {regno}?"):
-            self.users = self.users[self.users['RegNo'] != regno]
-            save_users(self.users)
+            try:
+                self.book.delete_user(regno)
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not delete user:\n{e}")
+                return
             messagebox.showinfo("Success", f"User with RegNo: {regno} deleted successfully")
-            self.load_users_table()
+            self.users_table.removed(regno)
             for var in self.user_vars.values(): 
                 var.delete(0, tk.END)
 
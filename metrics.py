@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# Hot-path instrumentation: named counters and per-stage latency timers with
+# rolling p50/p95/p99 over the most recent samples. Everything is off until
+# METRICS.enable(); while off, timer.time() hands back one shared no-op
+# context and inc()/observe() return after a single attribute check, so the
+# instrumented scan path pays next to nothing. Counters are bumped without a
+# lock, which is fine under the GIL for monitoring purposes.
+#
+# Snapshots can be written to a JSON file, a Prometheus text file (*.prom,
+# e.g. for node_exporter's textfile collector) or served over HTTP at
+# http://127.0.0.1:<port>/metrics.
+
+WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = "qr_attendance_"
+
+_NOOP = nullcontext()
+
+
+class Counter:
+    def __init__(self, registry, name, help_text):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, n=1):
+        if self.registry.enabled:
+            self.value += n
+
+
+class Timing:
+    __slots__ = ("timer", "start")
+
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.observe(time.perf_counter() - self.start)
+
+
+class StageTimer:
+    def __init__(self, registry, name, help_text, window=WINDOW):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        if self.registry.enabled:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def time(self):
+        return Timing(self) if self.registry.enabled else _NOOP
+
+    def quantiles(self):
+        import numpy as np
+
+        samples = list(self.samples)
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        return dict(zip(QUANTILES, np.quantile(samples, QUANTILES).tolist()))
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.timers = {}
+        self.server = None
+
+    def counter(self, name, help_text=""):
+        return self.counters.setdefault(name, Counter(self, name, help_text))
+
+    def timer(self, name, help_text=""):
+        return self.timers.setdefault(name, StageTimer(self, name, help_text))
+
+    def enable(self, on=True):
+        self.enabled = on
+
+    def reset(self):
+        for counter in self.counters.values():
+            counter.value = 0
+        for timer in self.timers.values():
+            timer.samples.clear()
+            timer.count = 0
+            timer.total = 0.0
+
+    # ----- Export -----
+    def snapshot(self):
+        timers = {}
+        for name, timer in self.timers.items():
+            q = timer.quantiles()
+            timers[name] = {"count": timer.count, "sum": timer.total,
+                            "p50": q[0.5], "p95": q[0.95], "p99": q[0.99]}
+        return {"time": time.time(), "counters": {name: c.value for name, c in self.counters.items()},
+                "timers": timers}
+
+    def prometheus_text(self):
+        lines = []
+        for name, counter in self.counters.items():
+            lines += [f"# HELP {PREFIX}{name} {counter.help}", f"# TYPE {PREFIX}{name} counter",
+                      f"{PREFIX}{name} {counter.value}"]
+        for name, timer in self.timers.items():
+            lines += [f"# HELP {PREFIX}{name} {timer.help}", f"# TYPE {PREFIX}{name} summary"]
+            lines += [f'{PREFIX}{name}{{quantile="{q}"}} {v:.6f}' for q, v in timer.quantiles().items()]
+            lines += [f"{PREFIX}{name}_sum {timer.total:.6f}", f"{PREFIX}{name}_count {timer.count}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # *.prom -> Prometheus text format, anything else -> JSON
+        text = self.prometheus_text() if path.endswith(".prom") else json.dumps(self.snapshot(), indent=2)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as fh:
+            fh.write(text)
+        os.replace(tmp, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+METRICS = Metrics()
+
+# ----- Scan path stages -----
+FRAMES_CAPTURED = METRICS.counter("frames_captured_total", "Frames read from capture sources")
+FRAMES_DROPPED = METRICS.counter("frames_dropped_total", "Frames dropped because decoders were behind")
+DECODES_ATTEMPTED = METRICS.counter("decodes_attempted_total", "Frames run through the QR decoder")
+DECODES_SUCCEEDED = METRICS.counter("decodes_succeeded_total", "Frames a QR code was decoded from")
+SCANS = {action: METRICS.counter(f"scans_{action}_total", f"Scans resulting in '{action}'")
+         for action in ("in", "out", "rejected")}
+SCANS_SUPPRESSED = METRICS.counter("scans_suppressed_total", "Repeat scans suppressed by the cooldown")
+SCANS_TOO_SOON = METRICS.counter("scans_too_soon_total", "Check-outs refused inside the minimum gap after check-in")
+
+SOUNDS_PLAYED = METRICS.counter("sounds_played_total", "Feedback sounds played")
+SOUNDS_COALESCED = METRICS.counter("sounds_coalesced_total", "Feedback sounds merged into a burst or dropped")
+SOUND_ERRORS = METRICS.counter("sound_errors_total", "Feedback sounds that failed to play")
+
+SYNC_EVENTS = METRICS.counter("sync_events_total", "Scan events applied by the attendance server")
+SYNC_DUPLICATES = METRICS.counter("sync_duplicates_total", "Re-sent scan events the server had already applied")
+SYNC_UPLOADED = METRICS.counter("sync_uploaded_total", "Scan events uploaded by this kiosk")
+SYNC_OVERRULED = METRICS.counter("sync_overruled_total", "Kiosk scan results the server decided differently")
+SYNC_FAILURES = METRICS.counter("sync_failures_total", "Sync rounds that could not reach the server")
+
+CAPTURE_READ = METRICS.timer("capture_read_seconds", "cap.read() latency")
+DECODE = METRICS.timer("decode_seconds", "Whole-frame QR detect and decode latency")
+MARK = METRICS.timer("mark_seconds", "Marking one scan: lookups plus storage write")
+PERSIST = METRICS.timer("persist_seconds", "Storage write of one check-in or check-out")
+COMPACTION = METRICS.timer("compaction_seconds", "Background rewrite of the attendance file")
+LOAD = METRICS.timer("load_seconds", "Loading users and attendance history")
+RECORDS_RENDER = METRICS.timer("records_render_seconds", "Rendering one page of the records tab")
+SYNC_UPLOAD = METRICS.timer("sync_upload_seconds", "Uploading one batch of scan events")
+SYNC_PULL = METRICS.timer("sync_pull_seconds", "Pulling and applying other gates' changes")
+UI_REFRESH = METRICS.timer("ui_refresh_seconds", "One scan tab refresh: results and previews")
@@ -0,0 +1,198 @@
+import argparse
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from storage import USER_COLUMNS, open_storage
+
+# Bulk user onboarding: read a CSV/XLSX roster, validate it and derive RegNos
+# ("{year}-{first}_{last}_{dept}", as the Manage Users form does) in one
+# vectorized pass, and render printable QR badges across a process pool.
+#
+#   python onboarding.py roster.xlsx --users users.csv --badges badges/
+
+# Accepted spellings of each column in an import file (compared lowercased,
+# without spaces or underscores)
+IMPORT_ALIASES = {
+    "FirstName": ("firstname", "first"),
+    "LastName": ("lastname", "last", "surname"),
+    "Mobile": ("mobile", "mobilenumber", "phone"),
+    "BloodGroup": ("bloodgroup", "blood"),
+    "Department": ("department", "dept"),
+    "Position": ("position", "designation", "role"),
+}
+REQUIRED_FIELDS = list(IMPORT_ALIASES)
+
+BADGE_WIDTH = 600
+BADGE_QR_SIZE = 420
+BADGE_MARGIN = 40
+
+
+def read_user_file(path):
+    if path.lower().endswith((".xlsx", ".xls")):
+        try:
+            df = pd.read_excel(path, dtype=str)
+        except ImportError as e:
+            raise RuntimeError("Excel import requires openpyxl (pip install openpyxl)") from e
+    else:
+        df = pd.read_csv(path, dtype=str)
+    lookup = {alias: col for col, aliases in IMPORT_ALIASES.items() for alias in aliases}
+    renamed = {c: lookup.get(re.sub(r"[\s_]+", "", str(c).lower()), c) for c in df.columns}
+    return df.rename(columns=renamed)
+
+
+def prepare_users(df, existing_regnos, year=None):
+    # Returns (users ready to add, rejected rows with a Reason column)
+    year = year or datetime.now().year
+    missing = [col for col in REQUIRED_FIELDS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    df = df[REQUIRED_FIELDS].fillna("").astype(str).apply(lambda col: col.str.strip())
+    df.insert(0, "RegNo", f"{year}-" + df["FirstName"] + "_" + df["LastName"] + "_" + df["Department"])
+
+    reason = pd.Series("", index=df.index)
+    reason[df["RegNo"].isin(set(existing_regnos))] = "RegNo already registered"
+    reason[df["RegNo"].duplicated(keep="first")] = "Duplicate RegNo in file"
+    reason[(df[REQUIRED_FIELDS] == "").any(axis=1)] = "Missing required fields"
+
+    ok = (reason == "").to_numpy()
+    return df[ok][USER_COLUMNS].reset_index(drop=True), df[~ok].assign(Reason=reason[~ok])
+
+
+# ----- QR badges -----
+def badge_filename(regno):
+    return re.sub(r"[^\w\-]+", "_", regno) + ".png"
+
+
+def render_badge(record, encoder=None):
+    # White card: QR of the RegNo with the name, department and RegNo below
+    encoder = encoder or cv2.QRCodeEncoder.create()
+    modules = encoder.encode(record["RegNo"])
+    modules = cv2.copyMakeBorder(modules, 4, 4, 4, 4, cv2.BORDER_CONSTANT, value=255)
+    qr = cv2.resize(modules, (BADGE_QR_SIZE, BADGE_QR_SIZE), interpolation=cv2.INTER_NEAREST)
+
+    height = BADGE_MARGIN + BADGE_QR_SIZE + 170
+    card = np.full((height, BADGE_WIDTH), 255, dtype=np.uint8)
+    x = (BADGE_WIDTH - BADGE_QR_SIZE) // 2
+    card[BADGE_MARGIN:BADGE_MARGIN + BADGE_QR_SIZE, x:x + BADGE_QR_SIZE] = qr
+
+    lines = [
+        (f"{record['FirstName']} {record['LastName']}", 1.1, 2),
+        (f"{record['Department']} - {record['Position']}", 0.8, 1),
+        (record["RegNo"], 0.6, 1),
+    ]
+    y = BADGE_MARGIN + BADGE_QR_SIZE + 20
+    for text, scale, thickness in lines:
+        (w, h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        scale = min(scale, scale * (BADGE_WIDTH - 20) / max(w, 1))
+        (w, h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        y += h + 25
+        cv2.putText(card, text, ((BADGE_WIDTH - w) // 2, y), cv2.FONT_HERSHEY_SIMPLEX, scale, 0, thickness,
+                    cv2.LINE_AA)
+    return card
+
+
+def write_badges(records, out_dir):
+    # One pool task: render and save a batch of badges
+    encoder = cv2.QRCodeEncoder.create()
+    for record in records:
+        cv2.imwrite(os.path.join(out_dir, badge_filename(record["RegNo"])), render_badge(record, encoder))
+    return len(records)
+
+
+def render_badges(users_df, out_dir, workers=None, batch_size=50, progress=None, cancelled=None):
+    # Renders badges for every row of users_df into out_dir across a process
+    # pool; progress(done, total) is called as batches finish. Returns the count.
+    os.makedirs(out_dir, exist_ok=True)
+    records = users_df[USER_COLUMNS].fillna("").astype(str).to_dict("records")
+    batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+    done = 0
+    # spawn: the GUI process has Tk and background threads that must not be
+    # forked; one OpenCV thread per worker so processes don't oversubscribe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=cv2.setNumThreads, initargs=(1,)) as pool:
+        futures = [pool.submit(write_badges, batch, out_dir) for batch in batches]
+        for future in futures:
+            if cancelled is not None and cancelled.is_set():
+                for pending in futures:
+                    pending.cancel()
+                break
+            done += future.result()
+            if progress:
+                progress(done, len(records))
+    return done
+
+
+class BadgeJob:
+    # Runs render_badges on a background thread; the UI polls done/total/finished
+    def __init__(self, users_df, out_dir, workers=None):
+        self.users = users_df
+        self.out_dir = out_dir
+        self.workers = workers
+        self.done = 0
+        self.total = len(users_df)
+        self.finished = False
+        self.error = None
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self, done, total):
+        self.done = done
+
+    def run(self):
+        try:
+            render_badges(self.users, self.out_dir, workers=self.workers, progress=self.progress,
+                          cancelled=self.cancelled)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a user roster and render QR badges")
+    parser.add_argument("roster", help="CSV or XLSX file with FirstName, LastName, Mobile, BloodGroup, "
+                                       "Department and Position columns")
+    parser.add_argument("--users", default="users.csv")
+    parser.add_argument("--attendance", default="attendance.csv")
+    parser.add_argument("--journal", default="attendance.journal")
+    parser.add_argument("--db", default="attendance.db")
+    parser.add_argument("--backend", choices=("csv", "sqlite", "partitioned"), default="csv")
+    parser.add_argument("--badges", help="Directory to write QR badges into")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # Run with the app closed, whose next save of the users could overwrite
+    # the import. Written through the app's backend (sqlite: the database).
+    storage = open_storage(args.backend, args.users, args.attendance, args.journal, args.db)
+    users = storage.load_users()
+    new_users, rejected = prepare_users(read_user_file(args.roster), users["RegNo"])
+    if len(new_users):
+        changes = {record["RegNo"]: record for record in new_users.to_dict("records")}
+        storage.save_user_changes(changes, pd.concat([users, new_users], ignore_index=True))
+    storage.close()
+    print(f"Imported {len(new_users)} users, rejected {len(rejected)}")
+    for reason, count in rejected["Reason"].value_counts().items():
+        print(f"  {reason}: {count}")
+    if args.badges:
+        n = render_badges(new_users, args.badges, workers=args.workers)
+        print(f"Wrote {n} badges to {args.badges}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from snapshot import read_snapshot, write_snapshot
+from storage import CsvStorage, empty_attendance, filter_chunk, normalize_attendance, with_names
+
+# Month-partitioned attendance history. Rows live in one file per month
+# (YYYY-MM) of their Date, listed in manifest.json. The active window (the
+# last active_months months) is kept as plain CSV with a binary snapshot and
+# is all that load_attendance() returns, so startup and memory follow the
+# window rather than total history. At startup, months that fell out of the
+# window are sealed into gzip CSV and only read again, a partition at a time,
+# for date-range searches, user histories and exports. Sealed months older
+# than retention_months are moved to expired/ or deleted.
+#
+# Scans keep going through the CsvStorage journal; compaction rewrites the
+# active partitions only.
+
+MANIFEST_VERSION = 1
+RETENTION_ACTIONS = ("move", "purge")
+# Sealed partitions kept decompressed in memory for repeated queries
+ARCHIVE_CACHE_PARTITIONS = 2
+# Rows whose Date does not parse
+UNDATED = "0000-00"
+
+
+def month_of(day):
+    return day[:7] if len(day) >= 7 and day[:4].isdigit() else UNDATED
+
+
+def months_of(dates):
+    # month_of for a Date column, once per distinct date
+    codes, uniques = pd.factorize(dates)
+    return pd.Series(np.array([month_of(str(u)) for u in uniques] + [UNDATED], dtype=object)[codes],
+                     index=dates.index)
+
+
+def month_start(today, months_back):
+    # "YYYY-MM" of the month months_back before today's
+    index = today.year * 12 + today.month - 1 - months_back
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def read_partition_csv(path):
+    return normalize_attendance(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+
+class PartitionedStorage(CsvStorage):
+    def __init__(self, user_file, partition_dir, journal_file, compact_every=2000, active_months=2,
+                 retention_months=None, retention_action="move", legacy_file=None):
+        if active_months < 1:
+            raise ValueError("active_months must be at least 1")
+        if retention_months is not None and retention_months < active_months:
+            raise ValueError("retention_months must cover the active window")
+        if retention_action not in RETENTION_ACTIONS:
+            raise ValueError(f"Unknown retention action: {retention_action}")
+        super().__init__(user_file, os.path.join(partition_dir, "manifest.json"), journal_file, compact_every)
+        self.partition_dir = partition_dir
+        self.active_months = active_months
+        self.retention_months = retention_months
+        self.retention_action = retention_action
+        # A single attendance.csv to split into partitions on first start
+        self.legacy_file = legacy_file
+        self.manifest = {"version": MANIFEST_VERSION, "partitions": {}}
+        # Compaction adds months from its own thread while the UI and exports
+        # list them: changes and iterations of the partition dict hold this
+        self.manifest_lock = threading.RLock()
+        self.window_start = None
+        self.cache = OrderedDict()
+
+    # ----- Files -----
+    def path(self, name):
+        return os.path.join(self.partition_dir, name)
+
+    def active_path(self, month):
+        return self.path(f"{month}.csv")
+
+    def snapshot_path(self, month):
+        return self.path(f"{month}.snapshot")
+
+    def sealed_path(self, month):
+        return self.path(f"{month}.csv.gz")
+
+    def read_manifest(self):
+        try:
+            with open(self.attendance_file, encoding="utf-8") as fh:
+                manifest = json.load(fh)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"version": MANIFEST_VERSION, "partitions": {}}
+
+    def write_manifest(self):
+        with self.manifest_lock:
+            text = json.dumps(self.manifest, indent=1, sort_keys=True)
+        tmp = self.attendance_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(tmp, self.attendance_file)
+
+    def partition_items(self):
+        # Sorted (month, entry) pairs, copied under the lock
+        with self.manifest_lock:
+            return sorted(self.manifest["partitions"].items())
+
+    def set_partition(self, month, entry):
+        with self.manifest_lock:
+            if entry is None:
+                del self.manifest["partitions"][month]
+            else:
+                self.manifest["partitions"][month] = entry
+
+    # ----- Loading -----
+    def read_attendance(self, readonly=False):
+        if not readonly:
+            os.makedirs(self.partition_dir, exist_ok=True)
+        self.manifest = self.read_manifest()
+        if not self.manifest["partitions"] and self.legacy_file and os.path.exists(self.legacy_file):
+            # First start: split the single CSV (the journal is replayed on top)
+            df = normalize_attendance(pd.read_csv(self.legacy_file))
+            if not readonly:
+                self.save_attendance(df)
+            return df
+        # Months past the window but not sealed yet are returned too
+        frames = [self.read_active(month, readonly) for month, part in self.partition_items() if not part["sealed"]]
+        return pd.concat(frames, ignore_index=True) if frames else empty_attendance()
+
+    def read_active(self, month, readonly=False):
+        df = read_snapshot(self.active_path(month), self.snapshot_path(month))
+        if df is None:
+            df = read_partition_csv(self.active_path(month))
+            if not readonly:
+                self.write_partition_snapshot(month, df)
+        return df
+
+    def load_attendance(self):
+        df = super().load_attendance()
+        cutoff = month_start(date.today(), self.active_months - 1)
+        months = months_of(df['Date'])
+        old = (months < cutoff).to_numpy()
+        if old.any():
+            for month, part in df[old].groupby(months[old], sort=True):
+                self.seal(month, part)
+            df = df[~old].reset_index(drop=True)
+        self.window_start = f"{cutoff}-01"
+        self.apply_retention()
+        self.write_manifest()
+        return df
+
+    # ----- Writing -----
+    def save_attendance(self, att_df):
+        # One file per month; called with the active window (compaction) or
+        # the whole history (first start)
+        months = months_of(att_df['Date'])
+        for month, part in att_df.groupby(months, sort=True):
+            part = part.reset_index(drop=True)
+            if self.manifest["partitions"].get(month, {}).get("sealed"):
+                # Late rows for a sealed month, e.g. replayed from the journal
+                self.seal(month, part)
+                continue
+            tmp = self.active_path(month) + ".tmp"
+            part.to_csv(tmp, index=False)
+            os.replace(tmp, self.active_path(month))
+            self.write_partition_snapshot(month, part)
+            self.set_partition(month, {"file": os.path.basename(self.active_path(month)), "rows": len(part),
+                                       "sealed": False})
+        self.write_manifest()
+
+    def write_partition_snapshot(self, month, df):
+        try:
+            write_snapshot(df, self.active_path(month), self.snapshot_path(month))
+        except OSError:
+            pass
+
+    def seal(self, month, part):
+        # Compress a month out of the active window; rows already sealed
+        # for it are kept, the newer copy of a duplicate row wins
+        if self.manifest["partitions"].get(month, {}).get("sealed"):
+            part = pd.concat([self.read_sealed(month), part], ignore_index=True)
+            part = part.drop_duplicates(['RegNo', 'Date', 'InTime'], keep='last')
+        part = part.sort_values(['Date', 'InTime'], kind='stable').reset_index(drop=True)
+        tmp = self.sealed_path(month) + ".tmp"
+        part.to_csv(tmp, index=False, compression="gzip")
+        os.replace(tmp, self.sealed_path(month))
+        self.set_partition(month, {"file": os.path.basename(self.sealed_path(month)), "rows": len(part),
+                                   "sealed": True})
+        self.write_manifest()
+        self.cache.pop(month, None)
+        if os.path.exists(self.active_path(month)):
+            os.remove(self.active_path(month))
+        shutil.rmtree(self.snapshot_path(month), ignore_errors=True)
+
+    def apply_retention(self):
+        if self.retention_months is None:
+            return
+        cutoff = month_start(date.today(), self.retention_months - 1)
+        for month in [m for m, part in self.partition_items() if part["sealed"] and m < cutoff]:
+            path = self.sealed_path(month)
+            # A file already gone (removed by hand) only loses its manifest entry
+            if not os.path.exists(path):
+                pass
+            elif self.retention_action == "move":
+                os.makedirs(self.path("expired"), exist_ok=True)
+                os.replace(path, os.path.join(self.path("expired"), os.path.basename(path)))
+            else:
+                os.remove(path)
+            self.set_partition(month, None)
+            self.cache.pop(month, None)
+
+    # ----- Archive queries -----
+    def sealed_months(self, date_from=None, date_to=None):
+        return [month for month, part in self.partition_items() if part["sealed"]
+                and (not date_from or month >= month_of(date_from)) and (not date_to or month <= month_of(date_to))]
+
+    def read_sealed(self, month):
+        df = self.cache.get(month)
+        if df is None:
+            df = read_partition_csv(self.sealed_path(month))
+            self.cache[month] = df
+            if len(self.cache) > ARCHIVE_CACHE_PARTITIONS:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(month)
+        return df
+
+    def archive_start(self):
+        return self.window_start if self.sealed_months() else None
+
+    def read_archive(self, date_from=None, date_to=None):
+        for month in self.sealed_months(date_from, date_to):
+            df = self.read_sealed(month)
+            yield filter_chunk(df, {'date_from': date_from, 'date_to': date_to})
+
+    def archive_files(self, date_from=None, date_to=None):
+        return [(self.sealed_path(month), self.manifest["partitions"][month]["rows"])
+                for month in self.sealed_months(date_from, date_to)]
+
+    def user_history(self, regno, attendance):
+        frames = [df[df['RegNo'] == regno] for df in self.read_archive()]
+        frames.append(super().user_history(regno, attendance))
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_attendance(self, filters, users_df, attendance, order, chunksize=50000):
+        # Sealed months in the filter's date range first, then the active window
+        months = self.sealed_months(filters.get('date_from'), filters.get('date_to'))
+        total = sum(self.manifest["partitions"][m]["rows"] for m in months) + len(order)
+        done = 0
+        users_by_regno = users_df.drop_duplicates('RegNo').set_index('RegNo')
+        for month in months:
+            df = self.read_sealed(month)
+            done += len(df)
+            for start in range(0, len(df), chunksize):
+                chunk = with_names(df.iloc[start:start + chunksize].copy(), users_by_regno)
+                yield filter_chunk(chunk, filters), done / max(1, total)
+        for chunk, fraction in super().iter_attendance(filters, users_df, attendance, order, chunksize):
+            yield chunk, (done + fraction * len(order)) / max(1, total)
+
+
+def add_partition_arguments(parser):
+    parser.add_argument("--partitions", default="attendance_partitions", help="partition directory")
+    parser.add_argument("--active-months", type=int, default=2, help="months loaded at startup")
+    parser.add_argument("--retention-months", type=int, default=None, help="expire partitions older than this")
+    parser.add_argument("--retention-action", choices=RETENTION_ACTIONS, default="move",
+                        help="move expired partitions to expired/ or delete them")
+
+
+def partition_options(args):
+    # open_storage() keyword arguments for the options above
+    return {"partition_dir": args.partitions, "active_months": args.active_months,
+            "retention_months": args.retention_months, "retention_action": args.retention_action}
+
+
+if __name__ == "__main__":
+    # Splits attendance.csv into partitions (first run), seals months out of
+    # the active window and applies retention, then lists the partitions
+    parser = argparse.ArgumentParser(description="Maintain the month-partitioned attendance archive")
+    parser.add_argument("--users", default="users.csv")
+    parser.add_argument("--attendance", default="attendance.csv")
+    parser.add_argument("--journal", default="attendance.journal")
+    add_partition_arguments(parser)
+    args = parser.parse_args()
+    storage = PartitionedStorage(args.users, args.partitions, args.journal, active_months=args.active_months,
+                                 retention_months=args.retention_months, retention_action=args.retention_action,
+                                 legacy_file=args.attendance)
+    active = storage.load_attendance()
+    storage.close()
+    for month, part in storage.partition_items():
+        print(f"{month}  {part['rows']:>9} rows  {'sealed' if part['sealed'] else 'active'}")
+    print(f"{len(active)} rows in the active window")
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from metrics import DECODE
+
+# QR detection strategies for the scan pipeline:
+#   full      - detectAndDecode on the full-resolution frame
+#   downscale - detect on a downscaled grayscale frame, then decode only the
+#               located quadrilateral at full resolution
+#   roi       - search only around the last known bounding box, falling back
+#               to the downscale pass when the code is lost
+DETECT_STRATEGIES = ("full", "downscale", "roi")
+
+
+def percentiles(samples, qs=(50, 95, 99)):
+    if not samples:
+        return {q: 0.0 for q in qs}
+    return dict(zip(qs, np.percentile(np.fromiter(samples, dtype=float), qs)))
+
+
+class DetectionStats:
+    # Shared by all decoder threads; keyed by the pass that actually ran.
+    # frame_samples keeps the most recent whole-frame decode latencies.
+    def __init__(self, max_samples=10000):
+        self.lock = threading.Lock()
+        self.passes = {}
+        self.frame_samples = deque(maxlen=max_samples)
+
+    def record_frame(self, seconds):
+        self.frame_samples.append(seconds)
+
+    def record(self, name, seconds, hit):
+        with self.lock:
+            entry = self.passes.setdefault(name, {"attempts": 0, "hits": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["attempts"] += 1
+            entry["hits"] += int(hit)
+            entry["total_s"] += seconds
+            entry["max_s"] = max(entry["max_s"], seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: {
+                "attempts": e["attempts"],
+                "hits": e["hits"],
+                "hit_rate": e["hits"] / e["attempts"] if e["attempts"] else 0.0,
+                "avg_ms": e["total_s"] / e["attempts"] * 1000 if e["attempts"] else 0.0,
+                "max_ms": e["max_s"] * 1000,
+            } for name, e in self.passes.items()}
+
+    def summary(self):
+        return "  ".join(f"{name}: {s['avg_ms']:.1f} ms, {s['hit_rate']:.0%} hits ({s['attempts']})"
+                         for name, s in sorted(self.snapshot().items()))
+
+
+class QRDecoder:
+    # One per decoder thread: cv2.QRCodeDetector is reused across frames but
+    # must not be shared between threads.
+    def __init__(self, strategy="full", scale=0.5, roi_margin=0.5, stats=None):
+        if strategy not in DETECT_STRATEGIES:
+            raise ValueError(f"Unknown detection strategy: {strategy}")
+        self.strategy = strategy
+        self.scale = scale
+        self.roi_margin = roi_margin
+        self.stats = stats if stats is not None else DetectionStats()
+        self.detector = cv2.QRCodeDetector()
+        self.last_bbox = None
+
+    def decode(self, frame):
+        start = time.perf_counter()
+        data = self.decode_frame(frame)
+        elapsed = time.perf_counter() - start
+        self.stats.record_frame(elapsed)
+        DECODE.observe(elapsed)
+        return data
+
+    def decode_frame(self, frame):
+        if self.strategy == "full":
+            return self.decode_full(frame)
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.strategy == "roi" and self.last_bbox is not None:
+            data = self.decode_roi(gray)
+            if data:
+                return data
+        return self.decode_downscale(gray)
+
+    def decode_full(self, frame):
+        start = time.perf_counter()
+        data, _, _ = self.detector.detectAndDecode(frame)
+        self.stats.record("full", time.perf_counter() - start, bool(data))
+        return data
+
+    def decode_downscale(self, gray):
+        start = time.perf_counter()
+        small = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        found, points = self.detector.detect(small)
+        data = ""
+        if found and points is not None:
+            points = points / self.scale
+            data, _ = self.detector.decode(gray, points)
+            self.last_bbox = bounding_box(points) if data else None
+        else:
+            self.last_bbox = None
+        self.stats.record("downscale", time.perf_counter() - start, bool(data))
+        return data
+
+    def decode_roi(self, gray):
+        start = time.perf_counter()
+        x0, y0, x1, y1 = expand_box(self.last_bbox, self.roi_margin, gray.shape)
+        crop = gray[y0:y1, x0:x1]
+        data, points, _ = self.detector.detectAndDecode(crop)
+        if data and points is not None:
+            self.last_bbox = bounding_box(points + np.array([x0, y0], dtype=points.dtype))
+        else:
+            self.last_bbox = None
+        self.stats.record("roi", time.perf_counter() - start, bool(data))
+        return data
+
+
+def bounding_box(points):
+    pts = points.reshape(-1, 2)
+    x0, y0 = pts.min(axis=0)
+    x1, y1 = pts.max(axis=0)
+    return int(x0), int(y0), int(np.ceil(x1)), int(np.ceil(y1))
+
+
+def expand_box(bbox, margin, shape):
+    x0, y0, x1, y1 = bbox
+    dx = int((x1 - x0) * margin)
+    dy = int((y1 - y0) * margin)
+    height, width = shape[:2]
+    return max(0, x0 - dx), max(0, y0 - dy), min(width, x1 + dx), min(height, y1 + dy)
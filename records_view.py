@@ -0,0 +1,103 @@
+import bisect
+import tkinter as tk
+
+from metrics import RECORDS_RENDER
+
+# Paginated view over attendance rows for a ttk.Treeview. Rows are attendance
+# positions kept in ascending (Date, InTime) order and shown newest first; only
+# the current page is materialized in the widget, so rendering cost depends on
+# the page size rather than on the size of the history.
+
+
+class RecordsPager:
+    def __init__(self, tree, row_values, sort_key, page_size=100, on_change=None):
+        self.tree = tree
+        self.row_values = row_values
+        # pos -> (Date, InTime) order key, for rows that arrive out of order
+        self.sort_key = sort_key
+        self.values = row_values
+        self.page_size = page_size
+        self.on_change = on_change
+        self.all_rows = []
+        self.rows = self.all_rows
+        self.filtered = False
+        self.page = 0
+
+    def load(self, positions):
+        self.all_rows = list(positions)
+        self.show_all()
+
+    def show_all(self):
+        self.rows = self.all_rows
+        self.values = self.row_values
+        self.filtered = False
+        self.page = 0
+        self.render()
+
+    def show(self, positions, row_values=None):
+        # row_values for positions in another store, e.g. archived history
+        self.rows = list(positions)
+        self.values = row_values or self.row_values
+        self.filtered = True
+        self.page = 0
+        self.render()
+
+    def page_count(self):
+        return max(1, -(-len(self.rows) // self.page_size))
+
+    def visible(self):
+        # Display order is newest first, i.e. the tail of self.rows reversed
+        end = len(self.rows) - self.page * self.page_size
+        start = max(0, end - self.page_size)
+        return [(i, self.rows[i]) for i in range(end - 1, start - 1, -1)]
+
+    def tag(self, order):
+        # Parity of the row's place in the full order, so tags stay stable
+        # when new rows are pushed onto the top of the page
+        return "evenrow" if order % 2 == 0 else "oddrow"
+
+    def render(self):
+        with RECORDS_RENDER.time():
+            self.tree.delete(*self.tree.get_children())
+            for order, pos in self.visible():
+                self.tree.insert("", tk.END, iid=str(pos), values=self.values(pos), tags=self.tag(order))
+        self.changed()
+
+    def append(self, pos):
+        # New scans are usually the newest row and the full list grows at the
+        # tail; rows for an earlier Date (synced from other gates, night shifts
+        # dated the day they started) are inserted in order
+        newest = not self.all_rows or self.sort_key(pos) >= self.sort_key(self.all_rows[-1])
+        if newest:
+            self.all_rows.append(pos)
+        else:
+            bisect.insort_right(self.all_rows, pos, key=self.sort_key)
+        if self.filtered:
+            return
+        if self.page == 0 and newest:
+            self.tree.insert("", 0, iid=str(pos), values=self.row_values(pos), tags=self.tag(len(self.rows) - 1))
+            children = self.tree.get_children()
+            if len(children) > self.page_size:
+                self.tree.delete(children[-1])
+            self.changed()
+        else:
+            self.render()
+
+    def refresh_row(self, pos):
+        iid = str(pos)
+        if self.values is self.row_values and self.tree.exists(iid):
+            self.tree.item(iid, values=self.row_values(pos))
+
+    def next_page(self):
+        if self.page + 1 < self.page_count():
+            self.page += 1
+            self.render()
+
+    def prev_page(self):
+        if self.page > 0:
+            self.page -= 1
+            self.render()
+
+    def changed(self):
+        if self.on_change:
+            self.on_change(f"Page {self.page + 1} of {self.page_count()} ({len(self.rows)} records)")
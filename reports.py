@@ -0,0 +1,280 @@
+import argparse
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, time
+
+import numpy as np
+import pandas as pd
+
+from attendance_store import INVALID, AttendanceStore, parse_date
+
+# Historical attendance reports: per user, days present and attendance
+# percentage, late arrivals, early departures, sessions and hours over a date
+# range. The history is split into one task per month (live rows are shipped
+# as int32 columns, archived partitions are read by the worker itself) and
+# run on a process pool, or inline for small histories; each task reduces its rows to one line per user with
+# numpy, and the partial tables are summed at the end.
+#
+# A user is late on a day whose first check-in is after work_start plus
+# grace, and leaves early on a day whose last session ends before work_end
+# minus grace (a session still open, or one running past midnight, is not
+# early). Attendance % is days present over the days anyone was present.
+#
+#   python reports.py --from 2026-01-01 --to 2026-06-30 --out report.csv
+
+SECONDS_PER_DAY = 86400
+# Below this many rows the tasks run inline: starting a spawn pool (each
+# worker imports pandas) takes about as long as reducing a million rows
+POOL_MIN_ROWS = 1_000_000
+NEVER = np.iinfo(np.int64).max
+PARTIAL_COLUMNS = ['RegNo', 'Days', 'Late', 'Early', 'Sessions', 'Seconds']
+REPORT_COLUMNS = ['RegNo', 'FirstName', 'LastName', 'Department', 'Days', 'AttendancePct', 'Late', 'Early',
+                  'Sessions', 'Hours']
+
+
+def clock_seconds(value):
+    # "09:00" or "09:00:30"; anything else raises ValueError
+    moment = time.fromisoformat(value)
+    return moment.hour * 3600 + moment.minute * 60 + moment.second
+
+
+class ReportParams:
+    def __init__(self, date_from=None, date_to=None, work_start="09:00", work_end="17:00", grace_min=5,
+                 regnos=None):
+        self.day_from = parse_date(date_from) if date_from else None
+        self.day_to = parse_date(date_to) if date_to else None
+        self.late_after = clock_seconds(work_start) + grace_min * 60
+        self.early_before = clock_seconds(work_end) - grace_min * 60
+        # Users to report on (None for everyone); working days count everyone
+        self.regnos = None if regnos is None else set(regnos)
+
+
+# ----- Worker side -----
+def user_table(regnos, ids, days, tin, tout, params):
+    # (per-user partial table, distinct days present) for one task's rows
+    valid = (days != INVALID) & (tin != INVALID)
+    if params.day_from is not None:
+        valid &= days >= params.day_from
+    if params.day_to is not None:
+        valid &= days <= params.day_to
+    ids, days, tin, tout = (a[valid].astype(np.int64) for a in (ids, days, tin, tout))
+    workdays = np.unique(days)
+    if params.regnos is not None:
+        wanted = np.array([regno in params.regnos for regno in regnos] + [False], dtype=bool)
+        keep = wanted[ids]
+        ids, days, tin, tout = ids[keep], days[keep], tin[keep], tout[keep]
+    if not len(ids):
+        return pd.DataFrame(columns=PARTIAL_COLUMNS), workdays
+
+    # One group per (user, day), sessions in InTime order
+    order = np.lexsort((tin, days, ids))
+    ids, days, tin, tout = ids[order], days[order], tin[order], tout[order]
+    starts = np.flatnonzero(np.r_[True, (ids[1:] != ids[:-1]) | (days[1:] != days[:-1])])
+    closed = tout >= 0
+    seconds = np.where(closed, (tout - tin) % SECONDS_PER_DAY, 0)
+    ends = np.where(closed, np.where(tout >= tin, tout, tout + SECONDS_PER_DAY), NEVER)
+    late = tin[starts] > params.late_after
+    early = np.maximum.reduceat(ends, starts) < params.early_before
+
+    # Then one line per user
+    users, group_user = np.unique(ids[starts], return_inverse=True)
+    row_user = np.repeat(group_user, np.diff(np.r_[starts, len(ids)]))
+    table = pd.DataFrame({
+        'RegNo': np.array(regnos, dtype=object)[users],
+        'Days': np.bincount(group_user),
+        'Late': np.bincount(group_user, weights=late).astype(np.int64),
+        'Early': np.bincount(group_user, weights=early).astype(np.int64),
+        'Sessions': np.bincount(row_user),
+        'Seconds': np.bincount(row_user, weights=seconds),
+    })
+    return table, workdays
+
+
+def task_rows(task):
+    return task[2] if task[0] == "file" else len(task[2])
+
+
+def run_task(task, params):
+    if task[0] == "file":
+        from partitions import read_partition_csv
+        store = AttendanceStore.from_frame(read_partition_csv(task[1]))
+        task = ("rows", store.regnos, store.ids(), store.days(), store.in_seconds(), store.out_seconds())
+    _, regnos, ids, days, tin, tout = task
+    return user_table(regnos, ids, days, tin, tout, params)
+
+
+# ----- Parent side -----
+def month_tasks(attendance, date_from=None, date_to=None):
+    # One task per month of the store's rows in range, each with its own
+    # compact RegNo ids so only the users it mentions are shipped
+    days = attendance.days()
+    keep = np.ones(len(days), dtype=bool)
+    if date_from:
+        keep &= days >= parse_date(date_from)
+    if date_to:
+        keep &= days <= parse_date(date_to)
+    keep &= days != INVALID
+    positions = np.flatnonzero(keep)
+    unique_days, day_codes = np.unique(days[positions], return_inverse=True)
+    day_month = np.array([date.fromordinal(int(d)).year * 12 + date.fromordinal(int(d)).month
+                          for d in unique_days], dtype=np.int64)
+    months = day_month[day_codes]
+    tasks = []
+    for month in np.unique(months):
+        rows = positions[months == month]
+        local, ids = np.unique(attendance.ids()[rows], return_inverse=True)
+        tasks.append(("rows", [attendance.regnos[i] for i in local], ids.astype(np.int32),
+                      attendance.days()[rows], attendance.in_seconds()[rows], attendance.out_seconds()[rows]))
+    return tasks
+
+
+def merge(partials, workdays, users_df):
+    tables = [table for table in partials if len(table)]
+    totals = (pd.concat(tables, ignore_index=True).groupby('RegNo', sort=True).sum().reset_index()
+              if tables else pd.DataFrame(columns=PARTIAL_COLUMNS))
+    names = users_df.drop_duplicates('RegNo').set_index('RegNo')
+    for col in ('FirstName', 'LastName', 'Department'):
+        totals[col] = totals['RegNo'].map(names[col]).fillna("")
+    totals['AttendancePct'] = (100.0 * totals['Days'] / max(1, len(workdays))).round(1)
+    totals['Hours'] = (totals['Seconds'].astype(float) / 3600).round(2)
+    return totals[REPORT_COLUMNS]
+
+
+def build_report(tasks, params, users_df, workers=None, progress=None, cancelled=None, pool_min_rows=POOL_MIN_ROWS):
+    # Runs the tasks (inline for one worker or fewer than pool_min_rows rows;
+    # workers=None is one per CPU), merging as they finish; progress(done,
+    # total) per task. None if cancelled.
+    partials = []
+    workdays = set()
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1 or sum(task_rows(task) for task in tasks) < pool_min_rows:
+        for done, task in enumerate(tasks, 1):
+            if cancelled is not None and cancelled.is_set():
+                return None
+            table, days = run_task(task, params)
+            partials.append(table)
+            workdays.update(days.tolist())
+            if progress:
+                progress(done, len(tasks))
+        return merge(partials, workdays, users_df)
+
+    # spawn, as for badges: the GUI process must not be forked
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = {pool.submit(run_task, task, params) for task in tasks}
+        while pending:
+            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            if cancelled is not None and cancelled.is_set():
+                for future in pending:
+                    future.cancel()
+                return None
+            for future in finished:
+                table, days = future.result()
+                partials.append(table)
+                workdays.update(days.tolist())
+            if progress and finished:
+                progress(len(tasks) - len(pending), len(tasks))
+    return merge(partials, workdays, users_df)
+
+
+def report_tasks(book, date_from=None, date_to=None):
+    # Archived months plus the live store, from a copy taken under the lock
+    with book.lock:
+        attendance = book.attendance.copy()
+    tasks = [("file", path, rows) for path, rows in book.storage.archive_files(date_from, date_to)]
+    return tasks + month_tasks(attendance, date_from, date_to)
+
+
+class ReportJob:
+    # Runs build_report on a background thread and writes the CSV; the UI
+    # polls done/total/finished
+    def __init__(self, book, path, params, date_from=None, date_to=None, workers=None):
+        self.book = book
+        self.path = path
+        self.params = params
+        self.date_from = date_from
+        self.date_to = date_to
+        self.workers = workers
+        self.done = 0
+        self.total = 0
+        self.report = None
+        self.finished = False
+        self.error = None
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self, done, total):
+        self.done = done
+
+    def run(self):
+        try:
+            tasks = report_tasks(self.book, self.date_from, self.date_to)
+            self.total = len(tasks)
+            self.report = build_report(tasks, self.params, self.book.users, workers=self.workers,
+                                       progress=self.progress, cancelled=self.cancelled)
+            if self.report is not None:
+                self.report.to_csv(self.path, index=False)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+
+
+def main():
+    from partitions import add_partition_arguments, partition_options
+    from storage import open_storage
+
+    parser = argparse.ArgumentParser(description="Per-user attendance report over a date range")
+    parser.add_argument("--from", dest="date_from", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="last day (YYYY-MM-DD)")
+    parser.add_argument("--work-start", default="09:00", help="HH:MM")
+    parser.add_argument("--work-end", default="17:00", help="HH:MM")
+    parser.add_argument("--grace", type=int, default=5, help="minutes allowed before counting late/early")
+    parser.add_argument("--department", action="append", help="only users of this department (repeatable)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="attendance_report.csv")
+    parser.add_argument("--users", default="users.csv")
+    parser.add_argument("--attendance", default="attendance.csv")
+    parser.add_argument("--journal", default="attendance.journal")
+    parser.add_argument("--db", default="attendance.db")
+    parser.add_argument("--backend", choices=("csv", "sqlite", "partitioned"), default="csv")
+    add_partition_arguments(parser)
+    args = parser.parse_args()
+
+    # Read-only, so it can run beside the app: the journal is replayed in
+    # memory and nothing is compacted, sealed or created
+    needed = args.db if args.backend == "sqlite" else args.users
+    if not os.path.exists(needed):
+        parser.error(f"{needed} not found")
+    storage = open_storage(args.backend, args.users, args.attendance, args.journal, args.db,
+                           **partition_options(args))
+    users = storage.load_users()
+    attendance = AttendanceStore.from_frame(storage.peek_attendance())
+    regnos = None
+    if args.department:
+        regnos = users.loc[users['Department'].isin(args.department), 'RegNo']
+    try:
+        params = ReportParams(args.date_from, args.date_to, args.work_start, args.work_end, args.grace, regnos)
+    except ValueError as e:
+        parser.error(f"--work-start/--work-end must be HH:MM or HH:MM:SS ({e})")
+    tasks = ([("file", path, rows) for path, rows in storage.archive_files(args.date_from, args.date_to)]
+             + month_tasks(attendance, args.date_from, args.date_to))
+    report = build_report(tasks, params, users, workers=args.workers,
+                          progress=lambda done, total: print(f"\r{done}/{total} partitions", end="", flush=True))
+    storage.close()
+    print()
+    report.to_csv(args.out, index=False)
+    print(f"{len(report)} users, {report['Hours'].sum():.1f} hours, {report['Late'].sum()} late arrivals, "
+          f"{report['Early'].sum()} early departures -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
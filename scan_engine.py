@@ -0,0 +1,217 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from attendance_core import ScanResult
+from dedup import TOO_SOON, ScanDeduper
+from metrics import MARK, SCANS
+from qr_detect import DetectionStats
+from scanner import FramePipeline
+
+# Multi-gate scanning: one FramePipeline per capture source (camera index,
+# video file or directory of images), each with its own decode workers, all
+# checked against one shared ScanDeduper and writing through a single
+# AttendanceWriter. Outcomes are queued for the UI thread to display.
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class ImageDirSource:
+    # Replays a directory of still frames in name order, like a camera
+    def __init__(self, path, fps=None):
+        self.files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.pos = 0
+        self.interval = 1.0 / fps if fps else 0
+        self.next_at = time.monotonic()
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def read(self):
+        if self.pos >= len(self.files):
+            return False, None
+        if self.interval:
+            delay = self.next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_at = max(self.next_at, time.monotonic() - self.interval) + self.interval
+        frame = cv2.imread(self.files[self.pos])
+        self.pos += 1
+        return frame is not None, frame
+
+    def release(self):
+        pass
+
+
+class VideoFileSource:
+    # cv2.VideoCapture over a file, optionally paced to the file's frame rate
+    def __init__(self, path, realtime=True):
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if realtime else 0
+        self.interval = 1.0 / fps if fps and fps > 0 else 0
+        self.next_at = time.monotonic()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.interval:
+            delay = self.next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_at = max(self.next_at, time.monotonic() - self.interval) + self.interval
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(spec, realtime=True):
+    # int (or digit string) -> camera index; directory -> image replay; else a video file
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return cv2.VideoCapture(int(spec))
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, fps=30 if realtime else None)
+    return VideoFileSource(spec, realtime=realtime)
+
+
+class AttendanceWriter:
+    # The single write path all gates share; AttendanceBook.mark serializes
+    # concurrent calls under the book's lock. persist_samples keeps the most
+    # recent mark latencies (index lookup + storage write).
+    def __init__(self, book, max_samples=10000):
+        self.book = book
+        self.persist_samples = deque(maxlen=max_samples)
+
+    def mark(self, regno):
+        start = time.perf_counter()
+        result = self.book.mark(regno)
+        elapsed = time.perf_counter() - start
+        self.persist_samples.append(elapsed)
+        MARK.observe(elapsed)
+        SCANS[result.action].inc()
+        return result
+
+
+class Gate:
+    def __init__(self, name, cap, writer, events, deduper, workers=1, strategy="full", scale=0.5,
+                 preview_width=None, preview=True, lossless=False):
+        self.name = name
+        self.cap = cap
+        self.writer = writer
+        self.events = events
+        self.deduper = deduper
+        self.stats = DetectionStats()
+        self.pipeline = FramePipeline(cap, workers=workers, strategy=strategy, scale=scale,
+                                      stats=self.stats, preview_width=preview_width,
+                                      preview=preview, lossless=lossless)
+        self.scans = 0
+        self.suppressed = 0
+        self.started_at = None
+        self.thread = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.pipeline.start()
+        self.thread = threading.Thread(target=self.dispatch_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.pipeline.stop()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        self.cap.release()
+
+    @property
+    def failed(self):
+        return self.pipeline.failed
+
+    @property
+    def done(self):
+        return self.thread is not None and not self.thread.is_alive()
+
+    def dispatch_loop(self):
+        while True:
+            try:
+                data = self.pipeline.results.get(timeout=0.1)
+            except queue.Empty:
+                if not self.pipeline.running or self.pipeline.finished():
+                    break
+                continue
+            regno = data.strip()
+            reason = self.deduper.check(regno)
+            if reason is not None:
+                # Never reaches the book; a refused check-out is still shown
+                self.suppressed += 1
+                if reason == TOO_SOON:
+                    wait = self.deduper.wait_left(regno)
+                    self.events.put((self, ScanResult(False, "rejected", regno, None,
+                                                      f"Just checked in - check out possible in {wait:.0f} s")))
+                continue
+            result = self.writer.mark(regno)
+            self.deduper.marked(regno, result.action)
+            self.scans += 1
+            self.events.put((self, result))
+
+    def throughput(self):
+        elapsed = max(1e-6, time.monotonic() - self.started_at) if self.started_at else 1.0
+        return {
+            "frames": self.pipeline.frame_seq,
+            "dropped": self.pipeline.frames_dropped,
+            "fps": self.pipeline.frame_seq / elapsed,
+            "scans": self.scans,
+            "scans_per_min": self.scans / elapsed * 60,
+            "suppressed": self.suppressed,
+        }
+
+    def summary(self):
+        t = self.throughput()
+        return (f"{self.name}: {t['fps']:.1f} fps, {t['scans']} scans ({t['scans_per_min']:.1f}/min), "
+                f"{t['dropped']} dropped")
+
+
+class ScanEngine:
+    def __init__(self, book, sources, workers_per_gate=1, strategy="full", scale=0.5, cooldown_s=2.0,
+                 min_gap_s=60.0, preview_width=None, realtime=True, preview=True, lossless=False):
+        self.writer = AttendanceWriter(book)
+        # Shared, so a badge seen by two gates at once is marked once
+        self.deduper = ScanDeduper(cooldown_s, min_gap_s)
+        self.events = queue.Queue()
+        self.gates = []
+        self.errors = []
+        for i, spec in enumerate(sources):
+            cap = open_source(spec, realtime=realtime)
+            if not cap.isOpened():
+                self.errors.append(f"Cannot open source {spec!r}")
+                cap.release()
+                continue
+            self.gates.append(Gate(f"Gate {i + 1}", cap, self.writer, self.events, self.deduper,
+                                   workers=workers_per_gate, strategy=strategy, scale=scale,
+                                   preview_width=preview_width, preview=preview, lossless=lossless))
+
+    def start(self):
+        for gate in self.gates:
+            gate.start()
+
+    def stop(self):
+        for gate in self.gates:
+            gate.stop()
+
+    def all_failed(self):
+        return all(gate.failed for gate in self.gates)
+
+    def all_done(self):
+        # Every source is exhausted and every decoded frame has been marked
+        return all(gate.done for gate in self.gates)
+
+    def poll_events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
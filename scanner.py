@@ -0,0 +1,128 @@
+import queue
+import threading
+
+import cv2
+
+from metrics import CAPTURE_READ, DECODES_ATTEMPTED, DECODES_SUCCEEDED, FRAMES_CAPTURED, FRAMES_DROPPED
+from qr_detect import DetectionStats, QRDecoder
+
+# Camera pipeline that keeps capture and QR decoding off the Tk main thread.
+# A capture thread publishes the newest frame for the preview and offers it to
+# a bounded decode queue (dropping the stale frame when decoders fall behind);
+# decoder threads push decoded strings onto a results queue that the gate's
+# dispatch thread (scan_engine.Gate) drains.
+#
+# For replaying recorded input, lossless=True makes capture wait for a free
+# decode slot instead of dropping frames, and preview=False skips the RGB
+# conversion nobody will look at.
+
+
+class FramePipeline:
+    def __init__(self, cap, workers=2, strategy="full", scale=0.5, stats=None, preview_width=None,
+                 preview=True, lossless=False):
+        self.cap = cap
+        self.preview_width = preview_width
+        self.preview = preview
+        self.lossless = lossless
+        self.workers = workers
+        self.strategy = strategy
+        self.scale = scale
+        self.stats = stats if stats is not None else DetectionStats()
+        self.decode_queue = queue.Queue(maxsize=workers)
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.latest_rgb = None
+        self.frame_seq = 0
+        self.frames_dropped = 0
+        self.frames_decoded = 0
+        self.failed = False
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        self.threads = [threading.Thread(target=self.capture_loop, daemon=True)]
+        self.threads += [threading.Thread(target=self.decode_loop, daemon=True) for _ in range(self.workers)]
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        self.running = False
+        for t in self.threads:
+            t.join(timeout=1.0)
+        self.threads = []
+
+    def capture_loop(self):
+        # On end of input (or a camera error) capture stops but the decoders
+        # keep going until the frames already queued are done
+        while self.running:
+            with CAPTURE_READ.time():
+                ret, frame = self.cap.read()
+            if not ret:
+                self.failed = True
+                break
+            FRAMES_CAPTURED.inc()
+            rgb = None
+            if self.preview:
+                preview = frame
+                if self.preview_width and frame.shape[1] > self.preview_width:
+                    scale = self.preview_width / frame.shape[1]
+                    preview = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                rgb = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+            with self.lock:
+                self.latest_rgb = rgb
+                self.frame_seq += 1
+            if self.lossless:
+                self.put_waiting(frame)
+            else:
+                self.offer(frame)
+
+    def put_waiting(self, frame):
+        while self.running:
+            try:
+                self.decode_queue.put(frame, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def offer(self, frame):
+        try:
+            self.decode_queue.put_nowait(frame)
+        except queue.Full:
+            # Decoders are behind: replace the oldest waiting frame with this one
+            try:
+                self.decode_queue.get_nowait()
+                self.frames_dropped += 1
+                FRAMES_DROPPED.inc()
+            except queue.Empty:
+                pass
+            try:
+                self.decode_queue.put_nowait(frame)
+            except queue.Full:
+                self.frames_dropped += 1
+                FRAMES_DROPPED.inc()
+
+    def decode_loop(self):
+        # QRCodeDetector is not thread-safe, so each worker owns one
+        decoder = QRDecoder(self.strategy, scale=self.scale, stats=self.stats)
+        while self.running:
+            try:
+                frame = self.decode_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.failed:
+                    break
+                continue
+            data = decoder.decode(frame)
+            self.frames_decoded += 1
+            DECODES_ATTEMPTED.inc()
+            if data:
+                DECODES_SUCCEEDED.inc()
+                self.results.put(data)
+
+    def finished(self):
+        # Input ended and every decoder has drained the queue
+        return self.failed and not any(t.is_alive() for t in self.threads)
+
+    def latest(self):
+        with self.lock:
+            return self.frame_seq, self.latest_rgb
@@ -0,0 +1,190 @@
+import bisect
+import re
+
+import numpy as np
+import pandas as pd
+
+# Inverted indexes for the records tab search. Each searchable user field maps
+# normalized terms to the RegNos carrying them; a sorted term list answers
+# prefix queries with bisect and a deletion-neighbourhood index answers
+# typo-tolerant ones. Matching users are then expanded to attendance positions
+# through a RegNo -> positions map, so a search never scans the attendance
+# history. Everything is updated incrementally on scans and user edits.
+
+SEARCH_FIELDS = ("RegNo", "FirstName", "LastName", "Mobile", "Department")
+# Longer terms (whole RegNos) are only matched exactly or by prefix
+FUZZY_MAX_TERM_LEN = 16
+TOKEN_SPLIT = re.compile(r"[\s_\-]+")
+
+
+def normalize(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return str(value).strip().lower()
+
+
+def field_terms(value):
+    # The whole value plus its words, so "2024-john_doe_cs" is found by
+    # "2024-jo", "john" or "doe"
+    text = normalize(value)
+    if not text:
+        return set()
+    return {text} | {t for t in TOKEN_SPLIT.split(text) if t}
+
+
+def deletes(term, max_edits):
+    variants = {term}
+    frontier = {term}
+    for _ in range(max_edits):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a, b, limit):
+    # Damerau (optimal string alignment): swapping two adjacent letters is one
+    # edit, so "jhon" is one away from "john". Both drop to "jon" in deletes(),
+    # so swaps are already among the fuzzy candidates.
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            cur.append(cost)
+        if min(cur) > limit:
+            return limit + 1
+        before, prev = prev, cur
+    return prev[-1]
+
+
+class FieldIndex:
+    def __init__(self, max_edits):
+        self.max_edits = max_edits
+        self.postings = {}
+        self.sorted_terms = []
+        self.variants = {}
+
+    def add(self, term, regno, keep_sorted=True):
+        regnos = self.postings.get(term)
+        if regnos is None:
+            regnos = self.postings[term] = set()
+            if keep_sorted:
+                bisect.insort(self.sorted_terms, term)
+            if len(term) <= FUZZY_MAX_TERM_LEN:
+                for v in deletes(term, self.max_edits):
+                    self.variants.setdefault(v, set()).add(term)
+        regnos.add(regno)
+
+    def finish_bulk(self):
+        self.sorted_terms = sorted(self.postings)
+
+    def remove(self, term, regno):
+        regnos = self.postings.get(term)
+        if regnos is None:
+            return
+        regnos.discard(regno)
+        if not regnos:
+            del self.postings[term]
+            del self.sorted_terms[bisect.bisect_left(self.sorted_terms, term)]
+            if len(term) > FUZZY_MAX_TERM_LEN:
+                return
+            for v in deletes(term, self.max_edits):
+                terms = self.variants.get(v)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.variants[v]
+
+    def prefix(self, query):
+        matched = set()
+        i = bisect.bisect_left(self.sorted_terms, query)
+        while i < len(self.sorted_terms) and self.sorted_terms[i].startswith(query):
+            matched |= self.postings[self.sorted_terms[i]]
+            i += 1
+        return matched
+
+    def fuzzy(self, query):
+        # Short queries get no typo allowance; they would match everything
+        limit = self.max_edits if len(query) > 3 else 0
+        if limit == 0:
+            return set(self.postings.get(query, ()))
+        candidates = set()
+        for v in deletes(query, limit):
+            candidates |= self.variants.get(v, set())
+        matched = set()
+        for term in candidates:
+            if edit_distance(query, term, limit) <= limit:
+                matched |= self.postings[term]
+        return matched
+
+
+class SearchIndex:
+    def __init__(self, users_df, attendance, max_edits=1):
+        self.max_edits = max_edits
+        self.rebuild_users(users_df)
+        # RegNo -> attendance positions, from one stable sort of the id column
+        ids = attendance.ids()
+        order = np.argsort(ids, kind='stable')
+        starts = np.flatnonzero(np.r_[True, ids[order][1:] != ids[order][:-1]]) if len(ids) else []
+        self.rows = {attendance.regnos[ids[order[a]]]: chunk.tolist()
+                     for a, chunk in zip(starts, np.split(order, starts[1:]))}
+
+    def rebuild_users(self, users_df):
+        self.fields = {field: FieldIndex(self.max_edits) for field in SEARCH_FIELDS}
+        self.user_terms = {}
+        for record in users_df.to_dict('records'):
+            self.add_user(record, keep_sorted=False)
+        self.finish_bulk()
+
+    # ----- Incremental updates -----
+    def add_user(self, record, keep_sorted=True):
+        regno = record['RegNo']
+        terms = {field: field_terms(record.get(field)) for field in SEARCH_FIELDS}
+        self.user_terms[regno] = terms
+        for field, field_set in terms.items():
+            for term in field_set:
+                self.fields[field].add(term, regno, keep_sorted)
+
+    def finish_bulk(self):
+        # After add_user(..., keep_sorted=False) calls
+        for index in self.fields.values():
+            index.finish_bulk()
+
+    def remove_user(self, regno):
+        terms = self.user_terms.pop(regno, None)
+        if terms is None:
+            return
+        for field, field_set in terms.items():
+            for term in field_set:
+                self.fields[field].remove(term, regno)
+
+    def update_user(self, old_regno, record):
+        self.remove_user(old_regno)
+        self.add_user(record)
+
+    def add_row(self, pos, regno):
+        self.rows.setdefault(regno, []).append(pos)
+
+    # ----- Queries -----
+    def match_users(self, field, query, fuzzy=True):
+        query = normalize(query)
+        if not query:
+            return set()
+        index = self.fields[field]
+        matched = index.prefix(query)
+        if fuzzy:
+            matched |= index.fuzzy(query)
+        return matched
+
+    def search(self, field, query, attendance, date_from=None, date_to=None, fuzzy=True):
+        positions = []
+        for regno in self.match_users(field, query, fuzzy):
+            positions.extend(self.rows.get(regno, ()))
+        if not positions:
+            return pd.Index([], dtype='int64')
+        positions = attendance.in_date_range(sorted(positions), date_from, date_to)
+        return pd.Index(attendance.sorted_positions(positions))
@@ -0,0 +1,163 @@
+import heapq
+from collections import Counter, namedtuple
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from attendance_store import OPEN, format_date
+
+# Check-in/out session rules. A scan closes the user's open session if there
+# is one, otherwise opens a new one, so a user can come and go several times
+# a day (up to max_sessions_per_day). Without shifts a session is only closed
+# by a scan on the Date it started, as before: the first scan of a new day
+# checks in again and the old session is left to go stale. With overnight
+# set, or with shifts, a session may run past midnight: it stays on the Date
+# it started, with the OutTime of the next day.
+#
+# Shifts, if configured, limit when check-ins are accepted (from early_grace
+# before a shift starts until it ends) and decide which day a session belongs
+# to: a night shift 22:00-06:00 entered at 00:30 is still the previous day's.
+# An open session goes stale at its shift's end plus late_grace, or
+# max_open_hours after check-in without shifts; stale sessions are closed
+# with the shift's end as OutTime, or their InTime (no hours credited) when
+# there is no shift to go by.
+
+Shift = namedtuple("Shift", "name start end")  # datetime.time; end <= start crosses midnight
+
+# Open sessions older than this many days at startup are left as they are
+RECENT_DAYS = 2
+
+
+def clock(value):
+    return time.fromisoformat(value)
+
+
+class SessionPolicy:
+    def __init__(self, max_sessions_per_day=1, shifts=(), early_grace_min=60, late_grace_min=120,
+                 max_open_hours=16, overnight=False):
+        self.max_sessions_per_day = max_sessions_per_day
+        self.overnight = overnight
+        self.shifts = [Shift(name, clock(start), clock(end)) for name, start, end in shifts]
+        self.early_grace = timedelta(minutes=early_grace_min)
+        self.late_grace = timedelta(minutes=late_grace_min)
+        self.max_open = timedelta(hours=max_open_hours)
+
+    def shift_at(self, moment):
+        # (shift, its start, its end) for the shift window moment falls in
+        for offset in (0, -1):
+            base = moment.date() + timedelta(days=offset)
+            for shift in self.shifts:
+                start = datetime.combine(base, shift.start)
+                end = datetime.combine(base, shift.end)
+                if end <= start:
+                    end += timedelta(days=1)
+                if start - self.early_grace <= moment < end:
+                    return shift, start, end
+        return None
+
+    def session_day(self, moment):
+        # Date a check-in at moment is recorded under, None if no shift allows it
+        if not self.shifts:
+            return moment.date().isoformat()
+        found = self.shift_at(moment)
+        return found[1].date().isoformat() if found else None
+
+    def closes(self, day, moment):
+        # Whether a scan at moment checks out of a session open since Date day
+        return self.overnight or bool(self.shifts) or day == moment.date().isoformat()
+
+    def started_at(self, day, in_seconds):
+        # Check-in moment of a stored row: InTime on Date, or on the next day
+        # for a night shift entered after midnight
+        moment = datetime.combine(date.fromisoformat(day), time()) + timedelta(seconds=int(in_seconds))
+        if self.shifts and self.session_day(moment) != day:
+            later = moment + timedelta(days=1)
+            if self.session_day(later) == day:
+                return later
+        return moment
+
+    def deadline(self, started):
+        found = self.shift_at(started) if self.shifts else None
+        return found[2] + self.late_grace if found else started + self.max_open
+
+    def auto_out(self, started):
+        # OutTime written when a stale session is closed
+        found = self.shift_at(started) if self.shifts else None
+        return (found[2] if found else started).strftime("%H:%M:%S")
+
+
+class SessionEngine:
+    # O(1) per scan: RegNo -> open session position, (RegNo, Date) -> sessions
+    # started, and a heap of open sessions by deadline for the stale sweep
+    def __init__(self, attendance, policy, now=None):
+        self.attendance = attendance
+        self.policy = policy
+        self.rebuild(now)
+
+    def rebuild(self, now=None):
+        # One vectorized pass over the last RECENT_DAYS days of rows
+        now = now or datetime.now()
+        self.open = {}
+        self.deadlines = []
+        att = self.attendance
+        recent = np.flatnonzero(att.days() >= now.toordinal() - RECENT_DAYS + 1)
+        ids = att.ids()[recent]
+        days = att.days()[recent]
+        day_strings = {d: format_date(d) for d in np.unique(days).tolist()}
+        self.counts = Counter((att.regnos[i], day_strings[d]) for i, d in zip(ids.tolist(), days.tolist()))
+        self.counts_day = now.date().isoformat()
+        still_open = att.out_seconds()[recent] == OPEN
+        for pos, rid, day, tin in zip(recent[still_open].tolist(), ids[still_open].tolist(),
+                                      days[still_open].tolist(), att.in_seconds()[recent][still_open].tolist()):
+            self.opened(att.regnos[rid], pos, self.policy.started_at(day_strings[day], tin))
+
+    # ----- Lookups -----
+    def open_session(self, regno):
+        return self.open.get(regno)
+
+    def count(self, regno, day):
+        return self.counts.get((regno, day), 0)
+
+    # ----- Updates -----
+    def opened(self, regno, pos, started):
+        self.open[regno] = pos
+        heapq.heappush(self.deadlines, (self.policy.deadline(started), pos, regno, started))
+
+    def started(self, regno, pos, day, started):
+        if day > self.counts_day:
+            # Counts are only needed for the current days
+            self.counts_day = day
+            cutoff = (date.fromisoformat(day) - timedelta(days=RECENT_DAYS)).isoformat()
+            self.counts = Counter({key: n for key, n in self.counts.items() if key[1] > cutoff})
+        self.counts[(regno, day)] += 1
+        self.opened(regno, pos, started)
+
+    def closed(self, regno, pos):
+        if self.open.get(regno) == pos:
+            del self.open[regno]
+
+    def expired(self, now):
+        # Pops sessions past their deadline that are still open, as
+        # (regno, pos, OutTime to close them with); the caller marks them
+        # closed once the OutTime is stored
+        stale = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, pos, regno, started = heapq.heappop(self.deadlines)
+            if self.attendance.is_open(pos):
+                stale.append((regno, pos, self.policy.auto_out(started)))
+        return stale
+
+
+def add_policy_arguments(parser):
+    parser.add_argument("--sessions-per-day", type=int, default=1)
+    parser.add_argument("--shift", action="append", default=[], metavar="NAME,START,END",
+                        help="shift window, e.g. Night,22:00,06:00 (repeat for several)")
+    parser.add_argument("--max-open-hours", type=float, default=16,
+                        help="auto-close sessions open this long (without shifts)")
+    parser.add_argument("--overnight", action="store_true",
+                        help="let a scan after midnight close the previous day's session (without shifts)")
+
+
+def policy_from_args(args):
+    return SessionPolicy(args.sessions_per_day, [shift.split(",") for shift in args.shift],
+                         max_open_hours=args.max_open_hours, overnight=args.overnight)
@@ -0,0 +1,63 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Binary snapshot of attendance.csv for fast startup. Each column is stored as
+# an int32 .npy of category codes (memory-mapped on load) with its distinct
+# values in meta.json, so loading is a few array lookups instead of a CSV
+# parse. The snapshot is only trusted while the CSV's size and mtime match the
+# ones recorded when it was written; otherwise the CSV is parsed as before.
+
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_dir_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".snapshot"
+
+
+def csv_stamp(csv_path):
+    st = os.stat(csv_path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def write_snapshot(df, csv_path, snapshot_dir):
+    # Only string columns (what normalize_attendance produces) are kept
+    if not all(pd.api.types.is_string_dtype(df[col]) for col in df.columns):
+        return False
+    os.makedirs(snapshot_dir, exist_ok=True)
+    meta_path = os.path.join(snapshot_dir, "meta.json")
+    if os.path.exists(meta_path):
+        # Invalidate first so a crash mid-write never pairs new codes with old meta
+        os.remove(meta_path)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        codes, uniques = pd.factorize(df[col].fillna(""))
+        np.save(os.path.join(snapshot_dir, f"{i}.npy"), codes.astype(np.int32))
+        columns.append([col, str(df[col].dtype), [str(u) for u in uniques]])
+
+    meta = {"version": SNAPSHOT_VERSION, "stamp": csv_stamp(csv_path), "rows": len(df), "columns": columns}
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, meta_path)
+    return True
+
+
+def read_snapshot(csv_path, snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, "meta.json")) as fh:
+            meta = json.load(fh)
+        if meta.get("version") != SNAPSHOT_VERSION or meta.get("stamp") != csv_stamp(csv_path):
+            return None
+        data = {}
+        for i, (col, dtype, uniques) in enumerate(meta["columns"]):
+            codes = np.load(os.path.join(snapshot_dir, f"{i}.npy"), mmap_mode="r")
+            if len(codes) != meta["rows"]:
+                return None
+            data[col] = pd.Series(np.array(uniques, dtype=object)[codes], dtype=object).astype(dtype)
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        return None
+    return pd.DataFrame(data)
@@ -0,0 +1,409 @@
+import argparse
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from journal import AttendanceJournal, apply_journal, journal_segments, read_journal
+from metrics import COMPACTION
+from snapshot import read_snapshot, snapshot_dir_for, write_snapshot
+
+USER_COLUMNS = ["RegNo", "FirstName", "LastName", "Mobile", "BloodGroup", "Department", "Position"]
+ATTENDANCE_COLUMNS = ["RegNo", "Date", "InTime", "OutTime"]
+EXPORT_COLUMNS = ["RegNo", "FirstName", "LastName", "Date", "InTime", "OutTime"]
+
+
+def empty_attendance():
+    df = pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+    df['OutTime'] = df['OutTime'].astype('string')
+    return df
+
+
+def with_names(chunk, users_by_regno):
+    # Attach user columns to an attendance chunk without merging whole frames
+    for col in ("FirstName", "LastName", "Department"):
+        chunk[col] = chunk['RegNo'].map(users_by_regno[col])
+    return chunk
+
+
+def filter_chunk(chunk, filters):
+    mask = pd.Series(True, index=chunk.index)
+    if filters.get('date_from'):
+        mask &= chunk['Date'] >= filters['date_from']
+    if filters.get('date_to'):
+        mask &= chunk['Date'] <= filters['date_to']
+    if filters.get('regnos') is not None:
+        mask &= chunk['RegNo'].isin(filters['regnos'])
+    if filters.get('departments') is not None:
+        mask &= chunk['Department'].isin(filters['departments'])
+    return chunk[mask]
+
+
+def cell_text(value):
+    # Empty cells (NaN from read_csv) are stored as "", not "nan"
+    return "" if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+
+
+def normalize_attendance(df):
+    if 'OutTime' in df.columns:
+        df['OutTime'] = df['OutTime'].astype('string').fillna("")
+    else:
+        df['OutTime'] = pd.Series("", index=df.index, dtype='string')
+    return df
+
+
+# ----- Storage interface -----
+# The app keeps users in memory as a DataFrame and attendance as an
+# AttendanceStore built from load_attendance(); a storage backend loads them at
+# startup, persists each check-in/out as it happens and answers history/export
+# queries. Attendance rows are never deleted, so a row's position in
+# load_attendance() identifies it for the lifetime of the store.
+class AttendanceStorage:
+    def load_users(self):
+        raise NotImplementedError
+
+    def save_users(self, users_df):
+        raise NotImplementedError
+
+    def save_user_changes(self, changes, users_df):
+        # changes maps RegNo -> its new record, or None for a deleted user;
+        # users_df is the whole table after them. Backends that can update
+        # rows in place override this, the rest rewrite the table.
+        self.save_users(users_df)
+
+    def load_attendance(self):
+        raise NotImplementedError
+
+    def peek_attendance(self):
+        # What load_attendance() would return, without writing or removing
+        # anything, for tools run beside the app (reports)
+        return self.load_attendance()
+
+    def save_attendance(self, att_df):
+        raise NotImplementedError
+
+    def record_in(self, regno, date, in_time):
+        # False if the backend already holds this (RegNo, Date, InTime) row
+        # and ignored the insert; the caller must not add it to memory then
+        raise NotImplementedError
+
+    def record_out(self, regno, date, in_time, out_time):
+        raise NotImplementedError
+
+    def user_history(self, regno, attendance):
+        return attendance.to_frame(attendance.sorted_positions(attendance.positions_of([regno])))
+
+    def iter_attendance(self, filters, users_df, attendance, order, chunksize=50000):
+        # Yields (chunk, fraction done) in (Date, InTime) order. filters may hold
+        # date_from/date_to (ISO strings), regnos and departments (sets). The
+        # in-memory fallback walks the pre-sorted position list a chunk at a
+        # time, building only that chunk's DataFrame.
+        users_by_regno = users_df.drop_duplicates('RegNo').set_index('RegNo')
+        for start in range(0, len(order), chunksize):
+            chunk = attendance.to_frame(order[start:start + chunksize])
+            chunk = filter_chunk(with_names(chunk, users_by_regno), filters)
+            yield chunk, min(1.0, (start + chunksize) / len(order))
+
+    def archive_start(self):
+        # First date still held by load_attendance() when older history lives
+        # in an archive only read on demand, else None
+        return None
+
+    def read_archive(self, date_from=None, date_to=None):
+        # Archived rows in the date range, as frames in (Date, InTime) order
+        return iter(())
+
+    def archive_files(self, date_from=None, date_to=None):
+        # (path, rows) of the archive files read_archive() would read, for
+        # worker processes that load them themselves
+        return []
+
+    def needs_compaction(self):
+        return False
+
+    def compact(self, attendance):
+        pass
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# ----- CSV backend -----
+class CsvStorage(AttendanceStorage):
+    def __init__(self, user_file, attendance_file, journal_file, compact_every=2000):
+        self.user_file = user_file
+        self.attendance_file = attendance_file
+        self.journal_file = journal_file
+        self.compact_every = compact_every
+        self.snapshot_dir = snapshot_dir_for(attendance_file)
+        self.journal = None
+        self.compacting = False
+
+    def load_users(self):
+        if os.path.exists(self.user_file):
+            return pd.read_csv(self.user_file)
+        df = pd.DataFrame(columns=USER_COLUMNS)
+        df.to_csv(self.user_file, index=False)
+        return df
+
+    def save_users(self, users_df):
+        users_df.to_csv(self.user_file, index=False)
+
+    def load_attendance(self):
+        df = self.read_attendance()
+
+        # Crash recovery: replay whatever the journal holds beyond the last compaction
+        segments = journal_segments(self.journal_file)
+        if segments:
+            events = []
+            for segment in segments:
+                events.extend(read_journal(segment))
+            df, replayed = apply_journal(df, events)
+            if replayed:
+                self.save_attendance(df)
+            for segment in segments:
+                os.remove(segment)
+        self.journal = AttendanceJournal(self.journal_file)
+        return df
+
+    def read_attendance(self, readonly=False):
+        if os.path.exists(self.attendance_file):
+            df = read_snapshot(self.attendance_file, self.snapshot_dir)
+            if df is None:
+                df = normalize_attendance(pd.read_csv(self.attendance_file))
+                if not readonly:
+                    self.write_snapshot(df)
+        else:
+            df = empty_attendance()
+            if not readonly:
+                df.to_csv(self.attendance_file, index=False)
+        return df
+
+    def peek_attendance(self):
+        # The journal is read before the CSV: a compaction finishing in
+        # between only makes its events appear twice, which replay ignores
+        events = []
+        for segment in journal_segments(self.journal_file):
+            try:
+                events.extend(read_journal(segment))
+            except FileNotFoundError:
+                pass  # compacted meanwhile, so already in the CSV read below
+        return apply_journal(self.read_attendance(readonly=True), events)[0]
+
+    def save_attendance(self, att_df):
+        # Write to a temp file and swap it in so a crash never leaves a torn CSV
+        tmp = self.attendance_file + ".tmp"
+        att_df.to_csv(tmp, index=False)
+        os.replace(tmp, self.attendance_file)
+        self.write_snapshot(att_df)
+
+    def write_snapshot(self, att_df):
+        # Best effort: without a snapshot the next start just parses the CSV
+        try:
+            write_snapshot(att_df, self.attendance_file, self.snapshot_dir)
+        except OSError:
+            pass
+
+    def record_in(self, regno, date, in_time):
+        self.journal.append("IN", regno, date, in_time)
+        return True
+
+    def record_out(self, regno, date, in_time, out_time):
+        self.journal.append("OUT", regno, date, in_time, out_time)
+
+    def needs_compaction(self):
+        return not self.compacting and self.journal.count >= self.compact_every
+
+    def compact(self, attendance):
+        # Fold the journal into the CSV off the caller's thread. The current
+        # segment is rotated aside first so scans keep appending meanwhile;
+        # attendance must be a copy the caller no longer mutates.
+        if self.compacting:
+            return
+        self.compacting = True
+        segment = self.journal.rotate()
+
+        def worker():
+            try:
+                with COMPACTION.time():
+                    self.save_attendance(attendance.to_frame())
+                os.remove(segment)
+            finally:
+                self.compacting = False
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def sync(self):
+        self.journal.sync()
+
+    def close(self):
+        if self.journal:
+            self.journal.close()
+
+
+# ----- SQLite backend -----
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    RegNo TEXT PRIMARY KEY,
+    FirstName TEXT, LastName TEXT, Mobile TEXT, BloodGroup TEXT, Department TEXT, Position TEXT
+);
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY,
+    RegNo TEXT NOT NULL,
+    Date TEXT NOT NULL,
+    InTime TEXT NOT NULL,
+    OutTime TEXT NOT NULL DEFAULT '',
+    UNIQUE (RegNo, Date, InTime)
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_regno_date ON attendance (RegNo, Date);
+CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (Date, InTime);
+CREATE INDEX IF NOT EXISTS idx_users_firstname ON users (FirstName COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_users_lastname ON users (LastName COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_users_mobile ON users (Mobile);
+"""
+
+
+class SqliteStorage(AttendanceStorage):
+    def __init__(self, db_file):
+        self.db_file = db_file
+        # Shared with scan worker threads; every statement runs under self.lock
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def load_users(self):
+        with self.lock:
+            return pd.read_sql_query(f"SELECT {', '.join(USER_COLUMNS)} FROM users ORDER BY rowid", self.conn)
+
+    def save_users(self, users_df):
+        rows = users_df[USER_COLUMNS].fillna("").astype(str).itertuples(index=False, name=None)
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM users")
+            self.conn.executemany(f"INSERT INTO users VALUES ({', '.join('?' * len(USER_COLUMNS))})", rows)
+
+    def save_user_changes(self, changes, users_df):
+        deleted = [(regno,) for regno, record in changes.items() if record is None]
+        rows = [tuple(cell_text(record.get(col)) for col in USER_COLUMNS)
+                for record in changes.values() if record is not None]
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM users WHERE RegNo = ?", deleted)
+            self.conn.executemany(f"INSERT OR REPLACE INTO users VALUES ({', '.join('?' * len(USER_COLUMNS))})", rows)
+
+    def load_attendance(self):
+        with self.lock:
+            df = pd.read_sql_query("SELECT RegNo, Date, InTime, OutTime FROM attendance ORDER BY id", self.conn)
+        return normalize_attendance(df)
+
+    def save_attendance(self, att_df):
+        # Positions are the row ids minus one, so ids are assigned explicitly
+        rows = ((i + 1, r, d, t, o) for i, (r, d, t, o) in
+                enumerate(att_df[ATTENDANCE_COLUMNS].astype(str).itertuples(index=False, name=None)))
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM attendance")
+            self.conn.executemany("INSERT INTO attendance (id, RegNo, Date, InTime, OutTime) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def record_in(self, regno, date, in_time):
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO attendance (RegNo, Date, InTime) VALUES (?, ?, ?) "
+                "ON CONFLICT (RegNo, Date, InTime) DO NOTHING", (regno, date, in_time))
+            return cursor.rowcount == 1
+
+    def record_out(self, regno, date, in_time, out_time):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO attendance (RegNo, Date, InTime, OutTime) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (RegNo, Date, InTime) DO UPDATE SET OutTime = excluded.OutTime",
+                (regno, date, in_time, out_time))
+
+    def user_history(self, regno, attendance):
+        with self.lock:
+            return pd.read_sql_query(
+                "SELECT RegNo, Date, InTime, OutTime FROM attendance WHERE RegNo = ? ORDER BY Date, InTime",
+                self.conn, params=(regno,))
+
+    def iter_attendance(self, filters, users_df, attendance, order, chunksize=50000):
+        # Runs on its own read connection (WAL readers don't block the writer)
+        # so a long export never holds self.lock
+        conn = sqlite3.connect(self.db_file)
+        try:
+            where, params = [], []
+            if filters.get('date_from'):
+                where.append("a.Date >= ?")
+                params.append(filters['date_from'])
+            if filters.get('date_to'):
+                where.append("a.Date <= ?")
+                params.append(filters['date_to'])
+            for key, column in (('regnos', 'a.RegNo'), ('departments', 'u.Department')):
+                if filters.get(key) is not None:
+                    table = f"export_{key}"
+                    conn.execute(f"CREATE TEMP TABLE {table} (value TEXT PRIMARY KEY)")
+                    conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?)", ((v,) for v in filters[key]))
+                    where.append(f"{column} IN (SELECT value FROM {table})")
+            clause = f" WHERE {' AND '.join(where)}" if where else ""
+            joins = " FROM attendance a LEFT JOIN users u ON u.RegNo = a.RegNo"
+            total = conn.execute(f"SELECT COUNT(*){joins}{clause}", params).fetchone()[0]
+            cursor = conn.execute(
+                f"SELECT a.RegNo, u.FirstName, u.LastName, u.Department, a.Date, a.InTime, a.OutTime"
+                f"{joins}{clause} ORDER BY a.Date, a.InTime", params)
+            columns = [d[0] for d in cursor.description]
+            done = 0
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                done += len(rows)
+                yield pd.DataFrame(rows, columns=columns), done / total
+        finally:
+            conn.close()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def migrate_csv_to_sqlite(user_file, attendance_file, journal_file, db_file):
+    # Loading through CsvStorage folds any pending journal into the CSV first
+    csv_store = CsvStorage(user_file, attendance_file, journal_file)
+    users = csv_store.load_users()
+    attendance = csv_store.load_attendance()
+    csv_store.close()
+    db = SqliteStorage(db_file)
+    db.save_users(users)
+    db.save_attendance(attendance)
+    db.close()
+    return len(users), len(attendance)
+
+
+def open_storage(backend, user_file, attendance_file, journal_file, db_file, compact_every=2000,
+                 partition_dir="attendance_partitions", active_months=2, retention_months=None,
+                 retention_action="move"):
+    if backend == "csv":
+        return CsvStorage(user_file, attendance_file, journal_file, compact_every)
+    if backend == "partitioned":
+        # Splits attendance_file into partition_dir on first start
+        from partitions import PartitionedStorage
+        return PartitionedStorage(user_file, partition_dir, journal_file, compact_every, active_months,
+                                  retention_months, retention_action, legacy_file=attendance_file)
+    if backend == "sqlite":
+        if not os.path.exists(db_file) and (os.path.exists(user_file) or os.path.exists(attendance_file)):
+            migrate_csv_to_sqlite(user_file, attendance_file, journal_file, db_file)
+        return SqliteStorage(db_file)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate users.csv/attendance.csv into a SQLite database")
+    parser.add_argument("--users", default="users.csv")
+    parser.add_argument("--attendance", default="attendance.csv")
+    parser.add_argument("--journal", default="attendance.journal")
+    parser.add_argument("--db", default="attendance.db")
+    args = parser.parse_args()
+    n_users, n_rows = migrate_csv_to_sqlite(args.users, args.attendance, args.journal, args.db)
+    print(f"Migrated {n_users} users and {n_rows} attendance rows into {args.db}")
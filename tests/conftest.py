@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from attendance_core import AttendanceBook
+from storage import CsvStorage
+
+USERS = [
+    {"RegNo": "2024-Ann_Lee_CS", "FirstName": "Ann", "LastName": "Lee", "Mobile": "9876543210",
+     "BloodGroup": "O+", "Department": "CS", "Position": "Staff"},
+    {"RegNo": "2024-Bob_Ray_EE", "FirstName": "Bob", "LastName": "Ray", "Mobile": "9876543211",
+     "BloodGroup": "A+", "Department": "EE", "Position": "Staff"},
+]
+ANN, BOB = (user["RegNo"] for user in USERS)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    pd.DataFrame(USERS).to_csv(tmp_path / "users.csv", index=False)
+    return tmp_path
+
+
+@pytest.fixture
+def open_book(data_dir):
+    # open_book(policy=None) -> a new AttendanceBook over the same CSV files,
+    # as after a restart
+    def open_book(policy=None):
+        storage = CsvStorage(str(data_dir / "users.csv"), str(data_dir / "attendance.csv"),
+                             str(data_dir / "attendance.journal"))
+        return AttendanceBook(storage, aggregates_file=str(data_dir / "aggregates.pkl"), policy=policy)
+    return open_book
@@ -0,0 +1,61 @@
+from dedup import SUPPRESSED, TOO_SOON, ScanDeduper
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_deduper(**kwargs):
+    clock = FakeClock()
+    return ScanDeduper(cooldown_s=2.0, min_gap_s=60.0, clock=clock, **kwargs), clock
+
+
+def test_repeat_within_cooldown_is_suppressed_and_extends_it():
+    deduper, clock = make_deduper()
+    assert deduper.check("A") is None
+    deduper.marked("A", "in")
+    clock.now += 1.5
+    assert deduper.check("A") == SUPPRESSED
+    clock.now += 1.5  # 3 s after the first sighting, 1.5 s after the last
+    assert deduper.check("A") == SUPPRESSED
+    assert deduper.counts[SUPPRESSED] == 2
+
+
+def test_check_out_is_refused_until_min_gap():
+    deduper, clock = make_deduper()
+    deduper.check("A")
+    deduper.marked("A", "in")
+    clock.now += 10
+    assert deduper.check("A") == TOO_SOON
+    assert deduper.wait_left("A") == 50
+    clock.now += 51
+    assert deduper.check("A") is None
+    deduper.marked("A", "out")
+    clock.now += 5
+    # Checked out: the next scan is a check-in, no gap applies
+    assert deduper.check("A") is None
+    assert deduper.wait_left("A") == 0
+
+
+def test_alternating_badges_are_tracked_separately():
+    deduper, clock = make_deduper()
+    for regno in ("A", "B"):
+        assert deduper.check(regno) is None
+        deduper.marked(regno, "in")
+    clock.now += 0.5
+    assert deduper.check("A") == SUPPRESSED
+    assert deduper.check("B") == SUPPRESSED
+
+
+def test_entries_expire_and_respect_capacity():
+    deduper, clock = make_deduper(capacity=2)
+    for regno in ("A", "B", "C"):
+        deduper.check(regno)
+    assert list(deduper.entries) == ["B", "C"]
+    clock.now += 61
+    assert deduper.check("D") is None
+    assert list(deduper.entries) == ["D"]
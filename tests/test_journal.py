@@ -0,0 +1,48 @@
+import os
+
+from journal import compacting_path
+from storage import CsvStorage
+
+
+def journal_storage(data_dir):
+    return CsvStorage(str(data_dir / "users.csv"), str(data_dir / "attendance.csv"),
+                      str(data_dir / "attendance.journal"))
+
+
+def test_replay_drops_a_torn_tail_record(data_dir):
+    with open(data_dir / "attendance.journal", "w", encoding="utf-8") as fh:
+        fh.write("IN,2024-Ann_Lee_CS,2026-10-01,09:00:00,\n")
+        fh.write("OUT,2024-Ann_Lee_CS,2026-10-01,09:00:00,17:00:00\n")
+        fh.write("IN,2024-Bob_Ray_EE,2026-10-0")  # crash mid-write
+
+    storage = journal_storage(data_dir)
+    df = storage.load_attendance()
+    storage.close()
+
+    assert df[['RegNo', 'Date', 'InTime', 'OutTime']].values.tolist() == [
+        ["2024-Ann_Lee_CS", "2026-10-01", "09:00:00", "17:00:00"]]
+    # Folded into the CSV; the next start replays nothing
+    storage = journal_storage(data_dir)
+    assert len(storage.load_attendance()) == 1
+    storage.close()
+
+
+def test_replay_of_a_segment_already_compacted_is_idempotent(data_dir):
+    storage = journal_storage(data_dir)
+    storage.load_attendance()
+    storage.record_in("2024-Ann_Lee_CS", "2026-10-01", "09:00:00")
+    storage.close()
+    # Crash after the compacted CSV was written but before its segment was removed
+    journal = data_dir / "attendance.journal"
+    storage = journal_storage(data_dir)
+    storage.load_attendance()
+    storage.close()
+    with open(compacting_path(str(journal)), "w", encoding="utf-8") as fh:
+        fh.write("IN,2024-Ann_Lee_CS,2026-10-01,09:00:00,\n")
+
+    storage = journal_storage(data_dir)
+    df = storage.load_attendance()
+    storage.close()
+
+    assert len(df) == 1
+    assert not os.path.exists(compacting_path(str(journal)))
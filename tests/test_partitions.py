@@ -0,0 +1,89 @@
+import os
+from datetime import date
+
+import pandas as pd
+
+from conftest import ANN, BOB
+from partitions import PartitionedStorage, month_start
+
+THIS_MONTH = month_start(date.today(), 0)
+OLD_MONTH = month_start(date.today(), 3)
+TODAY = date.today().isoformat()
+
+
+def rows(*records):
+    return pd.DataFrame(list(records), columns=['RegNo', 'Date', 'InTime', 'OutTime'])
+
+
+def open_storage(data_dir, **options):
+    return PartitionedStorage(str(data_dir / "users.csv"), str(data_dir / "partitions"),
+                              str(data_dir / "attendance.journal"), active_months=1,
+                              legacy_file=str(data_dir / "attendance.csv"), **options)
+
+
+def write_history(data_dir):
+    rows((ANN, f"{OLD_MONTH}-10", "09:00:00", "17:00:00"),
+         (BOB, f"{OLD_MONTH}-11", "09:00:00", ""),
+         (ANN, TODAY, "09:00:00", "")).to_csv(data_dir / "attendance.csv", index=False)
+
+
+def test_months_out_of_the_window_are_sealed(data_dir):
+    write_history(data_dir)
+    storage = open_storage(data_dir)
+    active = storage.load_attendance()
+    assert active['Date'].tolist() == [TODAY]
+    assert [(m, p["sealed"]) for m, p in storage.partition_items()] == [(OLD_MONTH, True), (THIS_MONTH, False)]
+    assert os.path.exists(storage.sealed_path(OLD_MONTH))
+    assert len(pd.concat(list(storage.read_archive()))) == 2
+    assert storage.archive_start() == f"{THIS_MONTH}-01"
+    storage.close()
+
+
+def test_late_rows_merge_into_a_sealed_month(data_dir):
+    write_history(data_dir)
+    storage = open_storage(data_dir)
+    storage.load_attendance()
+    # Bob's check-out arrives after the month was sealed, plus a new row
+    storage.save_attendance(rows((BOB, f"{OLD_MONTH}-11", "09:00:00", "17:30:00"),
+                                 (BOB, f"{OLD_MONTH}-12", "09:00:00", "17:00:00")))
+    sealed = storage.read_sealed(OLD_MONTH)
+    assert sealed[['RegNo', 'Date', 'OutTime']].values.tolist() == [
+        [ANN, f"{OLD_MONTH}-10", "17:00:00"],
+        [BOB, f"{OLD_MONTH}-11", "17:30:00"],
+        [BOB, f"{OLD_MONTH}-12", "17:00:00"],
+    ]
+    assert dict(storage.partition_items())[OLD_MONTH]["rows"] == 3
+    storage.close()
+
+
+def test_retention_moves_expired_months(data_dir):
+    write_history(data_dir)
+    storage = open_storage(data_dir, retention_months=2)
+    storage.load_attendance()
+    assert [m for m, _ in storage.partition_items()] == [THIS_MONTH]
+    assert not os.path.exists(storage.sealed_path(OLD_MONTH))
+    assert os.path.exists(os.path.join(storage.path("expired"), f"{OLD_MONTH}.csv.gz"))
+    storage.close()
+
+
+def test_retention_purges_expired_months(data_dir):
+    write_history(data_dir)
+    storage = open_storage(data_dir, retention_months=2, retention_action="purge")
+    storage.load_attendance()
+    assert [m for m, _ in storage.partition_items()] == [THIS_MONTH]
+    assert not os.path.exists(storage.sealed_path(OLD_MONTH))
+    assert not os.path.exists(storage.path("expired"))
+    storage.close()
+
+
+def test_retention_skips_a_partition_missing_on_disk(data_dir):
+    write_history(data_dir)
+    storage = open_storage(data_dir)
+    storage.load_attendance()
+    storage.close()
+    os.remove(storage.sealed_path(OLD_MONTH))
+
+    storage = open_storage(data_dir, retention_months=2)
+    assert storage.load_attendance()['Date'].tolist() == [TODAY]
+    assert [m for m, _ in storage.partition_items()] == [THIS_MONTH]
+    storage.close()
@@ -0,0 +1,84 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from conftest import ANN, BOB
+from reports import ReportParams, build_report, report_tasks
+
+DAY1 = datetime.now().date() - timedelta(days=2)
+DAY2 = DAY1 + timedelta(days=1)
+
+
+def at(day, clock):
+    return datetime.combine(day, time.fromisoformat(clock))
+
+
+def test_late_arrivals_and_early_departures(open_book):
+    book = open_book()
+    book.mark(ANN, at(DAY1, "09:00:00"))
+    book.mark(ANN, at(DAY1, "17:00:00"))
+    book.mark(BOB, at(DAY1, "09:04:00"))
+    book.mark(BOB, at(DAY1, "17:10:00"))
+    book.mark(ANN, at(DAY2, "09:30:00"))
+    book.mark(ANN, at(DAY2, "16:00:00"))
+    report = build_report(report_tasks(book), ReportParams(work_start="09:00", work_end="17:00", grace_min=5),
+                          book.users).set_index('RegNo')
+    book.close()
+    assert report.loc[ANN, ['Late', 'Early']].tolist() == [1, 1]
+    assert report.loc[BOB, ['Late', 'Early']].tolist() == [0, 0]
+
+
+def test_work_times_must_be_clock_times():
+    assert ReportParams(work_start="08:30:15").late_after == 8 * 3600 + 30 * 60 + 15 + 5 * 60
+    with pytest.raises(ValueError):
+        ReportParams(work_start="9am")
+
+
+def known_history(book):
+    # Ann: two days, two sessions on the first; Bob: one overnight session
+    book.policy.max_sessions_per_day = 2
+    book.mark(ANN, at(DAY1, "09:00:00"))
+    book.mark(ANN, at(DAY1, "12:00:00"))
+    book.mark(ANN, at(DAY1, "13:00:00"))
+    book.mark(ANN, at(DAY1, "17:00:00"))
+    book.mark(ANN, at(DAY2, "09:00:00"))
+    book.mark(ANN, at(DAY2, "17:00:00"))
+    book.mark(BOB, at(DAY2, "20:00:00"))
+    book.policy.overnight = True
+    book.mark(BOB, at(DAY2 + timedelta(days=1), "02:00:00"))
+
+
+def test_report_over_a_known_history(open_book):
+    book = open_book()
+    known_history(book)
+    report = build_report(report_tasks(book), ReportParams(), book.users)
+    book.close()
+    assert report['RegNo'].tolist() == [ANN, BOB]
+    report = report.set_index('RegNo')
+    assert report.loc[ANN, ['Days', 'AttendancePct', 'Sessions', 'Hours']].tolist() == [2, 100.0, 3, 15.0]
+    assert report.loc[BOB, ['Days', 'AttendancePct', 'Sessions', 'Hours']].tolist() == [1, 50.0, 1, 6.0]
+    # The overnight session ends after work_end, so it is not early
+    assert report.loc[BOB, ['FirstName', 'Department', 'Late', 'Early']].tolist() == ["Bob", "EE", 1, 0]
+
+
+def test_report_range_and_users(open_book):
+    book = open_book()
+    known_history(book)
+    day2 = DAY2.isoformat()
+    params = ReportParams(date_from=day2, date_to=day2, regnos=[ANN])
+    report = build_report(report_tasks(book, day2, day2), params, book.users)
+    book.close()
+    assert report[['RegNo', 'Days', 'Sessions', 'Hours']].values.tolist() == [[ANN, 1, 1, 8.0]]
+    # Both users were present on the day, so it counts as a working day
+    assert report['AttendancePct'].tolist() == [100.0]
+
+
+def test_pool_and_inline_reports_agree(open_book):
+    book = open_book()
+    known_history(book)
+    # Twice over, so there are always tasks for two workers
+    tasks = report_tasks(book) * 2
+    inline = build_report(tasks, ReportParams(), book.users, workers=1)
+    pooled = build_report(tasks, ReportParams(), book.users, workers=2, pool_min_rows=0)
+    book.close()
+    assert inline.equals(pooled)
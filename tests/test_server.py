@@ -0,0 +1,118 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from attendance_server import TIME_FORMAT, AttendanceServer
+from conftest import ANN, BOB
+from sessions import SessionPolicy
+
+
+def scan_event(event_id, regno=ANN, when=None):
+    when = when or datetime.now().replace(hour=9, minute=0, second=0)
+    return {"id": event_id, "terminal": "gate1", "regno": regno, "time": when.strftime(TIME_FORMAT)}
+
+
+def test_resent_event_is_acknowledged_without_marking_again(open_book, data_dir):
+    server = AttendanceServer(open_book(), str(data_dir / "events.log"))
+    first = server.apply_events([scan_event("e1")])
+    again = server.apply_events([scan_event("e1")])
+    assert first["results"][0]["action"] == "in"
+    assert again["results"][0]["action"] == "duplicate"
+    assert server.book.attendance.row(0)[3] == ""
+    server.close()
+
+
+class Crash(Exception):
+    pass
+
+
+def test_resend_after_a_crash_does_not_flip_the_check_in(open_book, data_dir, monkeypatch):
+    server = AttendanceServer(open_book(), str(data_dir / "events.log"))
+    mark = server.book.mark
+
+    def mark_then_crash(*args, **kwargs):
+        mark(*args, **kwargs)
+        raise Crash
+
+    monkeypatch.setattr(server.book, "mark", mark_then_crash)
+    with pytest.raises(Crash):
+        server.apply_events([scan_event("e1")])
+    # Nothing is closed; the kiosk never saw a response and resends
+    server = AttendanceServer(open_book(), str(data_dir / "events.log"))
+    result = server.apply_events([scan_event("e1")])
+    assert result["results"][0]["action"] == "duplicate"
+    assert len(server.book.attendance) == 1
+    assert server.book.attendance.row(0)[3] == ""
+    server.close()
+
+
+def test_storage_error_answers_503(open_book, data_dir, monkeypatch):
+    server = AttendanceServer(open_book(), str(data_dir / "events.log"))
+
+    def disk_full(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(server.book.storage, "record_in", disk_full)
+    body = json.dumps({"events": [scan_event("e1")]}).encode()
+    status, payload, _ = asyncio.run(server.route("POST", "/events", body))
+    assert status == 503
+    assert "No space left" in payload["error"]
+    # The kiosk retries once the disk is back; the scan is recorded then
+    monkeypatch.undo()
+    status, payload, _ = asyncio.run(server.route("POST", "/events", body))
+    assert status == 200
+    assert payload["results"][0]["action"] == "in"
+    server.close()
+    book = open_book()
+    assert book.attendance.row(0)[0] == ANN
+    book.close()
+
+
+def test_failed_event_is_marked_when_resent_after_a_restart(open_book, data_dir, monkeypatch):
+    server = AttendanceServer(open_book(), str(data_dir / "events.log"))
+
+    def disk_full(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(server.book.storage, "record_in", disk_full)
+    with pytest.raises(OSError):
+        server.apply_events([scan_event("e1")])
+    server = AttendanceServer(open_book(), str(data_dir / "events.log"))
+    assert server.apply_events([scan_event("e1")])["results"][0]["action"] == "in"
+    assert len(server.book.attendance) == 1
+    server.close()
+
+
+def test_failed_check_out_leaves_the_session_open(open_book, data_dir, monkeypatch):
+    server = AttendanceServer(open_book(), str(data_dir / "events.log"))
+    server.apply_events([scan_event("e1")])
+
+    def disk_full(*args):
+        raise OSError("No space left on device")
+
+    out = scan_event("e2", when=datetime.now().replace(hour=17, minute=0, second=0))
+    monkeypatch.setattr(server.book.storage, "record_out", disk_full)
+    with pytest.raises(OSError):
+        server.apply_events([out])
+    assert server.book.attendance.is_open(0)
+    monkeypatch.undo()
+    assert server.apply_events([out])["results"][0]["action"] == "out"
+    assert len(server.book.attendance) == 1
+    server.close()
+
+
+def test_auto_closed_sessions_reach_the_change_feed(open_book, data_dir):
+    server = AttendanceServer(open_book(SessionPolicy(max_open_hours=1)), str(data_dir / "events.log"))
+    morning = datetime.now().replace(hour=8, minute=0, second=0) - timedelta(days=1)
+    server.apply_events([scan_event("e1", ANN, morning), scan_event("e2", BOB, morning + timedelta(hours=2))])
+    rows = {row[0]: row for row in server.changes(0)["rows"]}
+    assert rows[ANN][3] == "08:00:00"
+    assert rows[BOB][3] == ""
+    # Bob's session is closed by the background sync, without a scan
+    server.sync()
+    rows = {row[0]: row for row in server.changes(0)["rows"]}
+    assert rows[BOB][3] == "10:00:00"
+    assert server.book.changes == []
+    server.close()
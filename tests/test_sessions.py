@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+
+from aggregates import AttendanceAggregates
+from conftest import ANN, BOB
+from sessions import SessionPolicy
+
+TODAY = datetime.now().date()
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+def at(day, clock):
+    return datetime.combine(day, time.fromisoformat(clock))
+
+
+def hours(book, regno):
+    per_user = book.aggregates.per_user().set_index('RegNo')
+    return per_user.loc[regno, 'Hours']
+
+
+def test_scan_on_a_new_day_checks_in_again_by_default(open_book):
+    book = open_book()
+    assert book.mark(ANN, at(YESTERDAY, "20:00:00")).action == "in"
+    assert book.mark(ANN, at(TODAY, "09:00:00")).action == "in"
+    rows = book.attendance.to_frame()
+    book.close()
+    assert rows['Date'].tolist() == [YESTERDAY.isoformat(), TODAY.isoformat()]
+    assert rows['OutTime'].tolist() == ["", ""]
+
+
+def test_overnight_session_closes_on_the_day_it_started(open_book):
+    book = open_book(SessionPolicy(overnight=True))
+    book.mark(ANN, at(YESTERDAY, "20:00:00"))
+    assert book.mark(ANN, at(TODAY, "04:00:00")).action == "out"
+    assert book.attendance.row(0) == (ANN, YESTERDAY.isoformat(), "20:00:00", "04:00:00")
+    assert hours(book, ANN) == 8
+    book.close()
+
+
+def test_overnight_session_closed_after_a_restart_keeps_its_hours(open_book, data_dir):
+    policy = SessionPolicy(overnight=True)
+    book = open_book(policy)
+    book.mark(ANN, at(YESTERDAY, "20:00:00"))
+    book.mark(BOB, at(TODAY, "01:00:00"))  # today is now the newest day
+    book.close()
+
+    book = open_book(policy)
+    assert book.mark(ANN, at(TODAY, "04:00:00")).action == "out"
+    assert hours(book, ANN) == 8
+    book.close()
+
+    # The saved aggregates agree with a full rebuild
+    book = open_book(policy)
+    rebuilt = AttendanceAggregates()
+    rebuilt.rebuild(book.attendance, pd.read_csv(data_dir / "users.csv"))
+    assert hours(book, ANN) == rebuilt.per_user().set_index('RegNo').loc[ANN, 'Hours'] == 8
+    book.close()
+
+
+def test_night_shift_session_belongs_to_the_day_it_started(open_book):
+    book = open_book(SessionPolicy(shifts=[("Night", "22:00", "06:00")]))
+    assert book.mark(ANN, at(TODAY, "12:00:00")).message == "Outside shift hours"
+    book.mark(ANN, at(YESTERDAY, "23:00:00"))
+    assert book.mark(ANN, at(TODAY, "05:30:00")).action == "out"
+    assert book.attendance.row(0) == (ANN, YESTERDAY.isoformat(), "23:00:00", "05:30:00")
+    book.close()
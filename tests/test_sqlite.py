@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pandas as pd
+
+from attendance_core import AttendanceBook
+from conftest import ANN, USERS
+from storage import SqliteStorage, open_storage
+
+
+def open_book(data_dir):
+    return AttendanceBook(SqliteStorage(str(data_dir / "attendance.db")))
+
+
+def save_users(data_dir):
+    storage = SqliteStorage(str(data_dir / "attendance.db"))
+    storage.save_users(pd.DataFrame(USERS))
+    storage.close()
+
+
+def test_csv_files_are_migrated_on_first_start(data_dir):
+    pd.DataFrame([(ANN, "2026-01-05", "09:00:00", "17:00:00")],
+                 columns=['RegNo', 'Date', 'InTime', 'OutTime']).to_csv(data_dir / "attendance.csv", index=False)
+    storage = open_storage("sqlite", str(data_dir / "users.csv"), str(data_dir / "attendance.csv"),
+                           str(data_dir / "attendance.journal"), str(data_dir / "attendance.db"))
+    book = AttendanceBook(storage)
+    assert book.users['RegNo'].tolist() == [user["RegNo"] for user in USERS]
+    assert book.attendance.row(0) == (ANN, "2026-01-05", "09:00:00", "17:00:00")
+    book.close()
+
+
+def test_empty_user_fields_are_stored_empty(data_dir):
+    storage = SqliteStorage(str(data_dir / "attendance.db"))
+    users = pd.DataFrame(USERS)
+    users.loc[0, 'BloodGroup'] = float("nan")
+    storage.save_users(users)
+    assert storage.load_users().loc[0, 'BloodGroup'] == ""
+    record = {**USERS[1], "Position": float("nan")}
+    storage.save_user_changes({record["RegNo"]: record}, users)
+    assert storage.load_users().set_index('RegNo').loc[record["RegNo"], 'Position'] == ""
+    storage.close()
+
+
+def test_scans_survive_a_restart(data_dir):
+    save_users(data_dir)
+    book = open_book(data_dir)
+    book.mark(ANN, datetime.now().replace(hour=9, minute=0, second=0))
+    book.mark(ANN, datetime.now().replace(hour=17, minute=0, second=0))
+    book.close()
+    book = open_book(data_dir)
+    assert book.attendance.row(0)[2:] == ("09:00:00", "17:00:00")
+    book.close()
+
+
+def test_check_in_the_database_already_holds_is_rejected(data_dir):
+    save_users(data_dir)
+    now = datetime.now().replace(hour=9, minute=0, second=0)
+    book = open_book(data_dir)
+    # The row is in the database but not in this book's memory, e.g. written
+    # by another process since it loaded
+    book.storage.record_in(ANN, now.strftime("%Y-%m-%d"), "09:00:00")
+    result = book.mark(ANN, now)
+    assert (result.action, result.message) == ("rejected", "Already checked in at this time")
+    assert len(book.attendance) == 0
+    book.close()
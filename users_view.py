@@ -0,0 +1,153 @@
+import bisect
+
+# Paginated view over the users table for a ttk.Treeview, one item per user
+# with the RegNo as its iid. The users are kept as a list of sort keys for the
+# current sort column, so sorting is one pass over the records, filtering
+# narrows that list and an add, edit or delete is a bisect into it; the
+# widget is then brought in line with the current page by inserting and
+# deleting only the items that differ.
+
+
+def sort_key(record, column):
+    # Case-insensitive, ties broken by RegNo so every key is unique
+    return str(record.get(column, "")).casefold(), record["RegNo"]
+
+
+class UsersTable:
+    def __init__(self, tree, page_size=200, on_change=None):
+        self.tree = tree
+        self.page_size = page_size
+        self.on_change = on_change
+        self.columns = tuple(tree["columns"])
+        self.users = {}
+        self.column = "RegNo"
+        self.reverse = False
+        self.key_of = {}
+        self.keys = []
+        self.matches = None
+        self.rows = self.keys
+        self.page = 0
+        self.shown = {}
+        for col in self.columns:
+            tree.heading(col, command=lambda c=col: self.sort_by(c))
+
+    def load(self, users_by_regno):
+        # users_by_regno is read live (AttendanceIndex.users); the update
+        # methods below are called after it has changed
+        self.users = users_by_regno
+        self.sort_by(self.column, self.reverse)
+
+    # ----- View -----
+    def sort_by(self, column, reverse=None):
+        # Clicking the sorted column again flips the order
+        if reverse is None:
+            reverse = not self.reverse if column == self.column else False
+        self.column = column
+        self.reverse = reverse
+        self.key_of = {regno: sort_key(record, column) for regno, record in self.users.items()}
+        self.keys = sorted(self.key_of.values())
+        for col in self.columns:
+            arrow = (" ▼" if reverse else " ▲") if col == column else ""
+            self.tree.heading(col, text=col + arrow)
+        self.refilter()
+
+    def filter(self, regnos):
+        # Shows only these users, or everyone for None
+        self.matches = None if regnos is None else set(regnos)
+        self.page = 0
+        self.refilter()
+
+    def refilter(self):
+        if self.matches is None:
+            self.rows = self.keys
+        else:
+            self.rows = sorted(self.key_of[regno] for regno in self.matches if regno in self.key_of)
+        self.render()
+
+    def page_count(self):
+        return max(1, -(-len(self.rows) // self.page_size))
+
+    def row_at(self, i):
+        # RegNo of the i-th row in display order
+        return self.rows[len(self.rows) - 1 - i if self.reverse else i][1]
+
+    def values(self, regno):
+        record = self.users[regno]
+        return tuple(record.get(col, "") for col in self.columns)
+
+    def render(self):
+        self.tree.delete(*self.tree.get_children())
+        self.shown = {}
+        self.sync_page()
+
+    def sync_page(self, stale=()):
+        # Deletes items that left the page (or whose values are stale),
+        # inserts the ones that joined it and retags rows whose parity moved
+        self.page = min(self.page, self.page_count() - 1)
+        start = self.page * self.page_size
+        wanted = [self.row_at(i) for i in range(start, min(len(self.rows), start + self.page_size))]
+        keep = set(wanted).difference(stale)
+        gone = [iid for iid in self.shown if iid not in keep]
+        if gone:
+            self.tree.delete(*gone)
+            for iid in gone:
+                del self.shown[iid]
+        for offset, regno in enumerate(wanted):
+            tag = "evenrow" if (start + offset) % 2 == 0 else "oddrow"
+            if regno not in self.shown:
+                self.tree.insert("", offset, iid=regno, values=self.values(regno), tags=tag)
+            elif self.shown[regno] != tag:
+                self.tree.item(regno, tags=tag)
+            self.shown[regno] = tag
+        self.changed()
+
+    def next_page(self):
+        if self.page + 1 < self.page_count():
+            self.page += 1
+            self.render()
+
+    def prev_page(self):
+        if self.page > 0:
+            self.page -= 1
+            self.render()
+
+    def changed(self):
+        if self.on_change:
+            self.on_change(f"Page {self.page + 1} of {self.page_count()} ({len(self.rows)} users)")
+
+    # ----- Targeted updates -----
+    def insert_key(self, regno, visible):
+        key = self.key_of[regno] = sort_key(self.users[regno], self.column)
+        bisect.insort(self.keys, key)
+        if self.matches is not None and visible:
+            self.matches.add(regno)
+            bisect.insort(self.rows, key)
+
+    def remove_key(self, regno):
+        # True if the user was in the filtered view
+        key = self.key_of.pop(regno)
+        del self.keys[bisect.bisect_left(self.keys, key)]
+        if self.matches is None or regno not in self.matches:
+            return self.matches is None
+        self.matches.discard(regno)
+        del self.rows[bisect.bisect_left(self.rows, key)]
+        return True
+
+    def added(self, regno):
+        # A filtered view only shows new users once they match a new filter
+        self.insert_key(regno, visible=False)
+        self.sync_page()
+
+    def updated(self, old_regno, regno):
+        key = sort_key(self.users[regno], self.column)
+        if regno == old_regno and key == self.key_of[regno]:
+            # Same place in the order: refresh the item if it is on this page
+            if regno in self.shown:
+                self.tree.item(regno, values=self.values(regno))
+            return
+        self.insert_key(regno, visible=self.remove_key(old_regno))
+        self.sync_page(stale=(regno,))
+
+    def removed(self, regno):
+        self.remove_key(regno)
+        self.sync_page()